@@ -0,0 +1,272 @@
+"""
+Traitement par lots : une attribution par établissement, en parallèle.
+
+Les paires de fichiers d'entrée sont décrites soit par un manifeste CSV
+(colonnes nom, activites, choix et, facultativement, k et graine ; chemins
+relatifs au manifeste), soit par un dossier contenant un sous-dossier par
+établissement, avec un fichier des activités (nom commençant par « activit »)
+et un fichier des choix (nom contenant « choi »).
+
+Utilisation :
+    python batch.py ecoles/ --output resultats_lots --jobs 4
+    python batch.py manifeste.csv --k 3 --starts 8
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import List, Optional
+from main import load_data, generate_results_file
+from solver.multistart import MultiStartOptimizer
+
+INPUT_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+# Caractères autorisés dans le nom d'un traitement, qui sert de nom de dossier de sortie
+UNSAFE_NAME_CHARS = re.compile(r'[^\w.-]+')
+
+
+@dataclass
+class BatchJob:
+    """Une paire de fichiers d'entrée à traiter"""
+    name: str
+    activities_file: str
+    choices_file: str
+    k: int
+    seed: Optional[int] = None
+
+
+@dataclass
+class JobResult:
+    """Bilan d'un traitement"""
+    name: str
+    ok: bool
+    elapsed: float
+    n_students: int = 0
+    satisfaction_score: Optional[float] = None
+    forced_assignments: int = 0
+    unassigned: int = 0
+    results_file: Optional[str] = None
+    error: Optional[str] = None
+
+    def summary_line(self) -> str:
+        if not self.ok:
+            return f"[échec] {self.name} ({self.elapsed:.1f} s) : {self.error}"
+        return (f"[ok] {self.name} : {self.n_students} étudiants, "
+                f"score {self.satisfaction_score:.2%}, {self.forced_assignments} attributions "
+                f"forcées, {self.unassigned} non assignés ({self.elapsed:.1f} s) -> {self.results_file}")
+
+
+def safe_job_name(name: str) -> str:
+    """
+    Nom de dossier sûr pour un traitement : dernier composant du chemin, sans
+    caractères spéciaux ni point initial, pour ne jamais sortir du dossier de
+    sortie. ValueError si rien d'utilisable ne reste.
+    """
+    base = os.path.basename(name.strip().replace('\\', '/').rstrip('/'))
+    safe = UNSAFE_NAME_CHARS.sub('_', base).lstrip('.')
+    if not safe:
+        raise ValueError(f"Nom de traitement invalide : {name!r}")
+    return safe
+
+
+def check_unique_names(jobs: List[BatchJob]):
+    """Refuse deux traitements de même nom : le second écraserait les résultats du premier"""
+    seen = set()
+    for job in jobs:
+        if job.name.lower() in seen:
+            raise ValueError(f"Nom de traitement en double : {job.name}")
+        seen.add(job.name.lower())
+
+
+def read_manifest(manifest_file: str, default_k: int) -> List[BatchJob]:
+    """
+    Lit un manifeste CSV (nom, activites, choix[, k][, graine]). Les noms sont
+    ramenés à un nom de dossier sûr (voir safe_job_name) et doivent être uniques.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    jobs = []
+    with open(manifest_file, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = {'nom', 'activites', 'choix'} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"Colonnes manquantes dans le manifeste : {sorted(missing)}")
+        for line, row in enumerate(reader, start=2):
+            try:
+                k = int(row['k']) if (row.get('k') or '').strip() else default_k
+                seed = int(row['graine']) if (row.get('graine') or '').strip() else None
+            except ValueError:
+                raise ValueError(f"Manifeste, ligne {line} : k et graine doivent être des nombres entiers")
+            try:
+                name = safe_job_name(row['nom'] or '')
+            except ValueError as e:
+                raise ValueError(f"Manifeste, ligne {line} : {e}")
+            blank = [column for column in ('activites', 'choix') if not (row.get(column) or '').strip()]
+            if blank:
+                raise ValueError(f"Manifeste, ligne {line} : colonnes vides ou absentes : {blank}")
+            jobs.append(BatchJob(
+                name=name,
+                activities_file=os.path.join(base_dir, row['activites'].strip()),
+                choices_file=os.path.join(base_dir, row['choix'].strip()),
+                k=k,
+                seed=seed
+            ))
+    check_unique_names(jobs)
+    return jobs
+
+
+def discover_jobs(directory: str, default_k: int) -> List[BatchJob]:
+    """Un traitement par sous-dossier contenant un fichier des activités et un fichier des choix"""
+    jobs = []
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if not entry.is_dir():
+            continue
+        files = [path for path in glob.glob(os.path.join(entry.path, '*'))
+                 if os.path.splitext(path)[1].lower() in INPUT_EXTENSIONS]
+        activities = [p for p in files if os.path.basename(p).lower().startswith('activit')]
+        choices = [p for p in files if 'choi' in os.path.basename(p).lower()]
+        if len(activities) != 1 or len(choices) != 1:
+            print(f"[ignoré] {entry.name} : il faut exactement un fichier des activités "
+                  f"et un fichier des choix", file=sys.stderr)
+            continue
+        jobs.append(BatchJob(safe_job_name(entry.name), activities[0], choices[0], default_k))
+    check_unique_names(jobs)
+    return jobs
+
+
+def run_job(job: BatchJob, output_dir: str, n_starts: int) -> JobResult:
+    """Traite une paire de fichiers ; les erreurs sont retournées, jamais levées"""
+    started = time.perf_counter()
+    try:
+        problem = load_data(job.activities_file, job.choices_file, job.k,
+                            columnar=True, chunksize=100_000)
+        # Le parallélisme se fait entre établissements : un seul processus par traitement
+        optimizer = MultiStartOptimizer(problem, n_starts=n_starts, max_workers=1)
+        solution = optimizer.optimize(seed=job.seed)
+        summary = optimizer.get_solution_summary()
+
+        job_dir = os.path.join(output_dir, safe_job_name(job.name))
+        os.makedirs(job_dir, exist_ok=True)
+        results_file = generate_results_file(solution, summary, job_dir)
+        return JobResult(
+            name=job.name,
+            ok=True,
+            elapsed=time.perf_counter() - started,
+            n_students=summary['total_students'],
+            satisfaction_score=summary['satisfaction_score'],
+            forced_assignments=summary['forced_assignments'],
+            unassigned=summary['unassigned'],
+            results_file=results_file
+        )
+    except Exception as e:
+        return JobResult(name=job.name, ok=False, elapsed=time.perf_counter() - started, error=str(e))
+
+
+def run_batch(jobs: List[BatchJob], output_dir: str, n_starts: int = 8,
+              workers: Optional[int] = None, tasks_per_worker: int = 10) -> List[JobResult]:
+    """
+    Traite les lots sur un pool de processus. La mémoire reste bornée : au plus
+    un traitement en cours par processus (les suivants ne sont soumis qu'au fur
+    et à mesure), et chaque processus est renouvelé après tasks_per_worker
+    traitements lorsque Python le permet (3.11+).
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    pool_options = {}
+    if sys.version_info >= (3, 11):
+        pool_options['max_tasks_per_child'] = tasks_per_worker
+
+    results = []
+    pending_jobs = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers, **pool_options) as pool:
+        in_flight = set()
+        while True:
+            while len(in_flight) < workers:
+                job = next(pending_jobs, None)
+                if job is None:
+                    break
+                in_flight.add(pool.submit(run_job, job, output_dir, n_starts))
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results.append(result)
+                print(result.summary_line(), flush=True)
+    return results
+
+
+def write_summary(results: List[JobResult], summary_file: str):
+    """Une ligne par traitement, dans l'ordre de fin"""
+    with open(summary_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['nom', 'statut', 'etudiants', 'score', 'attributions_forcees',
+                         'non_assignes', 'duree_s', 'fichier_resultats', 'erreur'])
+        for r in results:
+            writer.writerow([r.name, 'ok' if r.ok else 'échec', r.n_students,
+                             '' if r.satisfaction_score is None else f"{r.satisfaction_score:.6f}",
+                             r.forced_assignments, r.unassigned, f"{r.elapsed:.3f}",
+                             r.results_file or '', r.error or ''])
+
+
+def aggregate_report(results: List[JobResult], wall_time: float) -> str:
+    """Bilan global : débit et échecs"""
+    succeeded = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    students = sum(r.n_students for r in succeeded)
+    lines = [
+        "\nBilan du traitement par lots :",
+        f"Traitements : {len(results)} ({len(succeeded)} réussis, {len(failed)} échecs)",
+        f"Étudiants traités : {students}",
+        f"Durée totale : {wall_time:.1f} s",
+        f"Débit : {len(results) / wall_time * 60 if wall_time else 0:.1f} traitements/min, "
+        f"{students / wall_time if wall_time else 0:.0f} étudiants/s",
+    ]
+    if succeeded:
+        lines.append(f"Score moyen : {sum(r.satisfaction_score for r in succeeded) / len(succeeded):.2%}")
+    if failed:
+        lines.append("Échecs :")
+        lines.extend(f"  - {r.name} : {r.error}" for r in failed)
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Satisfier - traitement par lots")
+    parser.add_argument('source', help="Manifeste CSV ou dossier contenant un sous-dossier par établissement")
+    parser.add_argument('--output', default='resultats_lots', help="Dossier des résultats")
+    parser.add_argument('--k', type=int, default=3, help="Nombre de choix par étudiant (par défaut)")
+    parser.add_argument('--starts', type=int, default=8, help="Nombre d'essais de l'algorithme par traitement")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Nombre de traitements simultanés (par défaut : nombre de processeurs)")
+    parser.add_argument('--tasks-per-worker', type=int, default=10,
+                        help="Traitements par processus avant son renouvellement (Python 3.11+)")
+    args = parser.parse_args(argv)
+
+    try:
+        if os.path.isdir(args.source):
+            jobs = discover_jobs(args.source, args.k)
+        else:
+            jobs = read_manifest(args.source, args.k)
+    except (OSError, ValueError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 2
+    if not jobs:
+        print("Aucun traitement à effectuer.", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output, exist_ok=True)
+    started = time.perf_counter()
+    results = run_batch(jobs, args.output, args.starts, args.jobs, args.tasks_per_worker)
+    wall_time = time.perf_counter() - started
+
+    summary_file = os.path.join(args.output, 'bilan_lots.csv')
+    write_summary(results, summary_file)
+    print(aggregate_report(results, wall_time))
+    print(f"Bilan détaillé : {summary_file}")
+    return 0 if all(r.ok for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Générateur reproductible d'instances réalistes du problème d'attribution.
+
+La popularité des activités suit une loi de Zipf (quelques activités très
+demandées, une longue traîne d'activités boudées) ; chaque étudiant tire k
+activités distinctes selon cette popularité. La capacité totale vaut
+capacity_ratio fois le nombre d'étudiants : 1.0 pour une instance serrée,
+davantage pour une instance plus lâche.
+"""
+import os
+from typing import Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+
+def default_n_choices(n_students: int, k: int) -> int:
+    """Nombre d'activités par défaut : une pour 20 étudiants, entre 2k et 1000"""
+    return max(2 * k, min(1000, n_students // 20))
+
+
+def generate_problem(n_students: int, n_choices: Optional[int] = None, k: int = 3,
+                     seed: int = 0, zipf_exponent: float = 1.0, capacity_ratio: float = 1.0,
+                     columnar: bool = False) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
+    """
+    Génère une instance de n_students étudiants et n_choices activités.
+    Une même graine donne toujours la même instance.
+    """
+    if n_choices is None:
+        n_choices = default_n_choices(n_students, k)
+    if k > n_choices:
+        raise ValueError(
+            f"Le nombre de choix demandé ({k}) est supérieur au nombre "
+            f"d'activités disponibles ({n_choices})"
+        )
+    rng = np.random.default_rng(seed)
+
+    # Popularité de Zipf, attribuée aux activités dans un ordre aléatoire
+    popularity = 1.0 / np.arange(1, n_choices + 1) ** zipf_exponent
+    popularity = rng.permutation(popularity / popularity.sum())
+
+    # Capacités : capacity_ratio * n_students places réparties autour de la moyenne
+    total = max(n_choices, int(round(capacity_ratio * n_students)))
+    shares = rng.uniform(0.5, 1.5, n_choices)
+    capacities = 1 + rng.multinomial(total - n_choices, shares / shares.sum())
+
+    problem = ArrayAssignmentProblem(
+        choice_ids=np.arange(1, n_choices + 1),
+        choice_names=[f"Activité {i}" for i in range(1, n_choices + 1)],
+        capacities=capacities,
+        student_ids=np.arange(1, n_students + 1),
+        student_names=[f"Étudiant {i}" for i in range(1, n_students + 1)],
+        preferences=_sample_preferences(rng, popularity, n_students, k),
+        k=k
+    )
+    return problem if columnar else problem.to_problem()
+
+
+def _sample_preferences(rng: np.random.Generator, popularity: np.ndarray,
+                        n_students: int, k: int) -> np.ndarray:
+    """
+    Tirage sans remise de k activités par étudiant, proportionnellement à leur
+    popularité : chaque choix est tiré selon la popularité, et les étudiants
+    qui retombent sur une activité déjà choisie tirent à nouveau.
+    """
+    cumulative = np.cumsum(popularity)
+    cumulative[-1] = 1.0
+    preferences = np.empty((n_students, k), dtype=np.int32)
+    for rank in range(k):
+        pending = np.arange(n_students)
+        while len(pending):
+            drawn = np.searchsorted(cumulative, rng.random(len(pending)), side='right')
+            preferences[pending, rank] = drawn
+            repeated = (preferences[pending, :rank] == drawn[:, None]).any(axis=1)
+            pending = pending[repeated]
+    return preferences
+
+
+def write_csv_files(problem: ArrayAssignmentProblem, directory: str) -> Tuple[str, str]:
+    """Écrit l'instance au format d'entrée de load_data ; retourne les deux chemins"""
+    os.makedirs(directory, exist_ok=True)
+    activities_file = os.path.join(directory, 'activities.csv')
+    choices_file = os.path.join(directory, 'student_choices.csv')
+
+    pd.DataFrame({
+        'id': problem.choice_ids,
+        'name': problem.choice_names,
+        'capacity': problem.capacities
+    }).to_csv(activities_file, index=False, encoding='utf-8')
+
+    choices = pd.DataFrame(problem.choice_ids[problem.preferences],
+                           columns=[f"choice{i}" for i in range(1, problem.k + 1)])
+    choices.insert(0, 'name', problem.student_names)
+    choices.to_csv(choices_file, index=False, encoding='utf-8')
+    return activities_file, choices_file
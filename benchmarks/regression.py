@@ -0,0 +1,190 @@
+"""
+Comparaison des moteurs de résolution et détection des régressions.
+
+Chaque moteur du registre (solver/registry.py) résout chaque instance d'un
+corpus fixe et reproductible, dans un processus neuf (mémoire maximale
+propre à l'exécution). Pour chaque couple (instance, moteur) sont rapportés :
+la durée, la mémoire résidente maximale, le score, l'écart à la meilleure
+solution connue et l'histogramme des rangs.
+
+Avec --baseline (rapport JSON d'une exécution précédente), l'exécution échoue
+(code de sortie 1) si un score baisse de plus de --max-score-drop, si une
+durée dépasse --max-slowdown fois celle de référence, ou si un moteur exact
+n'atteint pas la meilleure solution connue.
+
+Utilisation (depuis la racine du projet) :
+    python -m benchmarks.regression --output reference.json
+    python -m benchmarks.regression --baseline reference.json --engines greedy min_cost_flow
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from benchmarks.generator import generate_problem
+from benchmarks.run_benchmarks import _git_revision, _peak_rss_mb
+
+# Corpus d'instances : (étudiants, activités, k, capacité totale / étudiants, exposant de Zipf, graine)
+CORPORA = {
+    'rapide': [
+        (1_000, 50, 3, 1.0, 1.0, 0),
+        (1_000, 50, 5, 0.9, 1.2, 1),
+        (5_000, 250, 3, 1.3, 1.0, 2),
+    ],
+    'complet': [
+        (1_000, 50, 3, 1.0, 1.0, 0),
+        (1_000, 50, 5, 0.9, 1.2, 1),
+        (10_000, 500, 3, 1.0, 1.0, 2),
+        (10_000, 500, 5, 1.3, 1.0, 3),
+        (50_000, 1000, 3, 1.0, 1.5, 4),
+    ],
+}
+
+# Écart relatif toléré entre un moteur exact et la meilleure solution connue
+EXACT_TOLERANCE = 1e-9
+
+
+def case_name(case: tuple) -> str:
+    n_students, n_choices, k, capacity_ratio, zipf_exponent, seed = case
+    return f"n{n_students}-m{n_choices}-k{k}-c{capacity_ratio}-z{zipf_exponent}-s{seed}"
+
+
+def run_engine(engine: str, case: tuple, time_limit: Optional[float]) -> Dict:
+    """Génère l'instance puis la résout avec le moteur (dans le processus appelant)"""
+    from solver.registry import solve
+
+    n_students, n_choices, k, capacity_ratio, zipf_exponent, seed = case
+    problem = generate_problem(n_students, n_choices, k, seed, zipf_exponent, capacity_ratio,
+                               columnar=True)
+    rss_before = _peak_rss_mb()
+    started = time.perf_counter()
+    optimizer = solve(engine, problem, time_limit=time_limit, seed=seed)
+    seconds = time.perf_counter() - started
+    summary = optimizer.get_solution_summary()
+    peak_rss = _peak_rss_mb()
+    return {
+        'seconds': seconds,
+        'peak_rss_mb': peak_rss,
+        'solve_rss_mb': peak_rss - rss_before if peak_rss is not None else None,
+        'score': summary['satisfaction_score'],
+        # Rangs 1..k, puis attributions forcées et non assignés
+        'rank_histogram': [summary['choice_distribution'].get(f"choice_{r}", 0) for r in range(1, k + 1)]
+                          + [summary['forced_assignments'], summary['unassigned']]
+    }
+
+
+def run_corpus(engines: List[str], cases: List[tuple], time_limit: Optional[float],
+               best_known: Optional[Dict[str, float]] = None) -> Dict[str, Dict]:
+    """
+    Exécute chaque moteur sur chaque instance, un processus neuf par exécution ;
+    retourne {instance: {'best_known': ..., 'engines': {moteur: mesures}}}.
+    """
+    results = {}
+    for case in cases:
+        name = case_name(case)
+        measures = {}
+        for engine in engines:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                measures[engine] = pool.submit(run_engine, engine, case, time_limit).result()
+            print(f"{name} {engine} : {measures[engine]['seconds']:.3f}s, "
+                  f"score {measures[engine]['score']:.4%}", file=sys.stderr)
+
+        best = max(m['score'] for m in measures.values())
+        if best_known and name in best_known:
+            best = max(best, best_known[name])
+        for m in measures.values():
+            m['gap'] = (best - m['score']) / best if best > 0 else 0.0
+        results[name] = {'case': list(case), 'best_known': best, 'engines': measures}
+    return results
+
+
+def find_regressions(results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]],
+                     max_score_drop: float, max_slowdown: float, min_seconds: float) -> List[str]:
+    """Liste des régressions, par rapport à la référence et aux moteurs exacts"""
+    from solver.registry import get_solver
+
+    regressions = []
+    for name, result in results.items():
+        for engine, m in result['engines'].items():
+            if get_solver(engine).exact and m['gap'] > EXACT_TOLERANCE:
+                regressions.append(f"{name} {engine} : moteur exact à {m['gap']:.4%} "
+                                   f"de la meilleure solution connue")
+            reference = (baseline or {}).get(name, {}).get('engines', {}).get(engine)
+            if reference is None:
+                continue
+            if reference['score'] - m['score'] > max_score_drop:
+                regressions.append(f"{name} {engine} : score {m['score']:.4%} "
+                                   f"(référence {reference['score']:.4%})")
+            if (m['seconds'] > reference['seconds'] * max_slowdown
+                    and m['seconds'] - reference['seconds'] > min_seconds):
+                regressions.append(f"{name} {engine} : {m['seconds']:.3f}s "
+                                   f"(référence {reference['seconds']:.3f}s)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from solver.registry import solver_names
+
+    parser = argparse.ArgumentParser(description="Comparaison des moteurs de Satisfier")
+    parser.add_argument('--engines', nargs='+', default=None,
+                        help=f"Moteurs à comparer (par défaut : tous ceux disponibles, "
+                             f"parmi {solver_names(only_available=False)})")
+    parser.add_argument('--corpus', default='rapide', choices=list(CORPORA), help="Corpus d'instances")
+    parser.add_argument('--time-limit', type=float, default=60.0,
+                        help="Budget en secondes des moteurs qui en acceptent un")
+    parser.add_argument('--baseline', default=None, help="Rapport JSON de référence")
+    parser.add_argument('--max-score-drop', type=float, default=0.001,
+                        help="Baisse de score tolérée par rapport à la référence (absolue)")
+    parser.add_argument('--max-slowdown', type=float, default=1.5,
+                        help="Ralentissement toléré par rapport à la référence (facteur)")
+    parser.add_argument('--min-seconds', type=float, default=0.1,
+                        help="Écart de durée en deçà duquel un ralentissement est ignoré")
+    parser.add_argument('--output', default=None, help="Fichier JSON de sortie (par défaut : sortie standard)")
+    args = parser.parse_args(argv)
+
+    engines = args.engines or solver_names()
+    unknown = [e for e in engines if e not in solver_names(only_available=False)]
+    if unknown:
+        parser.error(f"moteur inconnu : {unknown[0]}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    best_known = {name: result['best_known'] for name, result in (baseline or {}).items()}
+
+    results = run_corpus(engines, CORPORA[args.corpus], args.time_limit, best_known)
+    regressions = find_regressions(results, baseline, args.max_score_drop, args.max_slowdown,
+                                   args.min_seconds)
+
+    report = {
+        'metadata': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'corpus': args.corpus,
+            'time_limit': args.time_limit
+        },
+        'results': results,
+        'regressions': regressions
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    for regression in regressions:
+        print(f"RÉGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Banc d'essai des étapes de traitement : load_data, optimize,
+get_solution_summary et generate_results_file.
+
+Chaque cas (taille, k, capacité) est exécuté dans un processus neuf afin que
+la mémoire maximale mesurée ne dépende pas des cas précédents. Les résultats
+sont écrits en JSON pour comparer deux versions du code.
+
+Utilisation (depuis la racine du projet) :
+    python -m benchmarks.run_benchmarks --sizes 100 1000 10000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from benchmarks.generator import default_n_choices, generate_problem, write_csv_files
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Profils de capacité totale (places / étudiants)
+CAPACITY_PROFILES = {'serrée': 1.0, 'lâche': 1.3}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Mémoire résidente maximale du processus depuis son lancement (Mo)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilo-octets sous Linux, octets sous macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(n_students: int, k: int, capacity_ratio: float, zipf_exponent: float,
+             seed: int, n_choices: Optional[int], columnar: bool,
+             export: bool, trace_memory: bool) -> Dict:
+    """Génère une instance, l'écrit en CSV puis chronomètre chaque étape"""
+    # Import tardif : les processus de travail ne chargent le code mesuré qu'ici
+    from main import load_data, generate_results_file
+    from solver.optimizer import SatisfactionOptimizer
+
+    n_choices = n_choices or default_n_choices(n_students, k)
+    case = {
+        'n_students': n_students,
+        'n_choices': n_choices,
+        'k': k,
+        'capacity_ratio': capacity_ratio,
+        'zipf_exponent': zipf_exponent,
+        'seed': seed,
+        'representation': 'columnar' if columnar else 'dataclass',
+        'stages': {}
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        generated = generate_problem(n_students, n_choices, k, seed, zipf_exponent,
+                                     capacity_ratio, columnar=True)
+        activities_file, choices_file = write_csv_files(generated, directory)
+        del generated
+
+        if trace_memory:
+            tracemalloc.start()
+
+        def measure(stage, function):
+            if trace_memory:
+                tracemalloc.reset_peak()
+            started = time.perf_counter()
+            result = function()
+            record = {'seconds': time.perf_counter() - started, 'peak_rss_mb': _peak_rss_mb()}
+            if trace_memory:
+                record['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            case['stages'][stage] = record
+            return result
+
+        problem = measure('load_data', lambda: load_data(activities_file, choices_file, k,
+                                                         columnar=columnar))
+        optimizer = SatisfactionOptimizer(problem)
+        measure('optimize', lambda: optimizer.optimize(seed=seed))
+        summary = measure('get_solution_summary', optimizer.get_solution_summary)
+        if export:
+            measure('generate_results_file',
+                    lambda: generate_results_file(problem, summary, directory))
+
+        if trace_memory:
+            tracemalloc.stop()
+
+    case['satisfaction_score'] = summary['satisfaction_score']
+    case['forced_assignments'] = summary['forced_assignments']
+    case['unassigned'] = summary['unassigned']
+    case['peak_rss_mb'] = _peak_rss_mb()
+    return case
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Banc d'essai de Satisfier")
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[100, 1_000, 10_000, 100_000, 1_000_000],
+                        help="Nombres d'étudiants à tester")
+    parser.add_argument('--k', type=int, nargs='+', default=[3], help="Nombres de choix par étudiant")
+    parser.add_argument('--capacity', nargs='+', default=list(CAPACITY_PROFILES),
+                        choices=list(CAPACITY_PROFILES), help="Profils de capacité totale")
+    parser.add_argument('--choices', type=int, default=None,
+                        help="Nombre d'activités (par défaut : une pour 20 étudiants, au plus 1000)")
+    parser.add_argument('--zipf', type=float, default=1.0, help="Exposant de la loi de Zipf")
+    parser.add_argument('--seed', type=int, default=0, help="Graine du générateur et de l'optimiseur")
+    parser.add_argument('--dataclass', action='store_true',
+                        help="Mesurer la représentation dataclass plutôt que la représentation en colonnes")
+    parser.add_argument('--skip-export', action='store_true',
+                        help="Ne pas mesurer generate_results_file (long au-delà de 1e5 étudiants)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Mesurer le pic d'allocation de chaque étape (tracemalloc, ralentit l'exécution)")
+    parser.add_argument('--output', default=None, help="Fichier JSON de sortie (par défaut : sortie standard)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n_students in args.sizes:
+        for k in args.k:
+            for profile in args.capacity:
+                # Un processus neuf par cas
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    case = pool.submit(run_case, n_students, k, CAPACITY_PROFILES[profile],
+                                       args.zipf, args.seed, args.choices, not args.dataclass,
+                                       not args.skip_export, args.trace_memory).result()
+                case['capacity_profile'] = profile
+                results.append(case)
+                timings = ', '.join(f"{stage} {record['seconds']:.3f}s"
+                                    for stage, record in case['stages'].items())
+                print(f"n={n_students} k={k} capacité {profile} : {timings}, "
+                      f"score {case['satisfaction_score']:.2%}", file=sys.stderr)
+
+    report = {
+        'metadata': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'trace_memory': args.trace_memory
+        },
+        'results': results
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Banc d'essai du démarrage de l'interface graphique.
+
+Mesure, sur plusieurs lancements dans des processus neufs :
+- le temps d'import de gui.py et les modules lourds qu'il charge d'emblée
+  (ne nécessite pas d'écran) ;
+- le temps jusqu'à l'apparition de la fenêtre, vu de l'extérieur (du
+  lancement du processus à l'affichage) et de l'intérieur (depuis le début de
+  gui.py), grâce à la variable SATISFIER_STARTUP_PROBE ;
+- avec --executable, la même mesure sur l'exécutable construit par
+  build_exe.py (un seul fichier ou dossier).
+
+Utilisation (depuis la racine du projet) :
+    python -m benchmarks.startup --runs 5 --output startup.json
+    python -m benchmarks.startup --executable dist/Satisfier/Satisfier
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from benchmarks.run_benchmarks import _git_revision
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules dont le chargement retarde l'apparition de la fenêtre
+HEAVY_MODULES = ('numpy', 'pandas', 'openpyxl', 'PIL', 'main', 'solver.multistart')
+STARTUP_PROBE_ENV = 'SATISFIER_STARTUP_PROBE'
+
+_IMPORT_SCRIPT = (
+    "import sys, time, json\n"
+    "started = time.perf_counter()\n"
+    "import gui\n"
+    "print(json.dumps({'seconds': time.perf_counter() - started,\n"
+    "                  'heavy_modules': [m for m in %r if m in sys.modules]}))\n"
+) % (HEAVY_MODULES,)
+
+
+def measure_import(python: str) -> Dict:
+    """Temps d'import de gui.py dans un processus neuf"""
+    completed = subprocess.run([python, '-c', _IMPORT_SCRIPT], cwd=PROJECT_DIR,
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_window(command: List[str], timeout: float = 60.0) -> Dict:
+    """
+    Lance l'interface avec la sonde de démarrage et attend la ligne
+    window_seconds=... ; en l'absence d'écran, l'erreur est retournée.
+    """
+    env = dict(os.environ, **{STARTUP_PROBE_ENV: '1'})
+    started = time.perf_counter()
+    try:
+        completed = subprocess.run(command, cwd=PROJECT_DIR, env=env, capture_output=True,
+                                   text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return {'error': str(e)}
+    elapsed = time.perf_counter() - started
+    for line in completed.stdout.splitlines():
+        if line.startswith('window_seconds='):
+            return {'process_seconds': elapsed, 'in_process_seconds': float(line.split('=', 1)[1])}
+    lines = (completed.stderr or completed.stdout).strip().splitlines()
+    return {'error': lines[-1] if lines else f"code de sortie {completed.returncode}"}
+
+
+def _summarize(values: List[float]) -> Optional[Dict]:
+    if not values:
+        return None
+    return {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Banc d'essai du démarrage de Satisfier")
+    parser.add_argument('--runs', type=int, default=5, help="Nombre de lancements par mesure")
+    parser.add_argument('--executable', default=None,
+                        help="Exécutable construit par build_exe.py à mesurer en plus de gui.py")
+    parser.add_argument('--output', default=None, help="Fichier JSON de sortie (par défaut : sortie standard)")
+    args = parser.parse_args(argv)
+
+    imports = [measure_import(sys.executable) for _ in range(args.runs)]
+    targets = {'gui.py': [sys.executable, os.path.join(PROJECT_DIR, 'gui.py')]}
+    if args.executable:
+        targets['executable'] = [os.path.abspath(args.executable)]
+
+    windows = {}
+    for name, command in targets.items():
+        runs = [measure_window(command) for _ in range(args.runs)]
+        measured = [r for r in runs if 'error' not in r]
+        windows[name] = {
+            'process_seconds': _summarize([r['process_seconds'] for r in measured]),
+            'in_process_seconds': _summarize([r['in_process_seconds'] for r in measured]),
+            'errors': sorted({r['error'] for r in runs if 'error' in r})
+        }
+        summary = windows[name]['process_seconds']
+        print(f"{name} : fenêtre en {summary['median']:.3f}s (médiane)" if summary
+              else f"{name} : fenêtre non mesurée ({windows[name]['errors'][0]})", file=sys.stderr)
+    print(f"import gui : {statistics.median(r['seconds'] for r in imports):.3f}s (médiane), "
+          f"modules lourds : {imports[0]['heavy_modules'] or 'aucun'}", file=sys.stderr)
+
+    report = {
+        'metadata': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'runs': args.runs
+        },
+        'import_gui': {
+            'seconds': _summarize([r['seconds'] for r in imports]),
+            'heavy_modules': imports[0]['heavy_modules']
+        },
+        'time_to_window': windows
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,47 @@
+"""
+Construction de l'exécutable avec PyInstaller.
+
+Utilisation :
+    python build_exe.py            # un seul fichier (dist/Satisfier.exe)
+    python build_exe.py --onedir   # un dossier (dist/Satisfier/), démarrage plus rapide
+
+L'exécutable en un seul fichier décompresse tout son contenu dans un dossier
+temporaire à chaque lancement, avant que la fenêtre n'apparaisse ; la version
+en dossier s'exécute sur place et s'ouvre donc bien plus vite.
+"""
+import argparse
 import PyInstaller.__main__
 import os
 from logo import create_logo
 
-# Créer le logo s'il n'existe pas
-if not os.path.exists('assets'):
-    os.makedirs('assets')
-if not os.path.exists('assets/logo.ico'):
-    create_logo()
-
-PyInstaller.__main__.run([
-    'gui.py',
-    '--onefile',
-    '--windowed',
-    '--name=Satisfier',
-    '--add-data=assets/logo.png;assets',
-    '--add-data=assets/logo.ico;assets',
-    '--icon=assets/logo.ico',
-])
+# Modules jamais utilisés par l'application : les exclure allège l'exécutable
+EXCLUDED_MODULES = ['matplotlib', 'scipy', 'highspy', 'IPython', 'pytest']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construction de l'exécutable Satisfier")
+    parser.add_argument('--onedir', action='store_true',
+                        help="Produire un dossier plutôt qu'un fichier unique (démarrage plus rapide)")
+    args = parser.parse_args(argv)
+
+    # Créer le logo s'il n'existe pas
+    if not os.path.exists('assets'):
+        os.makedirs('assets')
+    if not os.path.exists('assets/logo.ico'):
+        create_logo()
+
+    options = [
+        'gui.py',
+        '--onedir' if args.onedir else '--onefile',
+        '--windowed',
+        '--name=Satisfier',
+        '--add-data=assets/logo.png;assets',
+        '--add-data=assets/logo.ico;assets',
+        '--icon=assets/logo.ico',
+    ]
+    options += [f'--exclude-module={module}' for module in EXCLUDED_MODULES]
+    PyInstaller.__main__.run(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Conversion des fichiers d'entrée (CSV ou Excel) au format binaire .satb.
+
+Le fichier produit se charge sans pandas ni openpyxl, par projection en
+mémoire (voir models/storage.py) : les relances et les processus de calcul
+n'ont plus à relire ni à valider les fichiers d'origine.
+
+Utilisation :
+    python convert.py activites.xlsx choix.csv --k 3 --output probleme.satb
+    python convert.py probleme.satb --info
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+from models.array_models import ArrayAssignmentProblem
+from models.storage import BINARY_EXTENSION, load_binary, save_binary
+
+
+def convert_to_binary(activities_file: str, choices_file: str, k: int,
+                      output_file: Optional[str] = None,
+                      chunksize: Optional[int] = 100_000) -> str:
+    """
+    Lit une paire de fichiers acceptée par load_data et l'enregistre au format
+    .satb (par défaut à côté du fichier des choix). Retourne le chemin écrit.
+    """
+    from main import load_data
+
+    problem = load_data(activities_file, choices_file, k, columnar=True, chunksize=chunksize)
+    if output_file is None:
+        output_file = os.path.splitext(choices_file)[0] + BINARY_EXTENSION
+    save_binary(problem, output_file)
+    return output_file
+
+
+def describe(problem: ArrayAssignmentProblem) -> str:
+    """Résumé d'un problème chargé"""
+    return (f"{problem.n_students} étudiants, {problem.n_choices} activités, "
+            f"{int(problem.capacities.sum())} places, k = {problem.k}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Satisfier - conversion au format binaire .satb")
+    parser.add_argument('files', nargs='+',
+                        help="Fichier des activités puis fichier des choix (ou un fichier .satb avec --info)")
+    parser.add_argument('--k', type=int, default=3, help="Nombre de choix par étudiant")
+    parser.add_argument('--output', default=None,
+                        help="Fichier .satb à écrire (par défaut : à côté du fichier des choix)")
+    parser.add_argument('--info', action='store_true', help="Affiche le contenu d'un fichier .satb")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.info:
+            if len(args.files) != 1:
+                parser.error("--info attend un seul fichier .satb")
+            print(describe(load_binary(args.files[0], names=False)))
+            return 0
+
+        if len(args.files) != 2:
+            parser.error("il faut le fichier des activités puis le fichier des choix")
+        started = time.perf_counter()
+        output_file = convert_to_binary(args.files[0], args.files[1], args.k, args.output)
+        elapsed = time.perf_counter() - started
+        problem = load_binary(output_file, names=False)
+    except (OSError, ValueError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 2
+
+    print(f"{describe(problem)} -> {output_file} "
+          f"({os.path.getsize(output_file) / 1e6:.1f} Mo, {elapsed:.1f} s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
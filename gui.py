@@ -1,26 +1,72 @@
+import time
+_STARTED = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
 import os
-from main import load_data, generate_results_file
-from solver.optimizer import SatisfactionOptimizer
-from logo import create_logo
+import queue
+import threading
+import multiprocessing
+
+# Intervalle de lecture des messages du traitement en cours (ms)
+POLL_INTERVAL_MS = 100
+
+# Avec cette variable d'environnement, la fenêtre affiche sur la sortie standard
+# le temps écoulé jusqu'à son apparition puis se ferme (banc d'essai du démarrage)
+STARTUP_PROBE_ENV = 'SATISFIER_STARTUP_PROBE'
+
+
+def import_pipeline():
+    """
+    Importe les modules du traitement (pandas, openpyxl, NumPy...), absents
+    du démarrage pour que la fenêtre apparaisse au plus vite. Les imports
+    suivants sont immédiats ; un import concurrent attend le premier.
+    """
+    from main import load_data, generate_results_file
+    from solver.multistart import MultiStartOptimizer
+    from problem_cache import ProblemCache
+    return load_data, generate_results_file, MultiStartOptimizer, ProblemCache
+
+
+def _prewarm():
+    """Préchargement en tâche de fond ; une erreur sera signalée par le traitement"""
+    try:
+        import_pipeline()
+    except Exception:
+        pass
+
 
 class SatisfierGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Satisfier - Optimisation des choix")
-        self.root.geometry("800x910")  # Augmentation de la hauteur
+        self.root.geometry("800x960")  # Augmentation de la hauteur
         self.root.configure(padx=20, pady=5)
 
         # Création du logo s'il n'existe pas
         if not os.path.exists('assets/logo.png'):
+            from logo import create_logo
             create_logo()
 
         # Variables
         self.activities_path = tk.StringVar()
         self.choices_path = tk.StringVar()
         self.num_choices = tk.StringVar(value="3")
+        self.num_starts = tk.StringVar(value="8")
+        self.seed = tk.StringVar()
+        self.time_budget = tk.StringVar()
+
+        # Problèmes déjà lus : une relance sur les mêmes fichiers ne les relit pas
+        # (cache créé au premier chargement)
+        self.problem_cache = None
+        self.prewarm_thread = None
+
+        # Traitement en cours : il s'exécute dans un fil séparé et communique
+        # avec l'interface uniquement par la file de messages
+        self.events = queue.Queue()
+        self.worker = None
+        self.cancel_event = None
+        self.closing = False
+        self.status = tk.StringVar()
         
         # Style
         style = ttk.Style()
@@ -46,6 +92,12 @@ class SatisfierGUI:
         
         ttk.Label(choices_frame, text="Nombre de choix par élève (n) :").pack(side='left', padx=5)
         ttk.Entry(choices_frame, textvariable=self.num_choices, width=5).pack(side='left', padx=5)
+        ttk.Label(choices_frame, text="Essais :").pack(side='left', padx=5)
+        ttk.Entry(choices_frame, textvariable=self.num_starts, width=5).pack(side='left', padx=5)
+        ttk.Label(choices_frame, text="Graine (optionnelle) :").pack(side='left', padx=5)
+        ttk.Entry(choices_frame, textvariable=self.seed, width=12).pack(side='left', padx=5)
+        ttk.Label(choices_frame, text="Amélioration (s) :").pack(side='left', padx=5)
+        ttk.Entry(choices_frame, textvariable=self.time_budget, width=5).pack(side='left', padx=5)
         ttk.Label(choices_frame, text="Note : n ne doit pas dépasser le nombre d'activités disponibles.", style='Info.TLabel').pack(anchor='w', pady=(0, 5))
 
         # Frame pour les fichiers
@@ -96,13 +148,25 @@ class SatisfierGUI:
         ttk.Entry(file_select_frame2, textvariable=self.choices_path).pack(side='left', fill='x', expand=True, padx=(0, 10))
         ttk.Button(file_select_frame2, text="Parcourir", command=self.browse_choices).pack(side='right')
 
-        # Bouton de traitement
-        process_button = ttk.Button(root, text="Lancer l'optimisation", command=self.process_files)
-        process_button.pack(pady=20)
+        # Boutons de traitement
+        buttons_frame = ttk.Frame(root)
+        buttons_frame.pack(pady=(20, 10))
+        self.process_button = ttk.Button(buttons_frame, text="Lancer l'optimisation", command=self.process_files)
+        self.process_button.pack(side='left', padx=5)
+        self.cancel_button = ttk.Button(buttons_frame, text="Annuler", command=self.cancel_processing,
+                                        state='disabled')
+        self.cancel_button.pack(side='left', padx=5)
         
         # Style du bouton
         style.configure('TButton', font=('Helvetica', 10))
-        process_button.configure(style='TButton')
+        self.process_button.configure(style='TButton')
+        self.cancel_button.configure(style='TButton')
+
+        # Avancement du traitement
+        self.progress_bar = ttk.Progressbar(root, length=500, mode='determinate')
+        self.progress_bar.pack(pady=(0, 5))
+        ttk.Label(root, textvariable=self.status, style='Info.TLabel').pack()
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Ajout de la signature en bas à droite
         signature_frame = ttk.Frame(self.root)
@@ -116,7 +180,14 @@ class SatisfierGUI:
         )
         signature_label.pack(side=tk.RIGHT)
 
+    def start_prewarm(self):
+        """Lance, une seule fois, le préchargement des modules du traitement"""
+        if self.prewarm_thread is None:
+            self.prewarm_thread = threading.Thread(target=_prewarm, name='prewarm', daemon=True)
+            self.prewarm_thread.start()
+
     def browse_activities(self):
+        self.start_prewarm()
         filename = filedialog.askopenfilename(
             title="Sélectionner le fichier des activités",
             filetypes=[
@@ -130,6 +201,7 @@ class SatisfierGUI:
             self.activities_path.set(filename)
 
     def browse_choices(self):
+        self.start_prewarm()
         filename = filedialog.askopenfilename(
             title="Sélectionner le fichier des choix",
             filetypes=[
@@ -142,6 +214,16 @@ class SatisfierGUI:
         if filename:
             self.choices_path.set(filename)
 
+    def load_problem(self, activities_file, choices_file, k):
+        """Charge les fichiers, en passant par le cache des problèmes"""
+        load_data, _, _, ProblemCache = import_pipeline()
+        if self.problem_cache is None:
+            self.problem_cache = ProblemCache()
+        return self.problem_cache.load(
+            activities_file, choices_file, k,
+            lambda: load_data(activities_file, choices_file, k, columnar=True)
+        )
+
     def validate_files(self):
         try:
             # Validation du nombre de choix
@@ -153,6 +235,25 @@ class SatisfierGUI:
                 messagebox.showerror("Erreur", "Le nombre de choix doit être un nombre entier positif")
                 return False
 
+            # Validation des paramètres multi-départ
+            try:
+                if int(self.num_starts.get()) <= 0:
+                    raise ValueError("Le nombre d'essais doit être positif")
+            except ValueError:
+                messagebox.showerror("Erreur", "Le nombre d'essais doit être un nombre entier positif")
+                return False
+
+            if self.seed.get().strip() and not self.seed.get().strip().isdigit():
+                messagebox.showerror("Erreur", "La graine doit être un nombre entier positif")
+                return False
+
+            try:
+                if self.time_budget.get().strip() and float(self.time_budget.get()) <= 0:
+                    raise ValueError("La durée d'amélioration doit être positive")
+            except ValueError:
+                messagebox.showerror("Erreur", "La durée d'amélioration doit être un nombre de secondes positif")
+                return False
+
             # Validation des fichiers
             if not self.activities_path.get():
                 messagebox.showerror("Erreur", "Veuillez sélectionner le fichier des activités")
@@ -162,42 +263,194 @@ class SatisfierGUI:
                 messagebox.showerror("Erreur", "Veuillez sélectionner le fichier des choix")
                 return False
 
-            # Test de lecture des fichiers
-            try:
-                problem = load_data(self.activities_path.get(), self.choices_path.get(), k)
-                return True
-            except Exception as e:
-                messagebox.showerror("Erreur", str(e))
-                return False
+            # La lecture des fichiers est vérifiée par le traitement lui-même
+            return True
 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de la validation des fichiers : {str(e)}")
             return False
 
     def process_files(self):
-        if not self.validate_files():
+        if self.worker is not None or not self.validate_files():
             return
 
-        try:
+        # Les paramètres sont lus ici : le fil de traitement ne touche pas à Tk
+        params = {
+            'activities_file': self.activities_path.get(),
+            'choices_file': self.choices_path.get(),
+            'k': int(self.num_choices.get()),
+            'n_starts': int(self.num_starts.get()),
+            'seed': int(self.seed.get()) if self.seed.get().strip() else None,
+            'time_budget': float(self.time_budget.get()) if self.time_budget.get().strip() else None,
             # Création du dossier resultats si nécessaire
-            output_dir = os.path.join(os.getcwd(), 'resultats')
-            os.makedirs(output_dir, exist_ok=True)
+            'output_dir': os.path.join(os.getcwd(), 'resultats')
+        }
+
+        self.cancel_event = threading.Event()
+        self.started = self.stage_started = time.perf_counter()
+        self.stage = "Démarrage"
+        self.process_button.configure(state='disabled')
+        self.cancel_button.configure(state='normal')
+        self.worker = threading.Thread(target=self._run_pipeline,
+                                       args=(params, self.cancel_event), daemon=True)
+        self.worker.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll_events)
+
+    def cancel_processing(self):
+        """Demande l'arrêt : les essais déjà terminés sont conservés"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button.configure(state='disabled')
+
+    def on_close(self):
+        """
+        Ferme la fenêtre. Un traitement en cours est d'abord annulé, puis la
+        fenêtre n'est détruite qu'une fois son fil terminé (et avec lui le pool
+        de processus des essais), en vérifiant périodiquement.
+        """
+        if self.closing:
+            return
+        self.closing = True
+        self.cancel_processing()
+        self.process_button.configure(state='disabled')
+        if self.worker is not None:
+            self.status.set("Fermeture après l'arrêt du traitement…")
+        self._close_when_idle(self.worker)
+
+    def _close_when_idle(self, worker):
+        if worker is not None and worker.is_alive():
+            self.root.after(POLL_INTERVAL_MS, self._close_when_idle, worker)
+            return
+        self.root.destroy()
+
+    def _run_pipeline(self, params, cancel_event):
+        """Chargement, optimisation et export, exécutés hors du fil de Tk"""
+        events = self.events
+        try:
+            events.put(('stage', "Lecture des fichiers", None))
+            _, generate_results_file, MultiStartOptimizer, _ = import_pipeline()
+            try:
+                problem = self.load_problem(params['activities_file'], params['choices_file'],
+                                            params['k'])
+            except Exception as e:
+                events.put(('error', str(e)))
+                return
+            if cancel_event.is_set():
+                events.put(('cancelled',))
+                return
 
             # Chargement et traitement des données
-            k = int(self.num_choices.get())
-            problem = load_data(self.activities_path.get(), self.choices_path.get(), k)
-            optimizer = SatisfactionOptimizer(problem)
-            solution = optimizer.optimize()
+            events.put(('stage', "Optimisation", params['n_starts']))
+            optimizer = MultiStartOptimizer(
+                problem, n_starts=params['n_starts'],
+                progress=lambda done, total: events.put(('progress', done, total)),
+                cancel_event=cancel_event
+            )
+            if params['time_budget']:
+                # Mode « à tout moment » : la meilleure solution est améliorée jusqu'à la
+                # fin du budget ou jusqu'à l'annulation, et reste toujours disponible
+                for improvement in optimizer.iter_improvements(seed=params['seed'],
+                                                               time_limit=params['time_budget'],
+                                                               cancel_event=cancel_event):
+                    if improvement.iteration == 0:
+                        events.put(('stage', "Amélioration", None))
+                    events.put(('improved', improvement.score))
+                solution = optimizer.problem
+            else:
+                solution = optimizer.optimize(seed=params['seed'])
+
+            # La meilleure solution trouvée est écrite, même après une annulation
+            # (pendant les essais ou pendant l'amélioration)
+            interrupted = cancel_event.is_set()
+            events.put(('stage', "Calcul du résumé", None))
             summary = optimizer.get_solution_summary()
 
             # Génération du fichier de résultats
-            results_file = generate_results_file(solution, summary, output_dir)
-
-            messagebox.showinfo("Succès", 
-                f"L'optimisation est terminée !\nLes résultats ont été sauvegardés dans :\n{results_file}")
+            events.put(('stage', "Écriture du fichier de résultats", None))
+            os.makedirs(params['output_dir'], exist_ok=True)
+            results_file = generate_results_file(solution, summary, params['output_dir'])
 
+            events.put(('done', results_file, optimizer.last_result, params['n_starts'],
+                        summary['satisfaction_score'], interrupted))
         except Exception as e:
-            messagebox.showerror("Erreur", f"Une erreur est survenue : {str(e)}")
+            events.put(('error', f"Une erreur est survenue : {str(e)}"))
+
+    def _poll_events(self):
+        """Traite les messages du fil de traitement puis se replanifie"""
+        if self.closing:
+            # Fenêtre en cours de fermeture : plus de messages ni de boîtes de dialogue
+            return
+        try:
+            while True:
+                self._handle_event(self.events.get_nowait())
+        except queue.Empty:
+            pass
+
+        if self.worker is not None:
+            now = time.perf_counter()
+            self.status.set(f"{self.stage} — étape {now - self.stage_started:.1f} s, "
+                            f"total {now - self.started:.1f} s")
+            self.root.after(POLL_INTERVAL_MS, self._poll_events)
+
+    def _handle_event(self, event):
+        kind = event[0]
+        if kind == 'stage':
+            _, self.stage, total = event
+            self.stage_started = time.perf_counter()
+            self.progress_bar.stop()
+            if total:
+                self.progress_bar.configure(mode='determinate', maximum=total, value=0)
+                self.stage = f"{self.stage} : 0/{total} essais"
+            else:
+                self.progress_bar.configure(mode='indeterminate')
+                self.progress_bar.start(10)
+        elif kind == 'progress':
+            _, done, total = event
+            self.progress_bar.configure(value=done)
+            self.stage = f"Optimisation : {done}/{total} essais"
+        elif kind == 'improved':
+            self.stage = f"Amélioration : meilleur score {event[1]:.2%}"
+        elif kind == 'done':
+            _, results_file, result, n_starts, final_score, interrupted = event
+            elapsed = time.perf_counter() - self.started
+            self._finish(f"Terminé en {elapsed:.1f} s")
+            distribution = result.score_distribution()
+            if result.cancelled:
+                heading = (f"Optimisation interrompue : meilleur résultat conservé "
+                           f"sur {distribution['runs']}/{n_starts} essais.\n")
+            elif interrupted:
+                heading = "Amélioration interrompue : meilleure solution conservée.\n"
+            else:
+                heading = "L'optimisation est terminée !\n"
+            messagebox.showinfo("Succès",
+                f"{heading}"
+                f"Meilleur score : {distribution['best']:.2%} sur {distribution['runs']} essais "
+                f"(moyenne {distribution['mean']:.2%}, graine {result.base_seed})\n"
+                + (f"Score après amélioration : {final_score:.2%}\n"
+                   if final_score > distribution['best'] else "") +
+                f"Les résultats ont été sauvegardés dans :\n{results_file}")
+        elif kind == 'cancelled':
+            self._finish("Traitement annulé")
+            messagebox.showinfo("Annulé", "Le traitement a été annulé avant l'optimisation.")
+        elif kind == 'error':
+            self._finish("")
+            messagebox.showerror("Erreur", event[1])
+
+    def _finish(self, status):
+        """Remet l'interface au repos à la fin du traitement"""
+        self.worker = None
+        self.cancel_event = None
+        self.progress_bar.stop()
+        self.progress_bar.configure(mode='determinate', value=0)
+        self.process_button.configure(state='normal')
+        self.cancel_button.configure(state='disabled')
+        self.status.set(status)
+
+def _report_startup(root):
+    """Affiche le temps d'apparition de la fenêtre puis la ferme"""
+    root.update()
+    print(f"window_seconds={time.perf_counter() - _STARTED:.4f}", flush=True)
+    root.destroy()
 
 def main():
     root = tk.Tk()
@@ -205,7 +458,14 @@ def main():
     # Définir l'icône de la fenêtre
     if os.path.exists('assets/logo.ico'):
         root.iconbitmap('assets/logo.ico')
+    if os.environ.get(STARTUP_PROBE_ENV):
+        root.after_idle(_report_startup, root)
+    else:
+        # Les modules du traitement se chargent pendant que l'utilisateur choisit ses fichiers
+        root.after_idle(app.start_prewarm)
     root.mainloop()
 
 if __name__ == "__main__":
+    # Nécessaire pour les processus de travail dans l'exécutable PyInstaller
+    multiprocessing.freeze_support()
     main()
@@ -1,8 +1,19 @@
 import pandas as pd
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
 from models.data_models import Student, Choice, AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from models.slotted_models import SlottedAssignmentProblem
 from solver.optimizer import SatisfactionOptimizer
+from solver.multistart import MultiStartOptimizer
+import profiling
 import os
 from datetime import datetime
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
 
 def read_file(file_path: str) -> pd.DataFrame:
     """Lit un fichier CSV ou Excel et retourne un DataFrame"""
@@ -20,7 +31,8 @@ def read_file(file_path: str) -> pd.DataFrame:
             return pd.read_csv(file_path, encoding='latin-1')
         raise
 
-def load_data(activities_file: str, choices_file: str, k: int) -> AssignmentProblem:
+def load_data(activities_file: str, choices_file: str, k: int,
+              columnar: bool = False, chunksize: Optional[int] = None) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
     """
     Charge les données depuis les fichiers CSV ou Excel.
     
@@ -44,93 +56,229 @@ def load_data(activities_file: str, choices_file: str, k: int) -> AssignmentProb
     Note: Les noms des colonnes sont flexibles, seul l'ordre est important:
     - Activités: [id, nom, capacité]
     - Choix: [nom étudiant, choix 1, choix 2, ..., choix k]
+
+    Avec columnar=True, retourne directement la représentation en colonnes
+    (ArrayAssignmentProblem) sans créer d'objet par étudiant.
+
+    Avec chunksize, un fichier des choix CSV est lu par blocs de chunksize
+    lignes, validés et encodés au fil de l'eau (voir read_choices_streaming).
     """
     try:
-        # Lecture des fichiers
-        activities_df = read_file(activities_file)
-        choices_df = read_file(choices_file)
-        
-        # Vérification du nombre de colonnes
-        if len(activities_df.columns) != 3:
-            raise ValueError(
-                "Le fichier des activités doit avoir exactement 3 colonnes : "
-                "ID, Nom, et Capacité (dans cet ordre)."
-            )
-        
-        if len(choices_df.columns) != k + 1:
-            raise ValueError(
-                f"Le fichier des choix doit avoir {k + 1} colonnes : "
-                f"Nom de l'étudiant suivi de {k} choix."
-            )
-            
-        # Vérification que k ne dépasse pas le nombre d'activités
-        if k > len(activities_df):
-            raise ValueError(
-                f"Le nombre de choix demandé ({k}) est supérieur au nombre "
-                f"d'activités disponibles ({len(activities_df)})"
-            )
-
-        # Vérification des types de données dans le fichier des activités
-        try:
-            activities_df.iloc[:, 0] = activities_df.iloc[:, 0].astype(int)
-            activities_df.iloc[:, 2] = activities_df.iloc[:, 2].astype(int)
-        except ValueError as e:
-            raise ValueError(
-                "Erreur dans le fichier des activités : "
-                "L'ID et la Capacité doivent être des nombres entiers."
-            ) from e
-
-        # Vérification des types de données dans le fichier des choix
-        try:
-            for i in range(1, k + 1):
-                choices_df.iloc[:, i] = choices_df.iloc[:, i].astype(int)
-        except ValueError as e:
-            raise ValueError(
-                "Erreur dans le fichier des choix : "
-                "Les choix doivent être des nombres entiers correspondant aux IDs des activités."
-            ) from e
-
-        # Vérification que les IDs des choix existent dans les activités
-        activity_ids = set(activities_df.iloc[:, 0])
-        for i in range(1, k + 1):
-            invalid_ids = set(choices_df.iloc[:, i]) - activity_ids
-            if invalid_ids:
-                raise ValueError(
-                    f"Erreur dans les choix : les IDs suivants n'existent pas "
-                    f"dans le fichier des activités : {invalid_ids}"
-                )
-
-        # Création des choix disponibles
-        choices = {
-            int(row.iloc[0]): Choice(
-                int(row.iloc[0]),
-                str(row.iloc[1]),
-                int(row.iloc[2])
-            )
-            for _, row in activities_df.iterrows()
-        }
-        
-        # Création des étudiants avec leurs choix
-        students = []
-        for idx, row in choices_df.iterrows():
-            student_id = idx + 1
-            try:
-                choices_list = [int(row.iloc[i]) for i in range(1, k + 1)]
-            except ValueError as e:
-                raise ValueError(
-                    f"Erreur de format pour l'étudiant {row.iloc[0]}: "
-                    f"les choix doivent être des nombres entiers"
-                ) from e
-            student = Student(student_id, str(row.iloc[0]), choices_list)
-            students.append(student)
-        
-        return AssignmentProblem(students, choices, k)
+        with profiling.span('load_data'):
+            file_ext = os.path.splitext(choices_file)[1].lower()
+            if chunksize is not None and file_ext == '.csv':
+                # Lecture par blocs : le fichier des choix n'est jamais chargé en entier
+                with profiling.span('read_file (activités)'):
+                    activities_df = read_file(activities_file)
+                with profiling.span('validation (activités)'):
+                    activities = _validate_activities(activities_df, k)
+                with profiling.span('read_choices_streaming'):
+                    problem = read_choices_streaming(choices_file, k, activities, chunksize)
+            else:
+                # Lecture des fichiers
+                with profiling.span('read_file (activités)'):
+                    activities_df = read_file(activities_file)
+                with profiling.span('read_file (choix)'):
+                    choices_df = read_file(choices_file)
+                with profiling.span('validation'):
+                    problem = build_problem(activities_df, choices_df, k)
+            profiling.count('students', problem.n_students)
+            if columnar:
+                return problem
+            with profiling.span('to_problem'):
+                return problem.to_problem()
 
     except Exception as e:
         if isinstance(e, ValueError):
             raise
         raise ValueError(f"Une erreur inattendue est survenue : {str(e)}")
 
+def _integer_cells(frame: pd.DataFrame, error_message: str, first_row: int = 0) -> np.ndarray:
+    """
+    Convertit un bloc de colonnes en entiers en une seule passe.
+    L'erreur indique la première cellule invalide (ligne du fichier et colonne) ;
+    first_row est le nombre de lignes de données qui précèdent le bloc.
+    """
+    values = frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    invalid = np.isnan(values) | (values != np.round(values))
+    if invalid.any():
+        row, col = np.argwhere(invalid)[0]
+        value = frame.iat[row, col]
+        found = "cellule vide" if pd.isna(value) else f"valeur « {value} »"
+        raise ValueError(
+            f"{error_message} Cellule en cause : ligne {first_row + row + 2}, "
+            f"colonne « {frame.columns[col]} » ({found})."
+        )
+    return values.astype(np.int64)
+
+@dataclass
+class _Activities:
+    """Activités validées, avec l'index trié des IDs utilisé pour encoder les choix"""
+    ids: np.ndarray
+    names: List[str]
+    capacities: np.ndarray
+    order: np.ndarray
+    sorted_ids: np.ndarray
+
+def _validate_activities(activities_df: pd.DataFrame, k: int) -> _Activities:
+    """Valide le tableau des activités et prépare l'encodage des choix"""
+    # Vérification du nombre de colonnes (une 4e colonne, le site, est facultative)
+    if len(activities_df.columns) not in (3, 4):
+        raise ValueError(
+            "Le fichier des activités doit avoir 3 colonnes : "
+            "ID, Nom, et Capacité (dans cet ordre), plus éventuellement une 4e colonne Site."
+        )
+
+    # Vérification que k ne dépasse pas le nombre d'activités
+    if k > len(activities_df):
+        raise ValueError(
+            f"Le nombre de choix demandé ({k}) est supérieur au nombre "
+            f"d'activités disponibles ({len(activities_df)})"
+        )
+
+    # Vérification des types de données dans le fichier des activités
+    activity_values = _integer_cells(
+        activities_df.iloc[:, [0, 2]],
+        "Erreur dans le fichier des activités : "
+        "L'ID et la Capacité doivent être des nombres entiers."
+    )
+    activity_ids, capacities = activity_values[:, 0], activity_values[:, 1]
+
+    unique_ids, counts = np.unique(activity_ids, return_counts=True)
+    if (counts > 1).any():
+        raise ValueError(
+            f"Erreur dans le fichier des activités : les IDs suivants sont en double : "
+            f"{set(unique_ids[counts > 1].tolist())}"
+        )
+
+    order = np.argsort(activity_ids, kind='stable')
+    return _Activities(
+        ids=activity_ids,
+        names=activities_df.iloc[:, 1].astype(str).tolist(),
+        capacities=capacities,
+        order=order,
+        sorted_ids=activity_ids[order]
+    )
+
+def read_sites(activities_file: str) -> Dict[int, str]:
+    """
+    Lit la 4e colonne (Site) du fichier des activités, utilisée pour résoudre
+    chaque site séparément (voir solver/sharding.py) : retourne {ID d'activité: site}.
+    """
+    activities_df = read_file(activities_file)
+    if len(activities_df.columns) != 4:
+        raise ValueError(
+            "Le fichier des activités n'a pas de colonne Site : "
+            "elle doit être la 4e colonne, après ID, Nom et Capacité."
+        )
+    ids = _integer_cells(
+        activities_df.iloc[:, [0]],
+        "Erreur dans le fichier des activités : L'ID doit être un nombre entier."
+    )[:, 0]
+    sites = activities_df.iloc[:, 3]
+    if sites.isna().any():
+        row = int(np.flatnonzero(sites.isna().to_numpy())[0])
+        raise ValueError(f"Erreur dans le fichier des activités : site manquant ligne {row + 2}.")
+    return dict(zip(ids.tolist(), sites.astype(str).tolist()))
+
+def _check_choice_columns(columns: pd.Index, k: int):
+    if len(columns) != k + 1:
+        raise ValueError(
+            f"Le fichier des choix doit avoir {k + 1} colonnes : "
+            f"Nom de l'étudiant suivi de {k} choix."
+        )
+
+def _encode_choices(choices_df: pd.DataFrame, k: int, activities: _Activities,
+                    first_row: int = 0) -> np.ndarray:
+    """Valide un bloc de lignes du fichier des choix et le traduit en indices d'activités"""
+    # Vérification des types de données dans le fichier des choix
+    choice_values = _integer_cells(
+        choices_df.iloc[:, 1:k + 1],
+        "Erreur dans le fichier des choix : "
+        "Les choix doivent être des nombres entiers correspondant aux IDs des activités.",
+        first_row
+    )
+
+    # Vérification que les IDs des choix existent dans les activités
+    sorted_ids = activities.sorted_ids
+    positions = np.minimum(np.searchsorted(sorted_ids, choice_values), len(sorted_ids) - 1)
+    unknown = sorted_ids[positions] != choice_values
+    if unknown.any():
+        row, col = np.argwhere(unknown)[0]
+        raise ValueError(
+            f"Erreur dans les choix : les IDs suivants n'existent pas "
+            f"dans le fichier des activités : {set(choice_values[unknown].tolist())} "
+            f"(première occurrence ligne {first_row + row + 2}, colonne « {choices_df.columns[col + 1]} »)"
+        )
+    return activities.order[positions].astype(np.int32)
+
+def build_problem(activities_df: pd.DataFrame, choices_df: pd.DataFrame, k: int) -> ArrayAssignmentProblem:
+    """Valide les deux tableaux et construit le problème en colonnes"""
+    activities = _validate_activities(activities_df, k)
+    _check_choice_columns(choices_df.columns, k)
+
+    return ArrayAssignmentProblem(
+        choice_ids=activities.ids,
+        choice_names=activities.names,
+        capacities=activities.capacities,
+        student_ids=np.arange(1, len(choices_df) + 1),
+        student_names=choices_df.iloc[:, 0].astype(str).tolist(),
+        preferences=_encode_choices(choices_df, k, activities),
+        k=k
+    )
+
+def _count_lines(file_path: str, block_size: int = 1 << 20) -> int:
+    """Majorant du nombre de lignes d'un fichier, compté par blocs binaires"""
+    count = 0
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            count += block.count(b'\n')
+    return count + 1
+
+def _stream_choices(file_path: str, k: int, activities: _Activities,
+                    chunksize: int, encoding: str) -> Tuple[np.ndarray, List[str]]:
+    """Lit le fichier des choix par blocs de chunksize lignes dans un tableau préalloué"""
+    _check_choice_columns(pd.read_csv(file_path, encoding=encoding, nrows=0).columns, k)
+
+    # Le nombre de lignes du fichier majore le nombre d'étudiants (en-tête compris)
+    preferences = np.empty((_count_lines(file_path), k), dtype=np.int32)
+    names: List[str] = []
+    n_rows = 0
+    for chunk in pd.read_csv(file_path, encoding=encoding, chunksize=chunksize):
+        size = len(chunk)
+        if n_rows + size > len(preferences):
+            # Retours à la ligne entre guillemets : le majorant était faux
+            preferences = np.resize(preferences, (2 * (n_rows + size), k))
+        preferences[n_rows:n_rows + size] = _encode_choices(chunk, k, activities, n_rows)
+        names.extend(chunk.iloc[:, 0].astype(str).tolist())
+        n_rows += size
+        profiling.count('chunks')
+    return preferences[:n_rows], names
+
+def read_choices_streaming(choices_file: str, k: int, activities: _Activities,
+                           chunksize: int = 100_000) -> ArrayAssignmentProblem:
+    """
+    Construit le problème en lisant le fichier CSV des choix par blocs : la
+    mémoire utilisée est bornée par la taille d'un bloc plus les tableaux finaux.
+    """
+    if chunksize < 1:
+        raise ValueError("La taille des blocs de lecture doit être au moins 1")
+    try:
+        preferences, names = _stream_choices(choices_file, k, activities, chunksize, 'utf-8')
+    except UnicodeDecodeError:
+        # Si l'UTF-8 échoue, essayons avec latin-1
+        preferences, names = _stream_choices(choices_file, k, activities, chunksize, 'latin-1')
+
+    return ArrayAssignmentProblem(
+        choice_ids=activities.ids,
+        choice_names=activities.names,
+        capacities=activities.capacities,
+        student_ids=np.arange(1, len(names) + 1),
+        student_names=names,
+        preferences=preferences,
+        k=k
+    )
+
 def print_example_formats():
     """Affiche les formats attendus des fichiers d'entrée"""
     print("\nFormat attendu pour le fichier des activités:")
@@ -159,51 +307,132 @@ def print_example_formats():
     print("3. Deuxième choix (ID de l'activité)")
     print("etc. jusqu'à k choix")
 
-def generate_results_file(solution: AssignmentProblem, summary: dict, output_dir: str) -> str:
-    """Génère un fichier Excel avec les résultats de l'assignation et les statistiques"""
-    # Préparation des données des étudiants pour le DataFrame
-    results_data = []
-    for student in solution.students:
-        assigned_activity = solution.choices[student.assigned_choice] if student.assigned_choice else None
-        
-        # Déterminer le statut de l'attribution
-        if assigned_activity is None:
-            assignment_status = "Non assigné"
-        elif student.forced_assignment:
-            assignment_status = "Attribution aléatoire"
-        else:
-            choice_position = student.choices.index(student.assigned_choice) + 1
-            assignment_status = f"Choix {choice_position}"
-
-        results_data.append({
-            'Nom': student.name,
-            'Activité assignée': assigned_activity.name if assigned_activity else "Non assigné",
-            'Statut': assignment_status
-        })
-    
-    # Création du DataFrame des résultats
-    results_df = pd.DataFrame(results_data)
-    
-    # Création du nom de fichier avec timestamp
-    timestamp = datetime.now().strftime("%d-%m-%Y_%Hh%Mmin%Ssec")
-    output_file = os.path.join(output_dir, f'resultats_assignation_{timestamp}.xlsx')
-    
+def generate_results_file(solution: Union[AssignmentProblem, ArrayAssignmentProblem,
+                                          SlottedAssignmentProblem],
+                          summary: dict, output_dir: str) -> str:
+    """
+    Génère un fichier Excel avec les résultats de l'assignation et les statistiques
+    (pour un problème sur plusieurs créneaux : une répartition par créneau)
+    """
+    with profiling.span('generate_results_file'):
+        if isinstance(solution, SlottedAssignmentProblem):
+            return _generate_slotted_results_file(solution, summary, output_dir)
+        return _generate_results_file(solution, summary, output_dir)
+
+def _generate_results_file(solution: Union[AssignmentProblem, ArrayAssignmentProblem],
+                           summary: dict, output_dir: str) -> str:
+    """Corps de generate_results_file"""
+    # Les calculs se font sur la représentation en colonnes
+    if not isinstance(solution, ArrayAssignmentProblem):
+        solution = ArrayAssignmentProblem.from_problem(solution)
+
+    # Préparation des données des étudiants
+    activity_names = np.array(solution.choice_names + ["Non assigné"], dtype=object)
+    assignment_status = _assignment_status(solution.assignment, solution.assignment_ranks(),
+                                           solution.forced)
+    assigned_activities = activity_names[solution.assignment]
+    output_file = _results_path(output_dir)
+
     # Préparation des statistiques de satisfaction
-    stats_data = []
-    total_students = len(solution.students)
-    
+    stats_rows = _stats_rows(summary, solution.k)
+
+    # Largeurs des colonnes calculées sur les longueurs des textes (+2 de marge)
+    name_lengths = _text_lengths(solution.student_names)
+    activity_lengths = _text_lengths(activity_names.tolist())
+    assignment_widths = [
+        _column_width('Nom', name_lengths),
+        _column_width('Activité assignée', activity_lengths[np.unique(solution.assignment)]),
+        _column_width('Statut', _text_lengths(np.unique(assignment_status).tolist()))
+    ]
+
+    with profiling.span('écriture du classeur'):
+        # Écriture en flux : les lignes ne sont jamais conservées par openpyxl
+        workbook = Workbook(write_only=True)
+
+        # Onglet des assignations individuelles
+        sheet = _write_only_sheet(workbook, 'Assignations', assignment_widths)
+        sheet.append(_header_cells(sheet, ['Nom', 'Activité assignée', 'Statut']))
+        for row in zip(solution.student_names, assigned_activities.tolist(), assignment_status.tolist()):
+            sheet.append(row)
+
+        # Onglet de la répartition par activité
+        _write_roster_sheet(workbook, 'Répartition par activité', solution, name_lengths)
+
+        # Onglet des statistiques de satisfaction
+        _write_stats_sheet(workbook, stats_rows)
+
+        workbook.save(output_file)
+    return output_file
+
+def _generate_slotted_results_file(solution: SlottedAssignmentProblem, summary: dict,
+                                   output_dir: str) -> str:
+    """
+    Corps de generate_results_file pour plusieurs créneaux : une colonne
+    activité et statut par créneau, puis un onglet de répartition par créneau
+    """
+    activity_names = np.array(solution.choice_names + [""], dtype=object)
+    ranks = solution.assignment_ranks()
+    output_file = _results_path(output_dir)
+    stats_rows = _stats_rows(summary, solution.k, unit="places")
+
+    headers = ['Nom']
+    columns = [solution.student_names]
+    for slot, slot_name in enumerate(solution.slot_names):
+        status = _assignment_status(solution.assignment[:, slot], ranks[:, slot],
+                                    solution.forced[:, slot])
+        status[solution.assignment[:, slot] < 0] = ""
+        headers += [slot_name, f"Statut {slot_name}"]
+        columns += [activity_names[solution.assignment[:, slot]].tolist(), status.tolist()]
+    name_lengths = _text_lengths(solution.student_names)
+    assignment_widths = [_column_width(header, _text_lengths(column))
+                         for header, column in zip(headers, columns)]
+
+    with profiling.span('écriture du classeur'):
+        workbook = Workbook(write_only=True)
+
+        sheet = _write_only_sheet(workbook, 'Assignations', assignment_widths)
+        sheet.append(_header_cells(sheet, headers))
+        for row in zip(*columns):
+            sheet.append(row)
+
+        used_titles = set()
+        for slot, slot_name in enumerate(solution.slot_names):
+            title = _sheet_title(f"Répartition {slot_name}", used_titles)
+            _write_roster_sheet(workbook, title, solution.slot_view(slot), name_lengths)
+
+        _write_stats_sheet(workbook, stats_rows)
+        workbook.save(output_file)
+    return output_file
+
+def _results_path(output_dir: str) -> str:
+    """Nom du fichier de résultats, horodaté"""
+    timestamp = datetime.now().strftime("%d-%m-%Y_%Hh%Mmin%Ssec")
+    return os.path.join(output_dir, f'resultats_assignation_{timestamp}.xlsx')
+
+def _assignment_status(assignment: np.ndarray, ranks: np.ndarray, forced: np.ndarray) -> np.ndarray:
+    """Statut affiché de chaque attribution (choix, attribution aléatoire, non assigné)"""
+    return np.where(
+        assignment < 0, "Non assigné",
+        np.where(forced | (ranks < 0), "Attribution aléatoire",
+                 np.char.add("Choix ", (ranks + 1).astype(str)))
+    ).astype(object)
+
+def _stats_rows(summary: dict, k: int, unit: str = "étudiants") -> List[tuple]:
+    """
+    Lignes de l'onglet des statistiques ; les pourcentages sont rapportés à
+    summary['total_students'] (étudiants, ou places demandées sur plusieurs créneaux)
+    """
+    stats_rows = []
+    total_students = max(summary['total_students'], 1)
+
     # Nombre d'étudiants par choix
     total_satisfied = 0
-    for i in range(1, solution.k + 1):
+    for i in range(1, k + 1):
         choice_key = f"choice_{i}"
         count = summary['choice_distribution'].get(choice_key, 0)
         percentage = (count / total_students) * 100
         total_satisfied += count
-        stats_data.append({
-            'Niveau de satisfaction': f"Choix {i}",
-            'Nombre d\'étudiants': count,
-            'Pourcentage': f"{percentage:.1f}%"
-        })
+        stats_rows.append((f"Choix {i}", count, f"{percentage:.1f}%"))
     
     # Calcul du total des étudiants n'ayant pas eu un de leurs choix
     total_unsatisfied = summary['forced_assignments'] + summary['unassigned']
@@ -212,105 +441,107 @@ def generate_results_file(solution: AssignmentProblem, summary: dict, output_dir
     # Ajout des attributions forcées
     if summary['forced_assignments'] > 0:
         percentage_forced = (summary['forced_assignments'] / total_students) * 100
-        stats_data.append({
-            'Niveau de satisfaction': "Attributions aléatoires (aucun choix satisfait)",
-            'Nombre d\'étudiants': summary['forced_assignments'],
-            'Pourcentage': f"{percentage_forced:.1f}%"
-        })
+        stats_rows.append(("Attributions aléatoires (aucun choix satisfait)",
+                           summary['forced_assignments'], f"{percentage_forced:.1f}%"))
 
     # Ajout des non-assignés
     if summary['unassigned'] > 0:
         percentage_unassigned = (summary['unassigned'] / total_students) * 100
-        stats_data.append({
-            'Niveau de satisfaction': "Non assignés (aucun choix satisfait)",
-            'Nombre d\'étudiants': summary['unassigned'],
-            'Pourcentage': f"{percentage_unassigned:.1f}%"
-        })
+        label = "Non assignés" if unit == "étudiants" else "Places non pourvues"
+        stats_rows.append((f"{label} (aucun choix satisfait)",
+                           summary['unassigned'], f"{percentage_unassigned:.1f}%"))
     
     # Ajout du résumé global de satisfaction
-    stats_data.append({
-        'Niveau de satisfaction': "TOTAL - Choix satisfaits",
-        'Nombre d\'étudiants': total_satisfied,
-        'Pourcentage': f"{(total_satisfied / total_students) * 100:.1f}%"
-    })
-    stats_data.append({
-        'Niveau de satisfaction': "TOTAL - Aucun choix satisfait",
-        'Nombre d\'étudiants': total_unsatisfied,
-        'Pourcentage': f"{percentage_unsatisfied:.1f}%"
-    })
-    
-    # Création du DataFrame des statistiques
-    stats_df = pd.DataFrame(stats_data)
-
-    # Préparation de la répartition par activité
-    activities_students = {}
-    max_students = 0
-    # Collecter les étudiants par activité
-    for activity in solution.choices.values():
-        students_in_activity = [
-            student.name for student in solution.students
-            if student.assigned_choice == activity.id
-        ]
-        activities_students[activity.name] = students_in_activity
-        max_students = max(max_students, len(students_in_activity))
-    
-    # Créer les données pour le DataFrame
-    activities_data = []
-    # D'abord les lignes avec les étudiants
-    for i in range(max_students):
-        row_data = {}
-        for activity_name in activities_students:
-            students = activities_students[activity_name]
-            row_data[activity_name] = students[i] if i < len(students) else ""
-        activities_data.append(row_data)
-    
-    # Créer le DataFrame principal avec les étudiants
-    activities_df = pd.DataFrame(activities_data)
-    
-    # Créer un DataFrame séparé pour les statistiques d'activités
-    stats_rows = []
-    # Ligne pour le nombre d'élèves
-    num_students = {activity: len(students) for activity, students in activities_students.items()}
-    stats_rows.append(num_students)
-    
-    # Ligne pour la capacité
-    capacities = {activity.name: activity.capacity for activity in solution.choices.values()}
-    stats_rows.append(capacities)
-    
-    # Créer le DataFrame des statistiques avec les labels
-    activities_stats_df = pd.DataFrame(stats_rows, index=['Nombre d\'élèves', 'Capacité maximale'])
-    
-    # Écriture dans le fichier Excel
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        # Onglet des assignations individuelles
-        results_df.to_excel(writer, sheet_name='Assignations', index=False)
-        
-        # Onglet de la répartition par activité
-        activities_df.to_excel(writer, sheet_name='Répartition par activité', index=False)
-        
-        # Écrire les statistiques d'activités en dessous
-        start_row = len(activities_df.index) + 2
-        activities_stats_df.to_excel(writer, sheet_name='Répartition par activité', startrow=start_row)
-        
-        # Onglet des statistiques de satisfaction
-        stats_df.to_excel(writer, sheet_name='Statistiques', index=False)
-        
-        # Ajustement automatique de la largeur des colonnes
-        for sheet_name in writer.sheets:
-            worksheet = writer.sheets[sheet_name]
-            for column in worksheet.columns:
-                max_length = 0
-                column = [cell for cell in column]
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-    
-    return output_file
+    stats_rows.append(("TOTAL - Choix satisfaits", total_satisfied,
+                       f"{(total_satisfied / total_students) * 100:.1f}%"))
+    stats_rows.append(("TOTAL - Aucun choix satisfait", total_unsatisfied,
+                       f"{percentage_unsatisfied:.1f}%"))
+    return stats_rows
+
+def _write_roster_sheet(workbook: Workbook, title: str, solution: ArrayAssignmentProblem,
+                        name_lengths: np.ndarray):
+    """Onglet de la répartition par activité, suivi de l'effectif et de la capacité"""
+    # Répartition en une seule passe : un tri stable regroupe les étudiants par
+    # activité en conservant leur ordre
+    order = np.argsort(solution.assignment, kind='stable')
+    bounds = np.searchsorted(solution.assignment[order], np.arange(solution.n_choices + 1))
+    student_names = np.array(solution.student_names, dtype=object)
+    rosters = [student_names[order[bounds[c]:bounds[c + 1]]] for c in range(solution.n_choices)]
+    num_students = np.diff(bounds).tolist()
+    capacities = solution.capacities.tolist()
+
+    roster_widths = [
+        _column_width(name, name_lengths[order[bounds[c]:bounds[c + 1]]])
+        for c, name in enumerate(solution.choice_names)
+    ]
+    # Les statistiques d'activités sont écrites avec leur libellé en première colonne
+    stats_labels = ["Nombre d'élèves", 'Capacité maximale']
+    roster_widths.append(0)
+    roster_widths[0] = max(roster_widths[0], _column_width('', _text_lengths(stats_labels)))
+    for c in range(solution.n_choices):
+        cells = [solution.choice_names[c], str(num_students[c]), str(capacities[c])]
+        roster_widths[c + 1] = max(roster_widths[c + 1], _column_width('', _text_lengths(cells)))
+
+    sheet = _write_only_sheet(workbook, title, roster_widths)
+    sheet.append(_header_cells(sheet, solution.choice_names))
+    max_students = max(num_students, default=0)
+    columns = [roster.tolist() + [None] * (max_students - len(roster)) for roster in rosters]
+    for row in zip(*columns):
+        sheet.append(row)
+
+    # Écrire les statistiques d'activités en dessous
+    sheet.append([])
+    sheet.append(_header_cells(sheet, [None] + solution.choice_names))
+    sheet.append(_header_cells(sheet, [stats_labels[0]]) + num_students)
+    sheet.append(_header_cells(sheet, [stats_labels[1]]) + capacities)
+
+def _write_stats_sheet(workbook: Workbook, stats_rows: List[tuple]):
+    """Onglet des statistiques de satisfaction"""
+    headers = ['Niveau de satisfaction', 'Nombre d\'étudiants', 'Pourcentage']
+    stats_widths = [
+        _column_width(header, _text_lengths([str(row[i]) for row in stats_rows]))
+        for i, header in enumerate(headers)
+    ]
+    sheet = _write_only_sheet(workbook, 'Statistiques', stats_widths)
+    sheet.append(_header_cells(sheet, headers))
+    for row in stats_rows:
+        sheet.append(row)
+
+def _sheet_title(title: str, used: set) -> str:
+    """Titre d'onglet valide pour Excel (31 caractères, sans []:*?/\\), unique"""
+    title = ''.join('-' if c in '[]:*?/\\' else c for c in title)[:31]
+    candidate, suffix = title, 2
+    while candidate.lower() in used:
+        candidate = f"{title[:31 - len(str(suffix)) - 1]}~{suffix}"
+        suffix += 1
+    used.add(candidate.lower())
+    return candidate
+
+def _text_lengths(values: List) -> np.ndarray:
+    """Longueur du texte affiché pour chaque valeur"""
+    return np.fromiter((len(str(value)) for value in values), dtype=np.int64, count=len(values))
+
+def _column_width(header: str, lengths: np.ndarray) -> int:
+    """Largeur d'une colonne : texte le plus long (en-tête compris) plus une marge"""
+    return max(len(header), int(lengths.max()) if len(lengths) else 0) + 2
+
+def _write_only_sheet(workbook: Workbook, title: str, widths: List[int]):
+    """Crée un onglet en écriture seule ; les largeurs doivent précéder la première ligne"""
+    sheet = workbook.create_sheet(title)
+    for position, width in enumerate(widths, start=1):
+        sheet.column_dimensions[get_column_letter(position)].width = width
+    return sheet
+
+_HEADER_FONT = Font(bold=True)
+
+def _header_cells(sheet, values: List) -> List:
+    """Cellules d'en-tête en gras, comme celles écrites par pandas"""
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.font = _HEADER_FONT
+        cells.append(cell)
+    return cells
 
 def main():
     # Chemins des fichiers
@@ -324,13 +555,45 @@ def main():
     
     # Nombre de choix par étudiant
     k = 3
+
+    # Nombre d'essais de l'algorithme (multi-départ) et graine pour rejouer une exécution
+    n_starts = 8
+    seed = None
+
+    # Pré-passe d'admission : le moins possible d'étudiants hors de leurs choix, puis
+    # les meilleurs rangs (plus lente que le glouton, voir solver/admission.py)
+    admission = False
+
+    # Durée (secondes) d'amélioration de la meilleure solution après le multi-départ
+    # (None : aucune) ; Ctrl+C l'arrête en conservant la meilleure solution trouvée
+    time_budget = None
+
+    # Taille des blocs de lecture d'un fichier des choix CSV
+    chunksize = 100_000
+
+    # Profilage des étapes (durées, compteurs) et, plus coûteux, des allocations
+    profile = False
+    profile_allocations = False
+    if profile:
+        profiler = profiling.enable(track_allocations=profile_allocations)
     
     # Chargement des données
-    problem = load_data(activities_file, choices_file, k)
+    problem = load_data(activities_file, choices_file, k, columnar=True, chunksize=chunksize)
     
     # Création et exécution de l'optimiseur
-    optimizer = SatisfactionOptimizer(problem)
-    solution = optimizer.optimize()
+    optimizer = MultiStartOptimizer(problem, n_starts=n_starts, admission=admission)
+    if time_budget:
+        improvement = None
+        try:
+            for improvement in optimizer.iter_improvements(seed=seed, time_limit=time_budget):
+                print(f"{improvement.elapsed:.1f} s : score {improvement.score:.2%} ({improvement.source})")
+        except KeyboardInterrupt:
+            if improvement is None:
+                raise
+            print("Amélioration interrompue : la meilleure solution trouvée est conservée")
+        solution = optimizer.problem
+    else:
+        solution = optimizer.optimize(seed=seed)
     
     # Obtention du résumé
     summary = optimizer.get_solution_summary()
@@ -346,13 +609,34 @@ def main():
         print(f"{choice_level}: {count} étudiants")
     if summary['unassigned'] > 0:
         print(f"Non assignés: {summary['unassigned']} étudiants")
+    if optimizer.last_admission is not None:
+        report = optimizer.last_admission
+        print(f"Admission : {report.on_choice} étudiants sur un de leurs choix "
+              f"({report.greedy_on_choice} sans la pré-passe) ; minimum prouvé de "
+              f"{report.forced_lower_bound} attributions forcées et "
+              f"{report.unassigned_lower_bound} non assignés")
+
+    result = optimizer.last_result
+    distribution = result.score_distribution()
+    print(f"\nMulti-départ : {distribution['runs']} essais (graine {result.base_seed})")
+    print(f"Meilleure graine : {result.best_seed}")
+    print(f"Scores : meilleur {distribution['best']:.2%}, moyen {distribution['mean']:.2%}, "
+          f"pire {distribution['worst']:.2%}")
     
     print("\nAssignations détaillées :")
-    for student in solution.students:
-        assigned = solution.choices[student.assigned_choice].name if student.assigned_choice else "Non assigné"
-        print(f"{student.name} -> {assigned}")
+    activity_names = solution.choice_names + ["Non assigné"]
+    for name, choice_idx in zip(solution.student_names, solution.assignment.tolist()):
+        print(f"{name} -> {activity_names[choice_idx]}")
     
     print(f"\nLes résultats ont été sauvegardés dans : {results_file}")
 
+    if profile:
+        profiling.disable()
+        trace_file = os.path.splitext(results_file)[0] + '_profil.json'
+        profiler.export_json(trace_file)
+        print("\nProfil d'exécution :")
+        print(profiler.breakdown())
+        print(f"Trace JSON : {trace_file}")
+
 if __name__ == "__main__":
     main()
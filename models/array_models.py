@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from typing import List, Dict
+import numpy as np
+from models.data_models import Student, Choice, AssignmentProblem
+from models import scoring
+
+@dataclass
+class ArrayAssignmentProblem:
+    """
+    Représentation en colonnes (tableaux NumPy) du problème d'attribution.
+
+    Les activités et les étudiants sont désignés par leur position dans les
+    tableaux ; les identifiants d'origine sont conservés dans choice_ids et
+    student_ids pour la conversion vers les dataclasses.
+    """
+    choice_ids: np.ndarray  # (m,) identifiants des activités
+    choice_names: List[str]
+    capacities: np.ndarray  # (m,) int32
+    student_ids: np.ndarray  # (n,) identifiants des étudiants
+    student_names: List[str]
+    preferences: np.ndarray  # (n, k) int32, indices d'activités ordonnés, -1 = pas de choix
+    k: int  # Nombre de choix par étudiant
+    assignment: np.ndarray = None  # (n,) int32, indice de l'activité attribuée, -1 = non assigné
+    forced: np.ndarray = None  # (n,) bool, masque des attributions forcées
+    occupancy: np.ndarray = None  # (m,) int32, nombre d'étudiants par activité
+
+    def __post_init__(self):
+        self.choice_ids = np.asarray(self.choice_ids, dtype=np.int64)
+        self.capacities = np.asarray(self.capacities, dtype=np.int32)
+        self.student_ids = np.asarray(self.student_ids, dtype=np.int64)
+        self.preferences = np.asarray(self.preferences, dtype=np.int32).reshape(-1, self.k)
+        if self.assignment is None:
+            self.assignment = np.full(self.n_students, -1, dtype=np.int32)
+        if self.forced is None:
+            self.forced = np.zeros(self.n_students, dtype=bool)
+        if self.occupancy is None:
+            self.occupancy = np.zeros(self.n_choices, dtype=np.int32)
+            self.recompute_occupancy()
+
+    @property
+    def n_students(self) -> int:
+        return self.preferences.shape[0]
+
+    @property
+    def n_choices(self) -> int:
+        return len(self.choice_ids)
+
+    def choice_index(self) -> Dict[int, int]:
+        """Retourne la correspondance identifiant d'activité -> position"""
+        return {choice_id: i for i, choice_id in enumerate(self.choice_ids.tolist())}
+
+    def reset_assignments(self):
+        """Réinitialise toutes les attributions"""
+        self.assignment.fill(-1)
+        self.forced.fill(False)
+        self.occupancy.fill(0)
+
+    def recompute_occupancy(self):
+        """Recalcule l'occupation des activités à partir du vecteur d'attribution"""
+        assigned = self.assignment[self.assignment >= 0]
+        self.occupancy[:] = np.bincount(assigned, minlength=self.n_choices)
+
+    def assignment_ranks(self) -> np.ndarray:
+        """Rang (0-indexé) de l'activité attribuée dans les choix, -1 si absente ou non assigné"""
+        return scoring.assignment_ranks(self.preferences, self.assignment)
+
+    def get_satisfaction_score(self) -> float:
+        """Calcule le score de satisfaction global"""
+        return scoring.score_assignments(self.preferences, self.assignment, self.forced, self.k)
+
+    @classmethod
+    def from_problem(cls, problem: AssignmentProblem) -> 'ArrayAssignmentProblem':
+        """Construit la vue en colonnes à partir des dataclasses (attributions comprises)"""
+        choices = list(problem.choices.values())
+        index = {choice.id: i for i, choice in enumerate(choices)}
+        n_students = len(problem.students)
+
+        preferences = np.full((n_students, problem.k), -1, dtype=np.int32)
+        assignment = np.full(n_students, -1, dtype=np.int32)
+        forced = np.zeros(n_students, dtype=bool)
+        for i, student in enumerate(problem.students):
+            row = [index[choice_id] for choice_id in student.choices[:problem.k]]
+            preferences[i, :len(row)] = row
+            if student.assigned_choice is not None:
+                assignment[i] = index[student.assigned_choice]
+                forced[i] = student.forced_assignment
+
+        return cls(
+            choice_ids=np.array([choice.id for choice in choices], dtype=np.int64),
+            choice_names=[choice.name for choice in choices],
+            capacities=np.array([choice.capacity for choice in choices], dtype=np.int32),
+            student_ids=np.array([student.id for student in problem.students], dtype=np.int64),
+            student_names=[student.name for student in problem.students],
+            preferences=preferences,
+            k=problem.k,
+            assignment=assignment,
+            forced=forced
+        )
+
+    def to_problem(self) -> AssignmentProblem:
+        """Reconstruit la vue dataclass (attributions comprises)"""
+        choice_ids = self.choice_ids.tolist()
+        choices = {
+            choice_id: Choice(choice_id, name, capacity)
+            for choice_id, name, capacity in zip(choice_ids, self.choice_names,
+                                                 self.capacities.tolist())
+        }
+        students = [
+            Student(student_id, name, [choice_ids[c] for c in row if c >= 0])
+            for student_id, name, row in zip(self.student_ids.tolist(), self.student_names,
+                                             self.preferences.tolist())
+        ]
+        problem = AssignmentProblem(students, choices, self.k)
+        self.apply_to(problem)
+        return problem
+
+    def apply_to(self, problem: AssignmentProblem):
+        """Recopie les attributions dans un problème dataclass de mêmes dimensions"""
+        choice_ids = self.choice_ids.tolist()
+        for choice in problem.choices.values():
+            choice.assigned_students = []
+        for student, choice_idx, is_forced in zip(problem.students, self.assignment.tolist(),
+                                                  self.forced.tolist()):
+            if choice_idx < 0:
+                student.assigned_choice = None
+                student.forced_assignment = False
+                continue
+            choice_id = choice_ids[choice_idx]
+            student.assigned_choice = choice_id
+            student.forced_assignment = is_forced
+            problem.choices[choice_id].assigned_students.append(student.id)
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict
 
 @dataclass
@@ -8,6 +8,7 @@ class Choice:
     name: str
     capacity: int
     assigned_students: List[int] = None
+    slot_capacities: List[int] = None  # Capacité à chaque créneau (None : capacity à chaque créneau)
 
     def __post_init__(self):
         if self.assigned_students is None:
@@ -21,6 +22,9 @@ class Student:
     choices: List[int]  # Liste ordonnée des IDs des choix
     assigned_choice: int = None
     forced_assignment: bool = False  # Ajout de l'attribut forced_assignment avec une valeur par défaut
+    slot_demand: int = None  # Nombre de créneaux à remplir (None : tous)
+    assigned_slots: List[int] = None  # ID de l'activité attribuée à chaque créneau (None : libre)
+    forced_slots: List[bool] = None  # Attribution forcée à chaque créneau
 
 @dataclass
 class AssignmentProblem:
@@ -54,3 +58,11 @@ class AssignmentProblem:
                     total_score += 0.1
                 
         return total_score / total_students
+
+@dataclass
+class ProblemDelta:
+    """Modifications à appliquer à un problème déjà résolu (inscriptions tardives, désistements...)"""
+    added_students: List[Student] = field(default_factory=list)
+    removed_students: List[int] = field(default_factory=list)  # IDs des étudiants retirés
+    capacity_changes: Dict[int, int] = field(default_factory=dict)  # ID d'activité -> nouvelle capacité
+    preference_changes: Dict[int, List[int]] = field(default_factory=dict)  # ID d'étudiant -> nouveaux choix
@@ -0,0 +1,95 @@
+"""
+Calcul vectorisé du score de satisfaction et du résumé des solutions.
+
+Toutes les fonctions acceptent un vecteur d'attribution (n,) ou une pile de
+solutions candidates (s, n) : le rang de chaque attribution est calculé une
+seule fois, puis le score, l'histogramme des rangs, le nombre d'attributions
+forcées et le nombre de non-assignés en sont dérivés.
+"""
+from typing import Dict, List, Tuple, Union
+import numpy as np
+
+# Score d'une attribution forcée (ou hors des choix de l'étudiant)
+FORCED_SCORE = 0.1
+
+# Facteur d'échelle rendant entiers les scores (utilisé par les moteurs exacts)
+WEIGHT_SCALE = 20
+
+
+def integer_weights(k: int, scale: int = WEIGHT_SCALE) -> Tuple[List[int], int]:
+    """
+    Poids entiers proportionnels au score : scale * (k - r) pour le choix de rang r
+    (0-indexé), soit scale * k * score. Une attribution forcée vaut 0.1 * scale * k,
+    plafonné sous le poids du dernier choix pour k >= 10 afin de toujours préférer
+    un choix exprimé. Retourne (poids par rang, poids d'une attribution forcée).
+    """
+    return [scale * (k - rank) for rank in range(k)], min(scale * k // 10, scale - 1)
+
+
+def assignment_ranks(preferences: np.ndarray, assignments: np.ndarray) -> np.ndarray:
+    """
+    Rang (0-indexé) de l'activité attribuée dans les choix de chaque étudiant.
+    Retourne -1 pour les non-assignés et les activités absentes des choix.
+    """
+    assignments = np.asarray(assignments)
+    ranks = np.full(assignments.shape, -1, dtype=np.int32)
+    # Parcours à rebours : la première occurrence d'une activité l'emporte
+    for rank in range(preferences.shape[1] - 1, -1, -1):
+        ranks[assignments == preferences[:, rank]] = rank
+    ranks[assignments < 0] = -1
+    return ranks
+
+
+def rank_counts(ranks: np.ndarray, assigned: np.ndarray, forced: np.ndarray, k: int) -> np.ndarray:
+    """
+    Histogramme par solution : colonnes 0..k-1 pour les rangs, colonne k pour
+    les attributions forcées et colonne k+1 pour les non-assignés.
+    """
+    categories = np.where(~assigned, k + 1, np.where(forced | (ranks < 0), k, ranks))
+    categories = np.atleast_2d(categories)
+    offsets = np.arange(categories.shape[0])[:, None] * (k + 2)
+    counts = np.bincount((categories + offsets).ravel(), minlength=categories.shape[0] * (k + 2))
+    counts = counts.reshape(categories.shape[0], k + 2)
+    return counts if np.ndim(ranks) > 1 else counts[0]
+
+
+def score_from_counts(counts: np.ndarray, k: int) -> Union[float, np.ndarray]:
+    """Score de satisfaction à partir de l'histogramme produit par rank_counts"""
+    weights = np.concatenate([(k - np.arange(k)) / k, [FORCED_SCORE, 0.0]])
+    total_students = counts.sum(axis=-1)
+    scores = (counts @ weights) / np.maximum(total_students, 1)
+    return scores if np.ndim(scores) else float(scores)
+
+
+def score_assignments(preferences: np.ndarray, assignments: np.ndarray,
+                      forced: np.ndarray, k: int) -> Union[float, np.ndarray]:
+    """Score de satisfaction d'une solution (n,) ou d'une pile de solutions (s, n)"""
+    ranks = assignment_ranks(preferences, assignments)
+    counts = rank_counts(ranks, np.asarray(assignments) >= 0, np.asarray(forced), k)
+    return score_from_counts(counts, k)
+
+
+def summarize_assignments(preferences: np.ndarray, assignments: np.ndarray,
+                          forced: np.ndarray, k: int) -> Union[Dict, List[Dict]]:
+    """
+    Résumé au format de SatisfactionOptimizer.get_solution_summary pour une
+    solution (n,), ou liste de résumés pour une pile de solutions (s, n).
+    """
+    ranks = assignment_ranks(preferences, assignments)
+    counts = rank_counts(ranks, np.asarray(assignments) >= 0, np.asarray(forced), k)
+    scores = score_from_counts(counts, k)
+
+    summaries = [
+        {
+            "total_students": int(row.sum()),
+            "satisfaction_score": float(score),
+            "choice_distribution": {
+                f"choice_{position + 1}": int(count)
+                for position, count in enumerate(row[:k].tolist()) if count
+            },
+            "unassigned": int(row[k + 1]),
+            "forced_assignments": int(row[k])
+        }
+        for row, score in zip(np.atleast_2d(counts), np.atleast_1d(scores))
+    ]
+    return summaries if counts.ndim > 1 else summaries[0]
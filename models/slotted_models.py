@@ -0,0 +1,204 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from models import scoring
+
+@dataclass
+class SlottedAssignmentProblem:
+    """
+    Problème d'attribution sur plusieurs créneaux, en colonnes.
+
+    Chaque étudiant reçoit au plus une activité par créneau, jamais deux fois
+    la même, et demand[i] activités au total ; chaque activité a une capacité
+    par créneau. Les choix (n, k) valent pour l'ensemble du programme.
+    """
+    choice_ids: np.ndarray  # (m,) identifiants des activités
+    choice_names: List[str]
+    capacities: np.ndarray  # (m, s) int32, capacité de chaque activité à chaque créneau
+    student_ids: np.ndarray  # (n,) identifiants des étudiants
+    student_names: List[str]
+    preferences: np.ndarray  # (n, k) int32, indices d'activités ordonnés, -1 = pas de choix
+    k: int  # Nombre de choix par étudiant
+    slot_names: List[str]
+    demand: np.ndarray = None  # (n,) int32, nombre de créneaux à remplir (par défaut : tous)
+    assignment: np.ndarray = None  # (n, s) int32, activité attribuée à chaque créneau, -1 = aucune
+    forced: np.ndarray = None  # (n, s) bool, masque des attributions forcées
+    occupancy: np.ndarray = None  # (m, s) int32, nombre d'étudiants par activité et créneau
+
+    def __post_init__(self):
+        self.choice_ids = np.asarray(self.choice_ids, dtype=np.int64)
+        self.capacities = np.asarray(self.capacities, dtype=np.int32).reshape(len(self.choice_ids), -1)
+        self.student_ids = np.asarray(self.student_ids, dtype=np.int64)
+        self.preferences = np.asarray(self.preferences, dtype=np.int32).reshape(-1, self.k)
+        if self.capacities.shape[1] != self.n_slots:
+            raise ValueError(
+                f"{self.capacities.shape[1]} capacités par activité pour {self.n_slots} créneaux"
+            )
+        if self.demand is None:
+            self.demand = np.full(self.n_students, self.n_slots, dtype=np.int32)
+        self.demand = np.asarray(self.demand, dtype=np.int32)
+        if len(self.demand) and (self.demand.min() < 0 or self.demand.max() > self.n_slots):
+            raise ValueError(
+                f"La demande de chaque étudiant doit être comprise entre 0 et {self.n_slots} créneaux"
+            )
+        if self.assignment is None:
+            self.assignment = np.full((self.n_students, self.n_slots), -1, dtype=np.int32)
+        if self.forced is None:
+            self.forced = np.zeros((self.n_students, self.n_slots), dtype=bool)
+        if self.occupancy is None:
+            self.occupancy = np.zeros((self.n_choices, self.n_slots), dtype=np.int32)
+            self.recompute_occupancy()
+
+    @property
+    def n_students(self) -> int:
+        return self.preferences.shape[0]
+
+    @property
+    def n_choices(self) -> int:
+        return len(self.choice_ids)
+
+    @property
+    def n_slots(self) -> int:
+        return len(self.slot_names)
+
+    def reset_assignments(self):
+        """Réinitialise toutes les attributions"""
+        self.assignment.fill(-1)
+        self.forced.fill(False)
+        self.occupancy.fill(0)
+
+    def recompute_occupancy(self):
+        """Recalcule l'occupation des activités à partir de la matrice d'attribution"""
+        for slot in range(self.n_slots):
+            column = self.assignment[:, slot]
+            self.occupancy[:, slot] = np.bincount(column[column >= 0], minlength=self.n_choices)
+
+    def assignment_ranks(self) -> np.ndarray:
+        """Rang (0-indexé) de chaque attribution dans les choix, (n, s), -1 si absente ou vide"""
+        return np.stack([scoring.assignment_ranks(self.preferences, self.assignment[:, slot])
+                         for slot in range(self.n_slots)], axis=1).reshape(self.n_students, self.n_slots)
+
+    def get_satisfaction_score(self) -> float:
+        """Score de satisfaction moyen par place demandée"""
+        return self.summary()["satisfaction_score"]
+
+    def summary(self) -> Dict:
+        """
+        Résumé au format de SatisfactionOptimizer.get_solution_summary, compté
+        en places demandées (étudiant, créneau) : total_students est le nombre
+        de places demandées et unassigned celles restées vides. La clé slots
+        détaille chaque créneau.
+        """
+        ranks = self.assignment_ranks()
+        assigned = self.assignment >= 0
+        counts = scoring.rank_counts(ranks.T, assigned.T, self.forced.T, self.k)
+        # Les créneaux libres d'un étudiant qui n'en demandait pas autant ne sont pas des manques
+        counts[:, self.k + 1] = 0
+        missing = self.demand - assigned.sum(axis=1)
+        total = counts.sum(axis=0)
+        total[self.k + 1] = int(np.maximum(missing, 0).sum())
+
+        summary = _summary_from_counts(total, self.k)
+        summary["slots"] = {
+            name: _summary_from_counts(row, self.k) for name, row in zip(self.slot_names, counts)
+        }
+        return summary
+
+    def slot_view(self, slot: int) -> ArrayAssignmentProblem:
+        """Un créneau sous forme de problème à une activité par étudiant (tableaux partagés)"""
+        return ArrayAssignmentProblem(
+            choice_ids=self.choice_ids,
+            choice_names=self.choice_names,
+            capacities=self.capacities[:, slot],
+            student_ids=self.student_ids,
+            student_names=self.student_names,
+            preferences=self.preferences,
+            k=self.k,
+            assignment=self.assignment[:, slot],
+            forced=self.forced[:, slot]
+        )
+
+    @classmethod
+    def from_columns(cls, problem: ArrayAssignmentProblem, slot_names: Sequence[str],
+                     slot_capacities: Optional[np.ndarray] = None,
+                     demand: Optional[np.ndarray] = None) -> 'SlottedAssignmentProblem':
+        """
+        Étend un problème en colonnes à plusieurs créneaux. Sans slot_capacities
+        (m, s), chaque activité garde sa capacité à chaque créneau ; sans demand,
+        chaque étudiant remplit tous les créneaux.
+        """
+        slot_names = [str(name) for name in slot_names]
+        if slot_capacities is None:
+            slot_capacities = np.repeat(problem.capacities[:, None], len(slot_names), axis=1)
+        return cls(
+            choice_ids=problem.choice_ids,
+            choice_names=list(problem.choice_names),
+            capacities=slot_capacities,
+            student_ids=problem.student_ids,
+            student_names=list(problem.student_names),
+            preferences=problem.preferences,
+            k=problem.k,
+            slot_names=slot_names,
+            demand=demand
+        )
+
+    @classmethod
+    def from_problem(cls, problem: AssignmentProblem,
+                     slot_names: Sequence[str]) -> 'SlottedAssignmentProblem':
+        """
+        Construit le problème à partir des dataclasses : Choice.slot_capacities
+        (par défaut la capacité à chaque créneau) et Student.slot_demand (par
+        défaut tous les créneaux).
+        """
+        columns = ArrayAssignmentProblem.from_problem(problem)
+        n_slots = len(slot_names)
+        choices = list(problem.choices.values())
+        for choice in choices:
+            if choice.slot_capacities is not None and len(choice.slot_capacities) != n_slots:
+                raise ValueError(
+                    f"L'activité {choice.id} a {len(choice.slot_capacities)} capacités "
+                    f"pour {n_slots} créneaux"
+                )
+        slot_capacities = np.array([
+            choice.slot_capacities if choice.slot_capacities is not None else [choice.capacity] * n_slots
+            for choice in choices
+        ], dtype=np.int32).reshape(len(choices), n_slots)
+        demand = np.array([
+            n_slots if student.slot_demand is None else student.slot_demand
+            for student in problem.students
+        ], dtype=np.int32)
+        return cls.from_columns(columns, slot_names, slot_capacities, demand)
+
+    def apply_to(self, problem: AssignmentProblem):
+        """
+        Recopie les attributions dans un problème dataclass de mêmes dimensions :
+        Student.assigned_slots et Student.forced_slots (un élément par créneau,
+        None pour un créneau libre) ; Choice.assigned_students liste les
+        étudiants inscrits à l'activité, tous créneaux confondus.
+        """
+        choice_ids = self.choice_ids.tolist()
+        for choice in problem.choices.values():
+            choice.assigned_students = []
+        for student, row, forced_row in zip(problem.students, self.assignment.tolist(),
+                                            self.forced.tolist()):
+            student.assigned_slots = [choice_ids[c] if c >= 0 else None for c in row]
+            student.forced_slots = [f if c >= 0 else None for c, f in zip(row, forced_row)]
+            for choice_idx in row:
+                if choice_idx >= 0:
+                    problem.choices[choice_ids[choice_idx]].assigned_students.append(student.id)
+
+
+def _summary_from_counts(counts: np.ndarray, k: int) -> Dict:
+    """Résumé d'un histogramme de rangs (voir scoring.rank_counts)"""
+    return {
+        "total_students": int(counts.sum()),
+        "satisfaction_score": float(scoring.score_from_counts(counts, k)),
+        "choice_distribution": {
+            f"choice_{position + 1}": int(count)
+            for position, count in enumerate(counts[:k].tolist()) if count
+        },
+        "unassigned": int(counts[k + 1]),
+        "forced_assignments": int(counts[k])
+    }
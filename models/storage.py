@@ -0,0 +1,215 @@
+"""
+Sauvegarde binaire compacte des problèmes en colonnes.
+
+Le format .npz ne contient que des tableaux NumPy (les noms sont stockés dans
+la même table de chaînes UTF-8 que le format .satb, voir plus bas) : le
+rechargement n'utilise pas pickle et ne dépend ni de pandas ni d'openpyxl.
+
+Le format .satb est projeté en mémoire (numpy.memmap) : une en-tête, puis des
+sections alignées (identifiants et capacités des activités, identifiants des
+étudiants, matrice des choix, attributions, table des noms). Le chargement ne
+copie pas les tableaux, qui sont lus directement dans le fichier, et plusieurs
+processus peuvent projeter le même fichier en même temps. Les noms sont
+stockés une seule fois chacun (table de chaînes UTF-8) et désignés par indice.
+"""
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from models.array_models import ArrayAssignmentProblem
+
+# Version du format, à incrémenter si les tableaux enregistrés changent
+FORMAT_VERSION = 2
+
+
+def save_npz(problem: ArrayAssignmentProblem, file) -> None:
+    """
+    Enregistre le problème (attributions comprises) dans un fichier .npz. Les
+    noms ne sont pas des chaînes de taille fixe (un seul nom long gonflerait
+    tout le tableau) mais des indices dans une table UTF-8 de noms distincts.
+    """
+    (choice_names, student_names), name_offsets, name_data = _string_table(
+        [str(name) for name in problem.choice_names], [str(name) for name in problem.student_names])
+    np.savez(
+        file,
+        version=np.array(FORMAT_VERSION),
+        k=np.array(problem.k),
+        choice_ids=problem.choice_ids,
+        choice_names=choice_names,
+        capacities=problem.capacities,
+        student_ids=problem.student_ids,
+        student_names=student_names,
+        name_offsets=name_offsets,
+        name_data=name_data,
+        preferences=problem.preferences,
+        assignment=problem.assignment,
+        forced=problem.forced
+    )
+
+
+def load_npz(file) -> ArrayAssignmentProblem:
+    """Recharge un problème enregistré par save_npz"""
+    with np.load(file, allow_pickle=False) as data:
+        version = int(data['version'])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Version de format non supportée : {version}")
+        table_names = _decode_names(data['name_offsets'], data['name_data'])
+        return ArrayAssignmentProblem(
+            choice_ids=data['choice_ids'],
+            choice_names=[table_names[i] for i in data['choice_names'].tolist()],
+            capacities=data['capacities'],
+            student_ids=data['student_ids'],
+            student_names=[table_names[i] for i in data['student_names'].tolist()],
+            preferences=data['preferences'],
+            k=int(data['k']),
+            assignment=data['assignment'],
+            forced=data['forced']
+        )
+
+
+# Format projeté en mémoire
+BINARY_EXTENSION = '.satb'
+BINARY_MAGIC = b'SATPROB\0'
+BINARY_VERSION = 1
+# Sections dans l'ordre du fichier, avec leur type
+_SECTIONS = (
+    ('choice_ids', np.int64),
+    ('capacities', np.int32),
+    ('student_ids', np.int64),
+    ('preferences', np.int32),
+    ('assignment', np.int32),
+    ('forced', np.bool_),
+    ('choice_names', np.int32),  # Indices dans la table des noms
+    ('student_names', np.int32),
+    ('name_offsets', np.int64),  # Début de chaque nom dans name_data, plus la fin
+    ('name_data', np.uint8),  # Noms encodés en UTF-8, mis bout à bout
+)
+# magie, version, k, étudiants, activités, noms distincts, puis (début, taille) par section
+_HEADER = struct.Struct('<8sIIQQQ' + 'QQ' * len(_SECTIONS))
+_ALIGNMENT = 64
+
+
+def _string_table(*columns: List[str]) -> Tuple[List[np.ndarray], np.ndarray, np.ndarray]:
+    """Indices de chaque chaîne dans une table commune où chacune n'apparaît qu'une fois"""
+    table: Dict[str, int] = {}
+    indices = [np.fromiter((table.setdefault(value, len(table)) for value in column),
+                           dtype=np.int32, count=len(column)) for column in columns]
+    encoded = [value.encode('utf-8') for value in table]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return indices, offsets, data
+
+
+def _decode_names(offsets: np.ndarray, data: np.ndarray) -> List[str]:
+    """Décode une fois chaque nom distinct de la table"""
+    offsets = offsets.tolist()
+    raw = data.tobytes()
+    return [raw[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+
+def save_binary(problem: ArrayAssignmentProblem, path: str) -> None:
+    """
+    Enregistre le problème (attributions comprises) au format .satb.
+    Le fichier est écrit à côté puis renommé : un processus qui projette
+    l'ancienne version n'en voit jamais une à moitié écrite.
+    """
+    (choice_names, student_names), name_offsets, name_data = _string_table(
+        [str(name) for name in problem.choice_names], [str(name) for name in problem.student_names])
+    arrays = {
+        'choice_ids': problem.choice_ids,
+        'capacities': problem.capacities,
+        'student_ids': problem.student_ids,
+        'preferences': problem.preferences,
+        'assignment': problem.assignment,
+        'forced': problem.forced,
+        'choice_names': choice_names,
+        'student_names': student_names,
+        'name_offsets': name_offsets,
+        'name_data': name_data,
+    }
+
+    table = []
+    position = _HEADER.size
+    for name, dtype in _SECTIONS:
+        position = -(-position // _ALIGNMENT) * _ALIGNMENT
+        size = np.ascontiguousarray(arrays[name], dtype=dtype).nbytes
+        table.extend((position, size))
+        position += size
+    header = _HEADER.pack(BINARY_MAGIC, BINARY_VERSION, problem.k, problem.n_students,
+                          problem.n_choices, len(name_offsets) - 1, *table)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(header)
+            for (name, dtype), start in zip(_SECTIONS, table[0::2]):
+                f.write(b'\0' * (start - f.tell()))
+                f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def load_binary(path: str, names: bool = True) -> ArrayAssignmentProblem:
+    """
+    Projette en mémoire un fichier .satb. La matrice des choix, les capacités
+    et les identifiants sont des vues en lecture seule sur le fichier ; les
+    attributions sont copiées pour pouvoir être modifiées. Avec names=False,
+    la table des noms n'est pas décodée (listes de noms vides), ce qui suffit
+    pour optimiser.
+    """
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    if len(data) < _HEADER.size:
+        raise ValueError(f"Fichier de problème binaire invalide : {path}")
+    magic, version, k, n_students, n_choices, n_names, *table = _HEADER.unpack(
+        data[:_HEADER.size].tobytes())
+    if magic != BINARY_MAGIC:
+        raise ValueError(f"Fichier de problème binaire invalide : {path}")
+    if version != BINARY_VERSION:
+        raise ValueError(f"Version de format non supportée : {version}")
+
+    shapes = {
+        'choice_ids': (n_choices,), 'capacities': (n_choices,), 'student_ids': (n_students,),
+        'preferences': (n_students, k), 'assignment': (n_students,), 'forced': (n_students,),
+        'choice_names': (n_choices,), 'student_names': (n_students,),
+        'name_offsets': (n_names + 1,), 'name_data': None,
+    }
+    sections = {}
+    for (name, dtype), start, size in zip(_SECTIONS, table[0::2], table[1::2]):
+        shape = shapes[name] if shapes[name] is not None else (size // np.dtype(dtype).itemsize,)
+        if start + size > len(data) or size != int(np.prod(shape)) * np.dtype(dtype).itemsize:
+            raise ValueError(f"Fichier de problème binaire tronqué ou corrompu : {path}")
+        sections[name] = data[start:start + size].view(dtype).reshape(shape)
+
+    choice_names: List[str] = []
+    student_names: List[str] = []
+    if names:
+        # Chaque nom distinct est décodé une fois, puis partagé
+        table_names = _decode_names(sections['name_offsets'], sections['name_data'])
+        choice_names = [table_names[i] for i in sections['choice_names'].tolist()]
+        student_names = [table_names[i] for i in sections['student_names'].tolist()]
+
+    return ArrayAssignmentProblem(
+        choice_ids=sections['choice_ids'],
+        choice_names=choice_names,
+        capacities=sections['capacities'],
+        student_ids=sections['student_ids'],
+        student_names=student_names,
+        preferences=sections['preferences'],
+        k=k,
+        assignment=np.array(sections['assignment']),
+        forced=np.array(sections['forced'])
+    )
+
+
+def mapped_file(array: np.ndarray) -> Optional[str]:
+    """Chemin du fichier projeté dont le tableau est une vue, sinon None"""
+    base = array
+    while base is not None:
+        if isinstance(base, np.memmap):
+            return base.filename
+        base = getattr(base, 'base', None)
+    return None
@@ -0,0 +1,171 @@
+"""
+Cache disque des problèmes déjà lus.
+
+Une relance sur les mêmes fichiers (autre graine, autre nombre d'essais...)
+recharge le problème depuis un fichier .npz au lieu de relire le CSV ou
+l'Excel. La clé combine l'empreinte du contenu des deux fichiers et k ;
+l'empreinte d'un fichier est elle-même mémorisée avec sa taille et sa date
+de modification, ce qui évite de relire un fichier inchangé.
+"""
+import hashlib
+import json
+import os
+from typing import Callable, Dict, Optional
+from models.array_models import ArrayAssignmentProblem
+from models.storage import FORMAT_VERSION, save_npz, load_npz
+
+# Taille maximale par défaut du cache (octets)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Dossier du cache : $SATISFIER_CACHE, sinon ~/.cache/satisfier"""
+    return os.environ.get('SATISFIER_CACHE') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'satisfier')
+
+
+def file_digest(file_path: str, block_size: int = 1 << 20) -> str:
+    """Empreinte BLAKE2 du contenu d'un fichier, lue par blocs"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ProblemCache:
+    """
+    Cache LRU de problèmes en colonnes, borné par la taille totale des fichiers.
+
+    Chaque entrée est un fichier .npz ; la date de dernier accès est portée par
+    sa date de modification, de sorte que l'éviction supprime les entrées les
+    moins récemment utilisées sans autre index que celui des empreintes.
+    """
+
+    INDEX_FILE = 'digests.json'
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, activities_file: str, choices_file: str, k: int,
+             loader: Callable[[], ArrayAssignmentProblem]) -> ArrayAssignmentProblem:
+        """
+        Retourne le problème en cache pour ces fichiers et ce k, ou l'obtient
+        par loader() et l'enregistre. Les erreurs de lecture ne sont pas mises
+        en cache ; une entrée illisible est simplement reconstruite.
+        """
+        try:
+            path = self._entry_path(activities_file, choices_file, k)
+        except OSError:
+            return loader()
+
+        if os.path.exists(path):
+            try:
+                problem = load_npz(path)
+                os.utime(path)
+                self.hits += 1
+                return problem
+            except (OSError, ValueError, KeyError):
+                self._remove(path)
+
+        self.misses += 1
+        problem = loader()
+        self._store(path, problem)
+        return problem
+
+    def clear(self):
+        """Supprime toutes les entrées du cache"""
+        for name in self._entries():
+            self._remove(os.path.join(self.directory, name))
+        self._remove(os.path.join(self.directory, self.INDEX_FILE))
+
+    def total_bytes(self) -> int:
+        """Taille totale des entrées du cache"""
+        return sum(os.path.getsize(os.path.join(self.directory, name)) for name in self._entries())
+
+    def _entry_path(self, activities_file: str, choices_file: str, k: int) -> str:
+        key = hashlib.blake2b(digest_size=16)
+        for file_path in (activities_file, choices_file):
+            key.update(self._digest(file_path).encode())
+        key.update(f"{k}:{FORMAT_VERSION}".encode())
+        return os.path.join(self.directory, key.hexdigest() + '.npz')
+
+    def _digest(self, file_path: str) -> str:
+        """Empreinte d'un fichier, recalculée seulement si sa taille ou sa date a changé"""
+        stat = os.stat(file_path)
+        index = self._read_index()
+        entry = index.get(os.path.abspath(file_path))
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['digest']
+
+        digest = file_digest(file_path)
+        index[os.path.abspath(file_path)] = {
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest
+        }
+        self._write_index(index)
+        return digest
+
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            with open(os.path.join(self.directory, self.INDEX_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index: Dict[str, dict]):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._atomic_write(os.path.join(self.directory, self.INDEX_FILE),
+                               lambda f: f.write(json.dumps(index).encode('utf-8')))
+        except OSError:
+            pass  # Le cache est facultatif : on recalculera l'empreinte
+
+    def _store(self, path: str, problem: ArrayAssignmentProblem):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._atomic_write(path, lambda f: save_npz(problem, f))
+            self._evict()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        entries = []
+        for name in self._entries():
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort(reverse=True)
+
+        total = 0
+        for _, size, path in entries:
+            total += size
+            if total > self.max_bytes:
+                self._remove(path)
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [name for name in os.listdir(self.directory) if name.endswith('.npz')]
+
+    @staticmethod
+    def _atomic_write(path: str, write: Callable):
+        """Écrit dans un fichier temporaire puis le renomme, pour ne jamais laisser d'entrée tronquée"""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'wb') as f:
+                write(f)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,212 @@
+"""
+Instrumentation des étapes de traitement : durées, allocations et compteurs.
+
+Désactivée par défaut : span() retourne alors un gestionnaire de contexte
+partagé qui ne fait rien et count() retourne immédiatement, ce qui rend le
+coût négligeable. Une fois activée par enable(), chaque étape instrumentée
+enregistre sa durée, ses compteurs (étudiants placés par niveau de choix,
+attributions forcées...) et, sur demande, ses allocations via tracemalloc.
+
+    profiler = profiling.enable()
+    ...
+    print(profiler.breakdown())
+    profiler.export_json('trace.json')  # Format « Trace Event » (chrome://tracing, Perfetto)
+"""
+import json
+import os
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class Span:
+    """Étape chronométrée"""
+    name: str
+    start: float  # Secondes depuis l'activation du profileur
+    path: Tuple[str, ...]  # Noms des étapes englobantes puis de l'étape
+    duration: float = 0.0
+    counters: Dict[str, int] = field(default_factory=dict)
+    allocated_bytes: Optional[int] = None  # Variation de la mémoire allouée pendant l'étape
+    peak_bytes: Optional[int] = None  # Pic d'allocation au-dessus du niveau de départ
+    _start_memory: int = 0
+    _child_peak: int = 0
+
+
+class Profiler:
+    """
+    Enregistre les étapes imbriquées d'une exécution. Prévu pour un seul fil
+    d'exécution à la fois (celui qui effectue le traitement).
+    """
+
+    def __init__(self, track_allocations: bool = False):
+        self.track_allocations = track_allocations
+        self.spans: List[Span] = []
+        self.counters: Dict[str, int] = {}
+        self._stack: List[Span] = []
+        self._origin = time.perf_counter()
+        self._started_tracing = False
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def span(self, name: str) -> '_SpanContext':
+        return _SpanContext(self, name)
+
+    def count(self, name: str, value: int = 1):
+        """Incrémente un compteur global et celui de l'étape en cours"""
+        self.counters[name] = self.counters.get(name, 0) + value
+        if self._stack:
+            counters = self._stack[-1].counters
+            counters[name] = counters.get(name, 0) + value
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _enter(self, name: str):
+        parent_path = self._stack[-1].path if self._stack else ()
+        span = Span(name, time.perf_counter() - self._origin, parent_path + (name,))
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            # Le pic courant appartient à l'étape parente : on le lui reporte
+            if self._stack:
+                self._stack[-1]._child_peak = max(self._stack[-1]._child_peak, peak)
+            tracemalloc.reset_peak()
+            span._start_memory = current
+        self.spans.append(span)
+        self._stack.append(span)
+
+    def _exit(self):
+        span = self._stack.pop()
+        span.duration = time.perf_counter() - self._origin - span.start
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, span._child_peak)
+            span.allocated_bytes = current - span._start_memory
+            span.peak_bytes = peak - span._start_memory
+            if self._stack:
+                self._stack[-1]._child_peak = max(self._stack[-1]._child_peak, peak)
+            tracemalloc.reset_peak()
+
+    def to_trace(self) -> Dict:
+        """Trace au format « Trace Event » (événements complets, durées en microsecondes)"""
+        events = []
+        for span in self.spans:
+            args = dict(span.counters)
+            if span.allocated_bytes is not None:
+                args['allocated_bytes'] = span.allocated_bytes
+                args['peak_bytes'] = span.peak_bytes
+            events.append({
+                'name': span.name, 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                'ts': round(span.start * 1e6, 3), 'dur': round(span.duration * 1e6, 3),
+                'args': args
+            })
+        return {'traceEvents': events, 'counters': dict(self.counters)}
+
+    def export_json(self, file_path: str):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_trace(), f, indent=2, ensure_ascii=False)
+
+    def breakdown(self) -> str:
+        """
+        Tableau des étapes (indentées selon leur imbrication) et de leurs
+        compteurs ; les étapes répétées au même endroit sont cumulées.
+        """
+        header = f"{'Étape':<44}{'Durée (s)':>11}{'%':>8}"
+        if self.track_allocations:
+            header += f"{'Alloc. (Mo)':>13}{'Pic (Mo)':>10}"
+        lines = [header, '-' * len(header)]
+
+        merged: Dict[Tuple[str, ...], dict] = {}
+        for span in self.spans:
+            entry = merged.setdefault(span.path, {'calls': 0, 'duration': 0.0, 'counters': {},
+                                                  'allocated': 0, 'peak': 0})
+            entry['calls'] += 1
+            entry['duration'] += span.duration
+            for name, value in span.counters.items():
+                entry['counters'][name] = entry['counters'].get(name, 0) + value
+            if self.track_allocations:
+                entry['allocated'] += span.allocated_bytes
+                entry['peak'] = max(entry['peak'], span.peak_bytes)
+
+        total = sum(entry['duration'] for path, entry in merged.items() if len(path) == 1) or 1.0
+        for path, entry in merged.items():
+            depth = len(path) - 1
+            label = '  ' * depth + path[-1]
+            if entry['calls'] > 1:
+                label += f" (x{entry['calls']})"
+            line = f"{label:<44}{entry['duration']:>11.3f}{entry['duration'] / total:>8.1%}"
+            if self.track_allocations:
+                line += f"{entry['allocated'] / 2**20:>13.1f}{entry['peak'] / 2**20:>10.1f}"
+            lines.append(line)
+            for name, value in entry['counters'].items():
+                lines.append(f"{'  ' * (depth + 1)}· {name} : {value}")
+        return '\n'.join(lines)
+
+
+class _SpanContext:
+    __slots__ = ('profiler', 'name')
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._exit()
+        return False
+
+
+class _NullSpan:
+    """Étape inactive, partagée par tous les appels lorsque le profilage est désactivé"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_profiler: Optional[Profiler] = None
+
+
+def enable(track_allocations: bool = False) -> Profiler:
+    """Active le profilage (en remplaçant un éventuel profileur actif) et le retourne"""
+    global _profiler
+    disable()
+    _profiler = Profiler(track_allocations)
+    return _profiler
+
+
+def disable() -> Optional[Profiler]:
+    """Désactive le profilage et retourne le profileur qui était actif"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+
+def active() -> Optional[Profiler]:
+    return _profiler
+
+
+def span(name: str):
+    """Gestionnaire de contexte chronométrant une étape (sans effet si désactivé)"""
+    profiler = _profiler
+    return profiler.span(name) if profiler is not None else _NULL_SPAN
+
+
+def count(name: str, value: int = 1):
+    """Incrémente un compteur de l'étape en cours (sans effet si désactivé)"""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.count(name, value)
@@ -0,0 +1,174 @@
+"""
+Pré-passe d'admission tenant compte de la demande.
+
+La phase 1 gloutonne est myope : un premier choix très demandé peut occuper
+les places qui auraient permis de satisfaire le deuxième choix d'autres
+étudiants, qui finissent en attribution forcée. Entre les deux phases, cette
+pré-passe recalcule les places sur les choix par un flot de coût minimum
+(source -> étudiants -> activités choisies, coût selon le rang -> puits) :
+le flot est d'abord maximum, soit le plus grand nombre possible d'étudiants
+sur un de leurs choix, puis de coût minimum, soit les meilleurs rangs parmi
+ces attributions de cardinalité maximale.
+
+Le nombre d'étudiants hors de leurs choix (attributions forcées et non
+assignés) est alors minimal, ce que le rapport certifie par ses bornes, sans
+sacrifier les premiers choix à ce seul objectif.
+"""
+import time
+from dataclasses import dataclass
+from typing import List
+import numpy as np
+from models.scoring import integer_weights
+import profiling
+
+
+@dataclass
+class AdmissionReport:
+    """Bilan de la pré-passe d'admission"""
+    demand: np.ndarray  # (m, k) nombre d'étudiants demandant chaque activité à chaque rang
+    capacities: np.ndarray  # (m,)
+    n_students: int
+    seats: int  # Nombre total de places
+    upper_bound: int  # Borne rapide (demande plafonnée par les capacités) sur les étudiants placables sur un choix
+    greedy_on_choice: int  # Étudiants placés sur un choix par la phase 1
+    on_choice: int  # Étudiants placés sur un choix après la pré-passe : maximum prouvé
+    reassigned: int  # Étudiants dont l'attribution de la phase 1 a changé
+    elapsed: float
+
+    @property
+    def off_choice_lower_bound(self) -> int:
+        """Minimum d'étudiants hors de leurs choix (forcés ou non assignés)"""
+        return self.n_students - self.on_choice
+
+    @property
+    def forced_lower_bound(self) -> int:
+        """Minimum d'attributions forcées (places libres restantes et étudiants à placer)"""
+        return min(self.n_students, self.seats) - self.on_choice
+
+    @property
+    def unassigned_lower_bound(self) -> int:
+        """Minimum d'étudiants non assignés, faute de places"""
+        return max(0, self.n_students - self.seats)
+
+    def oversubscribed(self, rank: int = 0) -> np.ndarray:
+        """Indices des activités demandées au rang donné par plus d'étudiants qu'elles n'ont de places"""
+        return np.flatnonzero(self.demand[:, rank] > self.capacities)
+
+    def summary(self) -> dict:
+        return {
+            "students": self.n_students,
+            "seats": self.seats,
+            "greedy_on_choice": self.greedy_on_choice,
+            "on_choice": self.on_choice,
+            "reassigned": self.reassigned,
+            "forced_lower_bound": self.forced_lower_bound,
+            "unassigned_lower_bound": self.unassigned_lower_bound,
+            "elapsed": self.elapsed
+        }
+
+
+def choice_demand(preferences: np.ndarray, n_choices: int) -> np.ndarray:
+    """Matrice (m, k) du nombre d'étudiants demandant chaque activité à chaque rang"""
+    preferences = np.asarray(preferences)
+    k = preferences.shape[1]
+    rows, ranks = np.nonzero(preferences >= 0)
+    cells = preferences[rows, ranks].astype(np.int64) * k + ranks
+    return np.bincount(cells, minlength=n_choices * k).reshape(n_choices, k)
+
+
+def on_choice_upper_bound(preferences: np.ndarray, capacities: np.ndarray,
+                          demand: np.ndarray) -> int:
+    """
+    Borne supérieure rapide du nombre d'étudiants placables sur un de leurs
+    choix : chaque activité accueille au plus min(capacité, demande totale).
+    """
+    with_choice = int((np.asarray(preferences) >= 0).any(axis=1).sum())
+    capped = np.minimum(np.asarray(capacities, dtype=np.int64), demand.sum(axis=1))
+    return min(with_choice, int(capped.sum()))
+
+
+def admit(preferences: np.ndarray, capacities: np.ndarray, assignment: List[int],
+          remaining: List[int], unplaced: List[int]) -> AdmissionReport:
+    """
+    Remplace une attribution partielle (tous les placés le sont sur un de leurs
+    choix) par une attribution de cardinalité maximale aux meilleurs rangs.
+
+    preferences : matrice (n, k) d'indices d'activités (-1 = pas de choix)
+    assignment, remaining : attribution et places restantes, modifiées sur place
+    unplaced : étudiants sans choix satisfait, dans l'ordre du tirage ; ceux qui
+        sont placés en sont retirés, l'ordre des autres est conservé, et les
+        étudiants que le flot ne place plus sont ajoutés à la fin
+    """
+    started = time.perf_counter()
+    preferences = np.asarray(preferences)
+    capacities = np.asarray(capacities, dtype=np.int64)
+    n_choices = len(capacities)
+    demand = choice_demand(preferences, n_choices)
+    n_students = len(assignment)
+    greedy = n_students - len(unplaced)
+    report = AdmissionReport(
+        demand=demand,
+        capacities=capacities,
+        n_students=n_students,
+        seats=int(capacities.sum()),
+        upper_bound=on_choice_upper_bound(preferences, capacities, demand),
+        greedy_on_choice=greedy,
+        on_choice=greedy,
+        reassigned=0,
+        elapsed=0.0
+    )
+
+    with profiling.span('admission'):
+        # Rien à gagner si la phase 1 atteint déjà la borne rapide
+        if greedy < report.upper_bound:
+            matched = _rank_aware_matching(preferences, capacities)
+            previous = np.asarray(assignment)
+            report.on_choice = int(np.count_nonzero(matched >= 0))
+            report.reassigned = int(np.count_nonzero(matched != previous))
+
+            dropped = np.flatnonzero((previous >= 0) & (matched < 0)).tolist()
+            assignment[:] = matched.tolist()
+            remaining[:] = (capacities - np.bincount(matched[matched >= 0],
+                                                     minlength=n_choices)).tolist()
+            unplaced[:] = [i for i in unplaced if assignment[i] < 0] + dropped
+        profiling.count('admission_reassigned', report.reassigned)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def _rank_aware_matching(preferences: np.ndarray, capacities: np.ndarray) -> np.ndarray:
+    """
+    Attribution sur les choix par un flot maximum de coût minimum : le plus
+    grand nombre d'étudiants placés, puis les meilleurs rangs (même coût que
+    MinCostFlowOptimizer). Retourne l'indice d'activité de chaque étudiant, -1
+    s'il n'est placé sur aucun de ses choix.
+    """
+    from solver.min_cost_flow import MinCostFlow
+
+    n_students, k = preferences.shape
+    n_choices = len(capacities)
+    rank_weights, _ = integer_weights(k)
+
+    # Un choix répété ne compte qu'une fois (première occurrence)
+    valid = preferences >= 0
+    for rank in range(1, k):
+        valid[:, rank] &= ~(preferences[:, :rank] == preferences[:, [rank]]).any(axis=1)
+    rows, ranks = np.nonzero(valid)
+    choices = preferences[rows, ranks]
+
+    source = 0
+    first_student = 1
+    first_choice = first_student + n_students
+    sink = first_choice + n_choices
+    network = MinCostFlow(sink + 1)
+    network.add_arcs(np.full(n_students, source), first_student + np.arange(n_students), 1, 0)
+    pair_arcs = network.add_arcs(first_student + rows, first_choice + choices, 1,
+                                 rank_weights[0] - np.asarray(rank_weights)[ranks])
+    network.add_arcs(first_choice + np.arange(n_choices), sink, capacities, 0)
+    network.solve(source, sink)
+
+    used = network.flows()[pair_arcs] > 0
+    matched = np.full(n_students, -1, dtype=np.int64)
+    matched[rows[used]] = choices[used]
+    return matched
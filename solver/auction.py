@@ -0,0 +1,341 @@
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+import numpy as np
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from models.scoring import integer_weights
+from solver.optimizer import SatisfactionOptimizer
+import profiling
+
+# Valeur d'un choix inexistant (ou d'une activité sans place) : jamais retenu
+_EXCLUDED = np.iinfo(np.int64).min // 4
+
+
+@dataclass
+class AuctionStats:
+    """Bilan d'une résolution par enchères"""
+    phases: int  # Nombre de valeurs de epsilon utilisées
+    rounds: int  # Tours d'enchères des étudiants (tous lots confondus)
+    bids: int  # Nombre total d'offres des étudiants
+    reverse_rounds: int  # Tours où les activités incomplètes baissent leur prix
+    value: int  # Poids total de l'attribution (poids entiers de integer_weights)
+    upper_bound: int  # Borne supérieure prouvée (dual) sur ce poids
+    elapsed: float
+
+    @property
+    def gap(self) -> float:
+        """Écart relatif à la borne : 0 si l'attribution est prouvée optimale"""
+        return (self.upper_bound - self.value) / self.upper_bound if self.upper_bound > 0 else 0.0
+
+
+class AuctionOptimizer(SatisfactionOptimizer):
+    """
+    Résout le problème par un algorithme d'enchères (Bertsekas) avec
+    réduction progressive de epsilon, directement sur la matrice (n, k) des
+    choix et le vecteur des capacités.
+
+    Les places d'une même activité ne sont pas dupliquées : l'activité retient
+    ses capacity meilleures offres et son prix d'entrée est la plus basse
+    d'entre elles. Les étudiants sans place enchérissent par lots vectorisés
+    (batch_size étudiants à la fois), ce qui borne la mémoire temporaire.
+
+    Avec l'epsilon final par défaut, l'attribution est optimale comme celle de
+    MinCostFlowOptimizer ; un final_epsilon plus grand accélère la résolution
+    au prix d'un écart borné, rapporté dans last_stats.
+    """
+
+    def __init__(self, problem: Union[AssignmentProblem, ArrayAssignmentProblem],
+                 batch_size: Optional[int] = 262_144, scaling_factor: int = 8,
+                 final_epsilon: Optional[float] = None):
+        super().__init__(problem)
+        if scaling_factor < 2:
+            raise ValueError("Le facteur de réduction de epsilon doit être au moins 2")
+        self.batch_size = batch_size
+        self.scaling_factor = scaling_factor
+        self.final_epsilon = final_epsilon
+        self.last_stats: Optional[AuctionStats] = None
+
+    def optimize(self, seed: Optional[int] = None) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
+        """
+        Calcule l'attribution par enchères.
+        La résolution est déterministe : la graine est acceptée par compatibilité.
+        """
+        self._reset_assignments()
+
+        if isinstance(self.problem, ArrayAssignmentProblem):
+            columns = self.problem
+        else:
+            columns = ArrayAssignmentProblem.from_problem(self.problem)
+
+        with profiling.span('auction'):
+            assignment, forced, self.last_stats = solve_assignment_auction(
+                columns.preferences, columns.capacities, columns.k,
+                batch_size=self.batch_size, scaling_factor=self.scaling_factor,
+                final_epsilon=self.final_epsilon
+            )
+        columns.assignment[:] = assignment
+        columns.forced[:] = forced
+        columns.recompute_occupancy()
+
+        if columns is not self.problem:
+            columns.apply_to(self.problem)
+        return self.problem
+
+
+def solve_assignment_auction(preferences: np.ndarray, capacities: np.ndarray, k: int,
+                             batch_size: Optional[int] = 262_144, scaling_factor: int = 8,
+                             final_epsilon: Optional[float] = None
+                             ) -> Tuple[np.ndarray, np.ndarray, AuctionStats]:
+    """
+    Résout le problème sous forme de tableaux.
+
+    preferences : matrice (n_étudiants, k) d'indices d'activités (-1 = pas de choix)
+    capacities : capacité de chaque activité
+    final_epsilon : tolérance finale, en points de poids par étudiant (None = exact)
+    Retourne (indice d'activité attribuée ou -1, masque des attributions forcées, bilan).
+
+    Toute place restée libre est donnée à un étudiant sans activité (attribution
+    forcée) : le poids total vaut donc poids_forcé * min(n, places) plus la
+    somme des gains (poids du rang - poids_forcé, toujours positifs) des
+    étudiants placés sur un de leurs choix. Les enchères maximisent cette somme.
+    """
+    started = time.perf_counter()
+    preferences = np.asarray(preferences)
+    capacities = np.asarray(capacities, dtype=np.int64)
+    n_students = preferences.shape[0]
+    n_choices = len(capacities)
+    rank_weights, forced_weight = integer_weights(k)
+
+    # Gains entiers multipliés par (n + 1) : epsilon = 1 garantit alors l'optimalité
+    scale = n_students + 1
+    gains = (np.asarray(rank_weights, dtype=np.int64) - forced_weight) * scale
+    final_epsilon = 1 if final_epsilon is None else max(1, int(final_epsilon * scale))
+
+    # Les choix vers une activité sans place sont ignorés
+    valid = preferences >= 0
+    valid[valid] = capacities[preferences[valid]] > 0
+    safe_preferences = np.where(valid, preferences, 0)
+    values = np.where(valid, gains[None, :preferences.shape[1]], _EXCLUDED)
+
+    state = _AuctionState(
+        prices=np.zeros(n_choices, np.int64),
+        occupancy=np.zeros(n_choices, np.int64),
+        owner=np.full(n_students, -1, np.int64),
+        owner_bid=np.zeros(n_students, np.int64),
+        owner_value=np.zeros(n_students, np.int64)
+    )
+    bidders = np.flatnonzero(valid.any(axis=1))
+    batch_size = batch_size or max(len(bidders), 1)
+
+    phases = rounds = bids = 0
+    epsilon = max(final_epsilon, int(gains.max(initial=0)) // scaling_factor)
+    while True:
+        phases += 1
+        with profiling.span('phase'):
+            # Les prix de la phase précédente sont conservés : ils sont déjà
+            # proches de l'équilibre et évitent les guerres de prix
+            state.owner[:] = -1
+            state.occupancy[:] = 0
+            pool = bidders
+            while len(pool):
+                rounds += 1
+                batch, rest = pool[:batch_size], pool[batch_size:]
+                losers, n_bids = _forward_round(batch, safe_preferences, values, capacities,
+                                                state, epsilon)
+                bids += n_bids
+                pool = np.concatenate([rest, losers]) if len(losers) else rest
+        if epsilon <= final_epsilon:
+            break
+        epsilon = max(final_epsilon, epsilon // scaling_factor)
+    profiling.count('rounds', rounds)
+
+    # Une place vide doit avoir un prix nul pour que la solution soit optimale :
+    # les activités incomplètes baissent leur prix pour attirer des étudiants
+    with profiling.span('enchères inverses'):
+        listings = _Listings(preferences, valid, n_choices)
+        reverse_rounds = 0
+        stale = np.flatnonzero((state.occupancy < capacities) & (state.prices > 0))
+        while len(stale):
+            reverse_rounds += 1
+            _reverse_round(stale, listings, values, capacities, state, epsilon)
+            stale = np.flatnonzero((state.occupancy < capacities) & (state.prices > 0))
+        profiling.count('reverse_rounds', reverse_rounds)
+
+    assignment = np.full(n_students, -1, dtype=np.int32)
+    placed = state.owner >= 0
+    assignment[placed] = state.owner[placed]
+
+    # Places restantes : attributions forcées, activité par activité
+    free = capacities - state.occupancy
+    forced = np.zeros(n_students, dtype=bool)
+    unassigned = np.flatnonzero(~placed)
+    seats = np.repeat(np.arange(n_choices, dtype=np.int32), free)
+    forced_students = unassigned[:len(seats)]
+    assignment[forced_students] = seats[:len(forced_students)]
+    forced[forced_students] = True
+
+    # Valeur de la solution et borne duale : profits des étudiants au prix
+    # courant plus la valeur des places (prix nul pour une activité incomplète)
+    base = forced_weight * min(n_students, int(capacities.sum()))
+    value = base + int(state.owner_value[placed].sum()) // scale
+    dual_prices = np.where(free > 0, 0, state.prices)
+    surplus = np.maximum((values - dual_prices[safe_preferences]).max(axis=1, initial=0), 0)
+    # Les poids étant entiers, la borne peut être arrondie à l'entier inférieur
+    upper_bound = base + (int(surplus.sum()) + int(capacities @ dual_prices)) // scale
+
+    stats = AuctionStats(phases=phases, rounds=rounds, bids=bids, reverse_rounds=reverse_rounds,
+                         value=value, upper_bound=max(upper_bound, value),
+                         elapsed=time.perf_counter() - started)
+    return assignment, forced, stats
+
+
+@dataclass
+class _AuctionState:
+    """Prix et détenteurs des places, modifiés en place par les tours d'enchères"""
+    prices: np.ndarray  # Prix d'entrée de chaque activité (plus basse offre retenue)
+    occupancy: np.ndarray
+    owner: np.ndarray  # Activité détenue par chaque étudiant (-1 = aucune)
+    owner_bid: np.ndarray  # Prix payé pour cette place
+    owner_value: np.ndarray  # Gain de cette place pour l'étudiant
+
+
+class _Listings:
+    """Étudiants ayant choisi chaque activité (stockage compact trié par activité)"""
+
+    def __init__(self, preferences: np.ndarray, valid: np.ndarray, n_choices: int):
+        students, ranks = np.nonzero(valid)
+        choices = preferences[students, ranks]
+        order = np.argsort(choices, kind='stable')
+        self.students = students[order]
+        self.ranks = ranks[order]
+        self.start = np.concatenate([[0], np.cumsum(np.bincount(choices, minlength=n_choices))])
+
+    def gather(self, activities: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(activité, étudiant, rang) de toutes les mentions des activités données"""
+        lengths = self.start[activities + 1] - self.start[activities]
+        offsets = np.repeat(self.start[activities] - (np.cumsum(lengths) - lengths), lengths)
+        positions = offsets + np.arange(lengths.sum())
+        return np.repeat(activities, lengths), self.students[positions], self.ranks[positions]
+
+
+def _group_positions(sorted_keys: np.ndarray) -> np.ndarray:
+    """Position de chaque élément dans son groupe (clés triées)"""
+    return np.arange(len(sorted_keys)) - np.searchsorted(sorted_keys, sorted_keys)
+
+
+def _forward_round(batch, preferences, values, capacities, state: _AuctionState,
+                   epsilon) -> Tuple[np.ndarray, int]:
+    """
+    Un tour d'enchères (Jacobi) pour un lot d'étudiants sans place.
+    Retourne (étudiants restés sans place, nombre d'offres).
+    """
+    prices = state.prices
+    choices = preferences[batch]
+    net = values[batch] - prices[choices]
+    best = np.argmax(net, axis=1)
+    rows = np.arange(len(batch))
+    best_net = net[rows, best]
+    best_choice = choices[rows, best]
+
+    # Deuxième meilleure option : une autre activité, ou rester sans place (0)
+    net[choices == best_choice[:, None]] = _EXCLUDED
+    second_net = np.maximum(net.max(axis=1), 0)
+
+    # Un étudiant pour qui toute place coûte plus qu'elle ne rapporte abandonne
+    bidding = best_net >= 0
+    students = batch[bidding]
+    if not len(students):
+        return students, 0
+    targets = best_choice[bidding].astype(np.int64)
+    student_values = values[students, best[bidding]]
+    offers = student_values - second_net[bidding] + epsilon
+
+    # Offres en concurrence avec les détenteurs actuels des activités visées
+    touched = np.zeros(len(prices), dtype=bool)
+    touched[targets] = True
+    holders = np.flatnonzero(state.owner >= 0)
+    holders = holders[touched[state.owner[holders]]]
+
+    candidates = np.concatenate([holders, students])
+    candidate_targets = np.concatenate([state.owner[holders], targets])
+    candidate_offers = np.concatenate([state.owner_bid[holders], offers])
+    candidate_values = np.concatenate([state.owner_value[holders], student_values])
+    is_new = np.concatenate([np.zeros(len(holders), np.int8), np.ones(len(students), np.int8)])
+
+    # Par activité : offres décroissantes, détenteurs d'abord à égalité
+    order = np.lexsort((is_new, -candidate_offers, candidate_targets))
+    candidates = candidates[order]
+    candidate_targets = candidate_targets[order]
+    candidate_offers = candidate_offers[order]
+    candidate_values = candidate_values[order]
+    kept = _group_positions(candidate_targets) < capacities[candidate_targets]
+
+    winners = candidates[kept]
+    state.owner[winners] = candidate_targets[kept]
+    state.owner_bid[winners] = candidate_offers[kept]
+    state.owner_value[winners] = candidate_values[kept]
+    losers = candidates[~kept]
+    state.owner[losers] = -1
+
+    # Nouveau prix d'entrée : la plus basse offre retenue d'une activité pleine
+    activities = np.unique(candidate_targets)
+    counts = np.bincount(candidate_targets, minlength=len(prices))[activities]
+    state.occupancy[activities] = np.minimum(counts, capacities[activities])
+    full_activities = activities[counts >= capacities[activities]]
+    lowest = np.searchsorted(candidate_targets, full_activities) + capacities[full_activities] - 1
+    prices[full_activities] = candidate_offers[lowest]
+    return losers, len(students)
+
+
+def _reverse_round(stale, listings: _Listings, values, capacities, state: _AuctionState, epsilon):
+    """
+    Un tour d'enchères inverses (Jacobi) : chaque activité incomplète dont le
+    prix est positif le baisse juste assez pour attirer les étudiants qui y
+    gagnent le plus, sans dépasser le nombre de places vides. Le profit d'un
+    étudiant qui change d'activité augmente strictement, ce qui garantit la fin.
+    """
+    prices = state.prices
+    owner = state.owner
+    activities, students, ranks = listings.gather(stale)
+
+    # Prix maximal que chaque étudiant accepterait de payer pour l'activité
+    profit = np.where(owner >= 0, state.owner_value - prices[np.maximum(owner, 0)], 0)
+    student_values = values[students, ranks]
+    accepted = student_values - profit[students]
+    interested = (accepted > 0) & (owner[students] != activities)
+    activities, students = activities[interested], students[interested]
+    student_values, accepted = student_values[interested], accepted[interested]
+
+    order = np.lexsort((-accepted, activities))
+    activities, students = activities[order], students[order]
+    student_values, accepted = student_values[order], accepted[order]
+    position = _group_positions(activities)
+    empty = capacities - state.occupancy
+
+    # Nouveau prix : l'offre du premier étudiant non retenu, moins epsilon
+    new_prices = np.zeros(len(prices), np.int64)
+    marginal = position == empty[activities]
+    new_prices[activities[marginal]] = np.maximum(accepted[marginal] - epsilon, 0)
+    prices[stale] = new_prices[stale]
+
+    # Un étudiant attiré par plusieurs activités choisit le meilleur profit, et
+    # reste où il est si la baisse de prix de sa propre activité l'avantage davantage
+    attracted = position < empty[activities]
+    activities, students = activities[attracted], students[attracted]
+    student_values = student_values[attracted]
+    surplus = student_values - prices[activities]
+    order = np.lexsort((-surplus, students))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = students[order][1:] != students[order][:-1]
+    chosen = order[first]
+    current = np.where(owner >= 0, state.owner_value - prices[np.maximum(owner, 0)], 0)
+    chosen = chosen[surplus[chosen] > current[students[chosen]]]
+    movers, destinations = students[chosen], activities[chosen]
+
+    previous = owner[movers]
+    np.subtract.at(state.occupancy, previous[previous >= 0], 1)
+    np.add.at(state.occupancy, destinations, 1)
+    owner[movers] = destinations
+    state.owner_bid[movers] = prices[destinations]
+    state.owner_value[movers] = student_values[chosen]
@@ -0,0 +1,376 @@
+"""
+Moteur de programmation linéaire en nombres entiers (facultatif).
+
+Permet des contraintes que l'algorithme glouton ne sait pas exprimer :
+remplissage minimal par activité, « personne en dessous du rang r si c'est
+évitable », équité lexicographique (rank-maximal ou max-min). Le modèle creux
+est résolu par HiGHS (paquet highspy) ou, à défaut, par scipy.optimize.milp
+(qui embarque aussi HiGHS, mais sans démarrage à chaud).
+
+Modèle : x[i, r] = 1 si l'étudiant i obtient son choix de rang r, f[i] = 1
+s'il reçoit une attribution forcée, z[j] = nombre d'attributions forcées
+dans l'activité j. Contraintes : sum_r x[i, r] + f[i] <= 1 pour chaque
+étudiant ; remplissage_min[j] <= sum x[., j] + z[j] <= capacité[j] pour
+chaque activité ; sum f = sum z.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from models.scoring import integer_weights
+from solver.optimizer import SatisfactionOptimizer
+import profiling
+
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+try:
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from scipy.sparse import csc_matrix
+except ImportError:
+    milp = None
+
+
+@dataclass
+class IlpStage:
+    """Résultat d'une étape de l'optimisation lexicographique"""
+    name: str
+    status: str  # 'optimal', 'time_limit' ou 'no_solution'
+    objective: Optional[float]
+    bound: Optional[float]  # Meilleure borne prouvée
+    gap: Optional[float]  # Écart relatif entre la solution et la borne
+    elapsed: float
+
+
+@dataclass
+class IlpReport:
+    """Bilan d'une résolution"""
+    solver: str  # 'highs' ou 'scipy'
+    status: str  # 'optimal' si toutes les étapes sont prouvées optimales, sinon 'time_limit'
+    warm_started: bool
+    stages: List[IlpStage] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def gap(self) -> Optional[float]:
+        """Écart relatif de la dernière étape (0 si prouvée optimale)"""
+        return self.stages[-1].gap if self.stages else None
+
+
+class IlpOptimizer(SatisfactionOptimizer):
+    """
+    Attribution par programmation linéaire en nombres entiers.
+
+    min_fill : nombre minimal d'étudiants par activité (identifiant -> minimum)
+    worst_rank : si possible, personne n'obtient moins que son choix worst_rank
+        (1 = premier choix) ; le nombre d'exceptions est d'abord minimisé
+    fairness : None (score de satisfaction seul), 'rank_maximal' (maximise le
+        nombre de premiers choix, puis de deuxièmes, etc.) ou 'max_min' (minimise
+        d'abord les non-assignés, puis les attributions forcées, puis les
+        derniers choix, etc.)
+    time_limit : budget total en secondes ; une étape interrompue garde sa
+        meilleure solution (les suivantes sont abandonnées) et l'écart à la
+        borne est rapporté
+
+    Le score de satisfaction est toujours maximisé en dernière étape, sans
+    dégrader les objectifs précédents.
+    """
+
+    FAIRNESS = (None, 'rank_maximal', 'max_min')
+
+    def __init__(self, problem: Union[AssignmentProblem, ArrayAssignmentProblem],
+                 time_limit: Optional[float] = None, min_fill: Optional[Dict[int, int]] = None,
+                 worst_rank: Optional[int] = None, fairness: Optional[str] = None,
+                 warm_start: bool = True, solver: Optional[str] = None):
+        super().__init__(problem)
+        if fairness not in self.FAIRNESS:
+            raise ValueError(f"Critère d'équité inconnu : {fairness} (possibles : {self.FAIRNESS})")
+        if worst_rank is not None and not 1 <= worst_rank <= problem.k:
+            raise ValueError(f"Le rang minimal doit être compris entre 1 et {problem.k}")
+        self.time_limit = time_limit
+        self.min_fill = dict(min_fill or {})
+        self.worst_rank = worst_rank
+        self.fairness = fairness
+        self.warm_start = warm_start
+        self.solver = solver or available_solver()
+        if self.solver is None:
+            raise ImportError(
+                "Aucun solveur disponible : installez highspy (pip install highspy) ou scipy"
+            )
+        self.last_report: Optional[IlpReport] = None
+
+    def optimize(self, seed: Optional[int] = None) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
+        """
+        Résout le modèle (la graine sert à la solution gloutonne de démarrage)
+        et retourne le problème avec la meilleure attribution trouvée.
+        """
+        started = time.perf_counter()
+        if isinstance(self.problem, ArrayAssignmentProblem):
+            columns = self.problem
+        else:
+            columns = ArrayAssignmentProblem.from_problem(self.problem)
+
+        with profiling.span('ilp'):
+            model = _Model(columns, self.min_fill)
+            start = None
+            if self.warm_start:
+                SatisfactionOptimizer(columns).optimize(seed=seed)
+                start = model.encode(columns.assignment, columns.forced)
+
+            backend = _HighsBackend(model) if self.solver == 'highs' else _ScipyBackend(model)
+            report = IlpReport(solver=self.solver, status='optimal',
+                               warm_started=start is not None and backend.supports_warm_start)
+            values = start
+            for name, objective in self._stages(model):
+                remaining = None
+                if self.time_limit is not None:
+                    remaining = max(0.0, self.time_limit - (time.perf_counter() - started))
+                stage_started = time.perf_counter()
+                status, solution, value, bound, gap = backend.solve(objective, remaining, values)
+                report.stages.append(IlpStage(name, status, value, bound, gap,
+                                              time.perf_counter() - stage_started))
+                if status == 'infeasible':
+                    raise ValueError(
+                        "Contraintes impossibles à satisfaire : vérifiez les remplissages "
+                        "minimaux par rapport aux capacités et aux choix des étudiants."
+                    )
+                if solution is None:
+                    report.status = 'time_limit'
+                    break
+                values = solution
+                if status != 'optimal':
+                    # Budget épuisé : les étapes suivantes n'auraient pas de temps
+                    report.status = 'time_limit'
+                    break
+                # Les étapes suivantes ne peuvent pas dégrader celle-ci
+                backend.fix_objective(objective, value)
+
+            if values is None:
+                raise ValueError("Aucune solution trouvée dans le temps imparti")
+            assignment, forced = model.decode(values)
+            report.elapsed = time.perf_counter() - started
+            profiling.count('stages', len(report.stages))
+
+        columns.assignment[:] = assignment
+        columns.forced[:] = forced
+        columns.recompute_occupancy()
+        self.last_report = report
+
+        if columns is not self.problem:
+            columns.apply_to(self.problem)
+        return self.problem
+
+    def _stages(self, model: '_Model') -> List[Tuple[str, np.ndarray]]:
+        """Objectifs successifs (à maximiser)"""
+        k = model.k
+        stages = []
+        if self.fairness == 'max_min':
+            stages.append(("étudiants assignés", model.assigned_objective()))
+            stages.extend((f"étudiants dans leurs {r} premiers choix", model.top_objective(r))
+                          for r in range(k, 0, -1))
+        elif self.fairness == 'rank_maximal':
+            stages.extend((f"étudiants au choix {r + 1}", model.rank_objective(r)) for r in range(k))
+        if self.worst_rank is not None:
+            stages.append((f"étudiants dans leurs {self.worst_rank} premiers choix",
+                           model.top_objective(self.worst_rank)))
+        stages.append(("score de satisfaction", model.score_objective()))
+        return stages
+
+
+def available_solver() -> Optional[str]:
+    """Solveur installé, par ordre de préférence"""
+    if highspy is not None:
+        return 'highs'
+    if milp is not None:
+        return 'scipy'
+    return None
+
+
+class _Model:
+    """Modèle creux : colonnes x (choix exprimés), f (étudiants), z (activités)"""
+
+    def __init__(self, columns: ArrayAssignmentProblem, min_fill: Dict[int, int]):
+        self.k = columns.k
+        self.n_students = n = columns.n_students
+        self.n_choices = m = columns.n_choices
+
+        valid = columns.preferences >= 0
+        self.x_student, self.x_rank = np.nonzero(valid)
+        self.x_choice = columns.preferences[valid].astype(np.int64)
+        n_x = len(self.x_student)
+        self.n_x = n_x
+        self.n_cols = n_x + n + m
+
+        # Chaque colonne a exactement deux coefficients non nuls
+        rows = np.empty((self.n_cols, 2), dtype=np.int64)
+        coefficients = np.ones((self.n_cols, 2))
+        rows[:n_x, 0] = self.x_student
+        rows[:n_x, 1] = n + self.x_choice
+        rows[n_x:n_x + n, 0] = np.arange(n)
+        rows[n_x:n_x + n, 1] = n + m
+        rows[n_x + n:, 0] = n + np.arange(m)
+        rows[n_x + n:, 1] = n + m
+        coefficients[n_x + n:, 1] = -1.0
+        self.indptr = np.arange(0, 2 * self.n_cols + 1, 2)
+        self.indices = rows.ravel()
+        self.data = coefficients.ravel()
+        self.n_rows = n + m + 1
+
+        capacities = columns.capacities.astype(float)
+        minimum = np.zeros(m)
+        index = columns.choice_index()
+        for choice_id, count in min_fill.items():
+            if choice_id not in index:
+                raise ValueError(f"Activité inconnue : {choice_id}")
+            minimum[index[choice_id]] = count
+        self.row_lower = np.concatenate([np.full(n, -np.inf), minimum, [0.0]])
+        self.row_upper = np.concatenate([np.ones(n), capacities, [0.0]])
+        self.col_lower = np.zeros(self.n_cols)
+        self.col_upper = np.concatenate([np.ones(n_x + n), capacities])
+
+    def assigned_objective(self) -> np.ndarray:
+        objective = np.zeros(self.n_cols)
+        objective[:self.n_x + self.n_students] = 1.0
+        return objective
+
+    def rank_objective(self, rank: int) -> np.ndarray:
+        objective = np.zeros(self.n_cols)
+        objective[:self.n_x] = self.x_rank == rank
+        return objective
+
+    def top_objective(self, ranks: int) -> np.ndarray:
+        objective = np.zeros(self.n_cols)
+        objective[:self.n_x] = self.x_rank < ranks
+        return objective
+
+    def score_objective(self) -> np.ndarray:
+        """Poids entiers proportionnels au score de satisfaction"""
+        rank_weights, forced_weight = integer_weights(self.k)
+        objective = np.zeros(self.n_cols)
+        objective[:self.n_x] = np.asarray(rank_weights, dtype=float)[self.x_rank]
+        objective[self.n_x:self.n_x + self.n_students] = forced_weight
+        return objective
+
+    def encode(self, assignment: np.ndarray, forced: np.ndarray) -> np.ndarray:
+        """Valeurs des colonnes correspondant à une attribution"""
+        values = np.zeros(self.n_cols)
+        chosen = np.flatnonzero(assignment[self.x_student] == self.x_choice)
+        # Une activité listée deux fois ne compte qu'une fois : la première occurrence
+        # (les colonnes x sont triées par étudiant puis par rang)
+        students, first = np.unique(self.x_student[chosen], return_index=True)
+        values[chosen[first]] = 1.0
+        in_choices = np.zeros(self.n_students, dtype=bool)
+        in_choices[students] = True
+        is_forced = (assignment >= 0) & ~in_choices
+        values[self.n_x:self.n_x + self.n_students] = is_forced
+        values[self.n_x + self.n_students:] = np.bincount(assignment[is_forced],
+                                                          minlength=self.n_choices)
+        return values
+
+    def decode(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Attribution et masque des attributions forcées à partir des valeurs des colonnes"""
+        values = np.round(values).astype(np.int64)
+        assignment = np.full(self.n_students, -1, dtype=np.int32)
+        chosen = values[:self.n_x] > 0
+        assignment[self.x_student[chosen]] = self.x_choice[chosen]
+
+        # Les attributions forcées occupent les places réservées par z
+        forced = values[self.n_x:self.n_x + self.n_students] > 0
+        seats = np.repeat(np.arange(self.n_choices), values[self.n_x + self.n_students:])
+        forced_students = np.flatnonzero(forced)
+        assignment[forced_students] = seats[:len(forced_students)]
+        return assignment, forced
+
+
+class _HighsBackend:
+    supports_warm_start = True
+
+    def __init__(self, model: _Model):
+        self.model = model
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue('output_flag', False)
+        # Le prétraitement de HiGHS ne consulte pas la limite de temps et peut
+        # durer plusieurs minutes sur ce modèle ; la relaxation étant presque
+        # entière (structure de flot), il n'apporte rien ici
+        self.highs.setOptionValue('presolve', 'off')
+        lp = highspy.HighsLp()
+        lp.num_col_ = model.n_cols
+        lp.num_row_ = model.n_rows
+        lp.col_cost_ = np.zeros(model.n_cols)
+        lp.col_lower_ = model.col_lower
+        lp.col_upper_ = model.col_upper
+        lp.row_lower_ = np.where(np.isinf(model.row_lower), -highspy.kHighsInf, model.row_lower)
+        lp.row_upper_ = model.row_upper
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = model.indptr
+        lp.a_matrix_.index_ = model.indices
+        lp.a_matrix_.value_ = model.data
+        lp.sense_ = highspy.ObjSense.kMaximize
+        lp.integrality_ = [highspy.HighsVarType.kInteger] * model.n_cols
+        self.highs.passModel(lp)
+
+    def solve(self, objective, time_limit, start):
+        highs = self.highs
+        highs.changeColsCost(self.model.n_cols, np.arange(self.model.n_cols, dtype=np.int32), objective)
+        highs.setOptionValue('time_limit', float('inf') if time_limit is None else time_limit)
+        if start is not None:
+            solution = highspy.HighsSolution()
+            solution.col_value = list(start)
+            solution.value_valid = True
+            highs.setSolution(solution)
+        highs.run()
+
+        model_status = highs.getModelStatus()
+        if model_status == highspy.HighsModelStatus.kInfeasible:
+            return 'infeasible', None, None, None, None
+        info = highs.getInfo()
+        has_solution = info.primal_solution_status == highspy.SolutionStatus.kSolutionStatusFeasible
+        if not has_solution:
+            return 'no_solution', None, None, None, None
+        status = 'optimal' if model_status == highspy.HighsModelStatus.kOptimal else 'time_limit'
+        values = np.asarray(highs.getSolution().col_value)
+        bound = info.mip_dual_bound if np.isfinite(info.mip_dual_bound) else None
+        gap = 0.0 if status == 'optimal' else (info.mip_gap if bound is not None else None)
+        return status, values, float(objective @ np.round(values)), bound, gap
+
+    def fix_objective(self, objective, value):
+        # L'objectif est entier : >= valeur - 0.5 équivaut à >= valeur
+        columns = np.flatnonzero(objective)
+        self.highs.addRow(value - 0.5, highspy.kHighsInf, len(columns),
+                          columns.astype(np.int32), objective[columns])
+
+
+class _ScipyBackend:
+    supports_warm_start = False
+
+    def __init__(self, model: _Model):
+        self.model = model
+        matrix = csc_matrix((model.data, model.indices, model.indptr),
+                            shape=(model.n_rows, model.n_cols))
+        self.constraints = [LinearConstraint(matrix, model.row_lower, model.row_upper)]
+
+    def solve(self, objective, time_limit, start):
+        model = self.model
+        # Même raison que pour HiGHS : le prétraitement ignore la limite de temps
+        options = {'disp': False, 'presolve': False}
+        if time_limit is not None:
+            options['time_limit'] = time_limit
+        result = milp(-objective, integrality=np.ones(model.n_cols),
+                      bounds=Bounds(model.col_lower, model.col_upper),
+                      constraints=self.constraints, options=options)
+        if result.status == 2:
+            return 'infeasible', None, None, None, None
+        if result.x is None:
+            return 'no_solution', None, None, None, None
+        status = 'optimal' if result.status == 0 else 'time_limit'
+        bound = getattr(result, 'mip_dual_bound', None)
+        gap = 0.0 if status == 'optimal' else getattr(result, 'mip_gap', None)
+        return (status, result.x, float(objective @ np.round(result.x)),
+                None if bound is None else -bound, gap)
+
+    def fix_objective(self, objective, value):
+        self.constraints.append(LinearConstraint(csc_matrix(objective), value - 0.5, np.inf))
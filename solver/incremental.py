@@ -0,0 +1,318 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from models.data_models import Student, AssignmentProblem, ProblemDelta
+
+@dataclass
+class DeltaReport:
+    """Bilan d'une réoptimisation incrémentale"""
+    affected_students: int  # Étudiants ajoutés, modifiés ou éjectés qu'il a fallu replacer
+    moved_students: List[int]  # IDs des étudiants déjà présents dont l'activité a changé
+    unplaced_students: List[int]  # IDs des étudiants à replacer restés sans choix satisfait
+    elapsed: float
+
+
+class IncrementalRepair:
+    """
+    Répare une attribution existante après une modification du problème, sans
+    tout recalculer.
+
+    Chaque étudiant à replacer obtient le meilleur choix possible par un chemin
+    augmentant : si l'activité visée est pleine, un occupant est déplacé vers
+    un de ses choix mieux classés, et ainsi de suite jusqu'à une place libre.
+    Personne n'est donc déplacé vers un choix moins bon, et les étudiants hors
+    de ces chemins gardent leur activité. Les places libérées sont proposées
+    aux étudiants non assignés ou en attribution forcée (et, si upgrade_existing
+    est vrai, aux étudiants qui y gagneraient un meilleur rang).
+
+    Les index (étudiants par ID, étudiants listant chaque activité, étudiants
+    sans place) sont construits une fois puis tenus à jour à chaque
+    modification : le coût d'une réparation dépend des activités touchées, pas
+    du nombre d'étudiants. Les étudiants et leurs choix ne doivent donc être
+    modifiés que par apply ; une réattribution faite ailleurs (nouvelle
+    optimisation) est détectée et l'index des étudiants sans place reconstruit.
+    """
+
+    def __init__(self, problem: AssignmentProblem, max_depth: int = 4,
+                 upgrade_existing: bool = False):
+        self.problem = problem
+        self.max_depth = max_depth
+        self.upgrade_existing = upgrade_existing
+
+        self._students: Dict[int, Student] = {student.id: student for student in problem.students}
+        # Index inversé : activité -> IDs des étudiants qui la listent dans leurs k choix
+        self._listed_by: Dict[int, Set[int]] = {choice_id: set() for choice_id in problem.choices}
+        for student in problem.students:
+            self._index(student)
+        # IDs des étudiants sans place (dictionnaire utilisé comme ensemble ordonné)
+        self._unassigned: Dict[int, None] = {
+            student.id: None for student in problem.students if student.assigned_choice is None
+        }
+
+    def apply(self, delta: ProblemDelta) -> DeltaReport:
+        """Applique les modifications et répare localement l'attribution"""
+        started = time.perf_counter()
+        problem = self.problem
+        self._validate(delta)
+
+        self._original: Dict[int, Optional[int]] = {}
+        self._open: Set[int] = {
+            choice_id for choice_id, choice in problem.choices.items()
+            if len(choice.assigned_students) < choice.capacity
+        }
+        freed: Set[int] = set()
+        displaced: List[Student] = []
+
+        # Désistements
+        removed = set(delta.removed_students)
+        for student_id in removed:
+            student = self._students.pop(student_id)
+            if student.assigned_choice is not None:
+                freed.add(student.assigned_choice)
+                self._unassign(student)
+            self._unindex(student)
+            self._unassigned.pop(student_id, None)
+        if removed:
+            problem.students = [s for s in problem.students if s.id not in removed]
+
+        # Nouvelles listes de choix
+        for student_id, choices in delta.preference_changes.items():
+            if student_id in removed:
+                continue
+            student = self._students[student_id]
+            self._unindex(student)
+            student.choices = list(choices)
+            self._index(student)
+            if student.assigned_choice is None:
+                displaced.append(student)
+            elif student.forced_assignment or student.assigned_choice not in student.choices[:problem.k]:
+                freed.add(student.assigned_choice)
+                self._unassign(student)
+                displaced.append(student)
+
+        # Modifications de capacité : les étudiants en surnombre qui perdent le
+        # moins (attributions forcées puis rangs les plus bas) sont à replacer
+        for choice_id, capacity in delta.capacity_changes.items():
+            choice = problem.choices[choice_id]
+            choice.capacity = capacity
+            overflow = len(choice.assigned_students) - capacity
+            if overflow > 0:
+                occupants = [self._students[sid] for sid in choice.assigned_students]
+                occupants.sort(key=lambda s: (s.forced_assignment, self._rank(s, choice_id) or 0),
+                               reverse=True)
+                for student in occupants[:overflow]:
+                    self._unassign(student)
+                    displaced.append(student)
+            elif overflow < 0:
+                freed.add(choice_id)
+            self._update_open(choice_id)
+
+        # Inscriptions tardives
+        for student in delta.added_students:
+            student.assigned_choice = None
+            student.forced_assignment = False
+            problem.students.append(student)
+            self._students[student.id] = student
+            self._index(student)
+            self._unassigned[student.id] = None
+            displaced.append(student)
+
+        unplaced = [student.id for student in displaced if not self._place(student)]
+        self._fill_freed(freed)
+
+        added = {student.id for student in delta.added_students}
+        moved = [
+            student_id for student_id, before in self._original.items()
+            if student_id in self._students and student_id not in added
+            and self._students[student_id].assigned_choice != before
+        ]
+        unplaced = [
+            student_id for student_id in unplaced
+            if self._students[student_id].assigned_choice is None
+            or self._students[student_id].forced_assignment
+        ]
+        return DeltaReport(
+            affected_students=len(displaced),
+            moved_students=moved,
+            unplaced_students=unplaced,
+            elapsed=time.perf_counter() - started
+        )
+
+    def _validate(self, delta: ProblemDelta):
+        """Vérifie que la modification ne référence que des éléments connus"""
+        choices = self.problem.choices
+        for choice_id, capacity in delta.capacity_changes.items():
+            if choice_id not in choices:
+                raise ValueError(f"Activité inconnue : {choice_id}")
+            if capacity < 0:
+                raise ValueError(f"Capacité négative pour l'activité {choice_id} : {capacity}")
+        for student_id in list(delta.removed_students) + list(delta.preference_changes):
+            if student_id not in self._students:
+                raise ValueError(f"Étudiant inconnu : {student_id}")
+        for student in delta.added_students:
+            if student.id in self._students:
+                raise ValueError(f"L'étudiant {student.id} existe déjà")
+        preference_lists = [s.choices for s in delta.added_students] + list(delta.preference_changes.values())
+        for choice_list in preference_lists:
+            invalid_ids = set(choice_list) - set(choices)
+            if invalid_ids:
+                raise ValueError(
+                    f"Erreur dans les choix : les IDs suivants n'existent pas "
+                    f"dans les activités : {invalid_ids}"
+                )
+
+    def _rank(self, student: Student, choice_id: int) -> Optional[int]:
+        """Rang (0-indexé) d'une activité dans les choix de l'étudiant, None si absente"""
+        choices = student.choices[:self.problem.k]
+        return choices.index(choice_id) if choice_id in choices else None
+
+    def _index(self, student: Student):
+        for choice_id in student.choices[:self.problem.k]:
+            self._listed_by.setdefault(choice_id, set()).add(student.id)
+
+    def _unindex(self, student: Student):
+        for choice_id in student.choices[:self.problem.k]:
+            self._listed_by[choice_id].discard(student.id)
+
+    def _free(self, choice_id: int) -> int:
+        choice = self.problem.choices[choice_id]
+        return choice.capacity - len(choice.assigned_students)
+
+    def _update_open(self, choice_id: int):
+        if self._free(choice_id) > 0:
+            self._open.add(choice_id)
+        else:
+            self._open.discard(choice_id)
+
+    def _unassign(self, student: Student):
+        self._original.setdefault(student.id, student.assigned_choice)
+        choice_id = student.assigned_choice
+        self.problem.choices[choice_id].assigned_students.remove(student.id)
+        student.assigned_choice = None
+        student.forced_assignment = False
+        self._unassigned[student.id] = None
+        self._update_open(choice_id)
+
+    def _assign(self, student: Student, choice_id: int):
+        """Attribue (ou déplace) un étudiant ; hors de ses choix, l'attribution est forcée"""
+        if student.assigned_choice is not None:
+            self._unassign(student)
+        else:
+            self._original.setdefault(student.id, None)
+        student.assigned_choice = choice_id
+        student.forced_assignment = self._rank(student, choice_id) is None
+        self._unassigned.pop(student.id, None)
+        self.problem.choices[choice_id].assigned_students.append(student.id)
+        self._update_open(choice_id)
+
+    def _place(self, student: Student) -> bool:
+        """Place un étudiant sur son meilleur choix atteignable ; False s'il n'en obtient aucun"""
+        for choice_id in student.choices[:self.problem.k]:
+            path = self._augmenting_path(choice_id)
+            if path is not None:
+                # Les déplacements se font depuis la place libre vers l'activité visée
+                for mover_id, target in reversed(path):
+                    self._assign(self._students[mover_id], target)
+                self._assign(student, choice_id)
+                return True
+
+        # Attribution forcée dans l'activité ayant le plus de places libres
+        if self._open:
+            self._assign(student, max(self._open, key=self._free))
+        return False
+
+    def _augmenting_path(self, target: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Recherche en largeur d'une place pour target : retourne la liste des
+        déplacements (étudiant, nouvelle activité) qui libèrent une place, chaque
+        étudiant déplacé obtenant un choix mieux classé (ou restant en attribution
+        forcée). None si aucun chemin de longueur au plus max_depth n'existe.
+        """
+        if self._free(target) > 0:
+            return []
+        parents: Dict[int, Optional[Tuple[int, int]]] = {target: None}
+        frontier = [target]
+        for _ in range(self.max_depth):
+            next_frontier = []
+            for current in frontier:
+                for occupant_id in self.problem.choices[current].assigned_students:
+                    occupant = self._students[occupant_id]
+                    rank = None if occupant.forced_assignment else self._rank(occupant, current)
+                    options = occupant.choices[:self.problem.k if rank is None else rank]
+                    if rank is None:
+                        options = options + list(self._open)
+                    for option in options:
+                        if option in parents:
+                            continue
+                        parents[option] = (current, occupant_id)
+                        if self._free(option) > 0:
+                            return self._unwind(parents, option)
+                        next_frontier.append(option)
+            frontier = next_frontier
+            if not frontier:
+                break
+        return None
+
+    def _unwind(self, parents, reached: int) -> List[Tuple[int, int]]:
+        """Reconstruit les déplacements, de l'activité visée vers la place libre"""
+        path = []
+        while parents[reached] is not None:
+            previous, mover_id = parents[reached]
+            path.append((mover_id, reached))
+            reached = previous
+        path.reverse()
+        return path
+
+    def _fill_freed(self, freed: Set[int]):
+        """
+        Propose les places libérées aux étudiants qui y gagnent, en cascade :
+        seuls les étudiants listant une activité libérée (index inversé) sont examinés
+        """
+        if not freed:
+            return
+        queue = list(freed)
+        while queue:
+            choice_id = queue.pop()
+            while self._free(choice_id) > 0:
+                best, best_key = None, None
+                for student_id in self._listed_by.get(choice_id, ()):
+                    student = self._students[student_id]
+                    rank = self._rank(student, choice_id)
+                    if student.assigned_choice is None:
+                        key = (0, rank)
+                    elif student.forced_assignment:
+                        key = (1, rank)
+                    elif self.upgrade_existing and rank < self._rank(student, student.assigned_choice):
+                        key = (2, rank)
+                    else:
+                        continue
+                    if best_key is None or key < best_key:
+                        best, best_key = student, key
+                if best is None:
+                    break
+                previous = best.assigned_choice
+                self._assign(best, choice_id)
+                if previous is not None:
+                    queue.append(previous)
+
+        # Les étudiants encore sans place prennent une place libre quelconque
+        if not self._open:
+            return
+        for student_id in self._unassigned_ids():
+            if not self._open:
+                break
+            self._assign(self._students[student_id], max(self._open, key=self._free))
+
+    def _unassigned_ids(self) -> List[int]:
+        """
+        IDs des étudiants sans place. Leur nombre attendu se déduit des
+        occupations (en O(m)) : s'il diffère de l'index, l'attribution a été
+        modifiée hors de apply et l'index est reconstruit.
+        """
+        seated = sum(len(choice.assigned_students) for choice in self.problem.choices.values())
+        ids = [student_id for student_id in self._unassigned
+               if self._students[student_id].assigned_choice is None]
+        if len(ids) != len(self._students) - seated:
+            ids = [student.id for student in self.problem.students if student.assigned_choice is None]
+        self._unassigned = dict.fromkeys(ids)
+        return ids
@@ -0,0 +1,502 @@
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from models.scoring import integer_weights
+from solver.optimizer import SatisfactionOptimizer
+import profiling
+
+# Budget par défaut de LocalSearchOptimizer (secondes)
+DEFAULT_TIME_LIMIT = 1.0
+
+@dataclass
+class LocalSearchStats:
+    """Bilan d'une passe de recherche locale"""
+    initial_score: float
+    final_score: float
+    moves: int  # Nombre de déplacements d'étudiants appliqués
+    chains: int  # Nombre de chaînes améliorantes (déplacements, échanges, cycles) appliquées
+    local_optimum: bool  # False si la recherche a été interrompue par le budget de temps
+    elapsed: float
+
+
+class LocalSearch:
+    """
+    Amélioration locale d'une attribution existante.
+
+    On cherche des chaînes d'éjection améliorantes de longueur au plus max_depth :
+    un étudiant quitte son activité (ou la liste des non-assignés) pour une autre,
+    dont un occupant est éjecté vers une troisième, etc. La chaîne se termine sur
+    une place libre ou sur la place libérée par le premier étudiant (échange à
+    deux, cycle à trois...).
+
+    Pour chaque activité et chaque destination, les occupants candidats au
+    départ sont rangés dans un tas selon leur gain (entrées périmées retirées
+    à la lecture) : le meilleur maillon s'obtient sans parcourir les occupants.
+    Seules les activités touchées par une chaîne sont réexaminées (file de
+    travail, les plus prometteuses d'abord) ; un dernier balayage complet
+    confirme l'optimum local. Une branche n'est explorée que si le gain
+    cumulé, majoré des meilleurs maillons restants, peut devenir positif.
+    """
+
+    # Destination « n'importe quelle place libre » (attribution forcée)
+    ANY_OPEN = -1
+
+    def __init__(self, problem: ArrayAssignmentProblem, max_depth: int = 3):
+        self.problem = problem
+        self.max_depth = max_depth
+        self.rank_weights, self.forced_weight = integer_weights(problem.k)
+        # Gain maximal d'un maillon (un non-assigné qui obtient son premier choix)
+        self.max_step = self.rank_weights[0]
+
+        self.preferences = problem.preferences.tolist()
+        self.assignment = problem.assignment.tolist()
+        n_choices = problem.n_choices
+        self.pool = n_choices  # Nœud des étudiants non assignés
+
+        occupancy = np.bincount(problem.assignment[problem.assignment >= 0], minlength=n_choices)
+        self.free = (problem.capacities.astype(np.int64) - occupancy).tolist()
+
+        # Ensemble indexé des activités ayant des places libres
+        self.open_choices: List[int] = []
+        self.open_position = [-1] * n_choices
+        self.open_version = 0  # Incrémenté à chaque activité qui devient ouverte
+        for choice_idx in range(n_choices):
+            self._update_open(choice_idx)
+
+        # heaps[nœud][destination] : tas de (-gain, étudiant) ; sources[d] : nœuds ayant un tas vers d
+        self.heaps: List[Dict[int, list]] = [{} for _ in range(n_choices + 1)]
+        self.sources: List[set] = [set() for _ in range(n_choices)]
+        # Majorant du meilleur gain d'un départ depuis chaque nœud
+        self.best_step = [-self.max_step] * (n_choices + 1)
+        # Départs de chaque nœud (voir _links) et meilleur départ forcé, None si à recalculer
+        self.links: List[Optional[list]] = [None] * (n_choices + 1)
+        self.forced_link: List[Optional[Tuple[int, int]]] = [None] * (n_choices + 1)
+        self.link_to: List[Optional[dict]] = [None] * (n_choices + 1)
+        # Meilleur départ vers une place libre (voir _open_link) et majorant global
+        self.open_links: List[Optional[tuple]] = [None] * (n_choices + 1)
+        self.open_bound = -self.max_step
+        self.open_bound_version = -1
+        self._build_heaps()
+
+        # File de travail : les nœuds les plus prometteurs d'abord
+        self.worklist: List[Tuple[int, int]] = []
+        self.queued = [False] * (n_choices + 1)
+        self.chains_since_sweep = 0
+        self._enqueue_all()
+
+    def weight(self, student: int, choice_idx: int) -> int:
+        """Poids de l'attribution d'un étudiant à une activité (0 si non assigné)"""
+        if choice_idx < 0:
+            return 0
+        for rank, preferred in enumerate(self.preferences[student]):
+            if preferred == choice_idx:
+                return self.rank_weights[rank]
+        return self.forced_weight
+
+    def _node(self, student: int) -> int:
+        choice_idx = self.assignment[student]
+        return choice_idx if choice_idx >= 0 else self.pool
+
+    def _build_heaps(self):
+        """Construit tous les tas d'un coup : une liste triée est un tas valide"""
+        problem = self.problem
+        preferences = problem.preferences
+        n_students, k = preferences.shape
+        assignment = problem.assignment
+        nodes = np.where(assignment >= 0, assignment, self.pool).astype(np.int64)
+        ranks = problem.assignment_ranks()
+        rank_weights = np.asarray(self.rank_weights, dtype=np.int64)
+        current = np.where(assignment < 0, 0,
+                           np.where(ranks >= 0, rank_weights[np.maximum(ranks, 0)], self.forced_weight))
+
+        students = np.arange(n_students, dtype=np.int64)
+        parts = []
+        for rank in range(k):
+            destinations = preferences[:, rank].astype(np.int64)
+            # Un choix répété ne compte qu'à sa première occurrence
+            valid = (destinations >= 0) & (destinations != assignment)
+            if rank:
+                valid &= ~(preferences[:, :rank] == preferences[:, [rank]]).any(axis=1)
+            parts.append((nodes[valid], destinations[valid],
+                          current[valid] - rank_weights[rank], students[valid]))
+        parts.append((nodes, np.full(n_students, self.ANY_OPEN, dtype=np.int64),
+                      current - self.forced_weight, students))
+        node_of, destination_of, cost, student_of = (np.concatenate(column) for column in zip(*parts))
+
+        order = np.lexsort((cost, destination_of, node_of))
+        node_of, destination_of = node_of[order], destination_of[order]
+        cost, student_of = cost[order].tolist(), student_of[order].tolist()
+        starts = np.flatnonzero(np.r_[True, (node_of[1:] != node_of[:-1])
+                                      | (destination_of[1:] != destination_of[:-1])])
+        bounds = np.r_[starts, len(order)].tolist()
+        for start, end, node, destination in zip(bounds[:-1], bounds[1:],
+                                                 node_of[starts].tolist(),
+                                                 destination_of[starts].tolist()):
+            self.heaps[node][destination] = list(zip(cost[start:end], student_of[start:end]))
+            if destination >= 0:
+                self.sources[destination].add(node)
+            if -cost[start] > self.best_step[node]:
+                self.best_step[node] = -cost[start]
+
+    def _push_student(self, student: int, node: int):
+        """Ajoute les départs possibles d'un étudiant arrivé sur node"""
+        current = self.weight(student, node if node != self.pool else -1)
+        heaps = self.heaps[node]
+        best = self.best_step[node]
+        seen = set()
+        for rank, destination in enumerate(self.preferences[student]):
+            if destination < 0 or destination == node or destination in seen:
+                continue
+            seen.add(destination)
+            gain = self.rank_weights[rank] - current
+            heapq.heappush(heaps.setdefault(destination, []), (-gain, student))
+            self.sources[destination].add(node)
+            best = max(best, gain)
+        gain = self.forced_weight - current
+        heapq.heappush(heaps.setdefault(self.ANY_OPEN, []), (-gain, student))
+        self.best_step[node] = max(best, gain)
+
+    def _top(self, node: int, heap: list) -> Optional[Tuple[int, int]]:
+        """Meilleur départ valide d'un tas (gain, étudiant), en retirant les entrées périmées"""
+        assignment = self.assignment
+        pool = self.pool
+        while heap:
+            cost, student = heap[0]
+            choice_idx = assignment[student]
+            if (choice_idx if choice_idx >= 0 else pool) == node:
+                return -cost, student
+            heapq.heappop(heap)
+        return None
+
+    def _enqueue(self, node: int):
+        if not self.queued[node]:
+            self.queued[node] = True
+            heapq.heappush(self.worklist, (-self.best_step[node], node))
+
+    def _enqueue_all(self):
+        for node in range(self.pool + 1):
+            self._enqueue(node)
+        self.chains_since_sweep = 0
+
+    def run(self, time_limit: Optional[float] = None) -> LocalSearchStats:
+        """
+        Applique des chaînes améliorantes jusqu'à un optimum local ou jusqu'à
+        épuisement du budget de temps (en secondes), puis met à jour le problème.
+        Un nouvel appel reprend là où le précédent s'est arrêté.
+        """
+        started = time.perf_counter()
+        deadline = started + time_limit if time_limit is not None else None
+        initial_score = self.problem.get_satisfaction_score()
+
+        moves = chains = 0
+        local_optimum = False
+        while True:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if not self.worklist:
+                # Balayage de confirmation : aucun nœud n'a plus de chaîne améliorante
+                if self.chains_since_sweep == 0:
+                    local_optimum = True
+                    break
+                self._enqueue_all()
+            _, node = heapq.heappop(self.worklist)
+            self.queued[node] = False
+
+            chain = self._search_from(node)
+            if chain is None:
+                continue
+            self._apply(chain)
+            moves += len(chain)
+            chains += 1
+            self.chains_since_sweep += 1
+
+        self._write_back()
+        return LocalSearchStats(
+            initial_score=initial_score,
+            final_score=self.problem.get_satisfaction_score(),
+            moves=moves,
+            chains=chains,
+            local_optimum=local_optimum,
+            elapsed=time.perf_counter() - started
+        )
+
+    def _search_from(self, node: int) -> Optional[List[Tuple[int, int]]]:
+        """Cherche une chaîne améliorante dont le premier étudiant quitte node"""
+        origin = node if node != self.pool else -1
+        if origin < 0 and not self.open_choices:
+            return None  # Un non-assigné ne peut entrer nulle part
+        # Derniers maillons possibles vers la place libérée : nœud -> (gain, étudiant)
+        into = {}
+        if origin >= 0:
+            for source in list(self.sources[origin]):
+                heap = self.heaps[source].get(origin)
+                top = self._top(source, heap) if heap is not None else None
+                if top is not None:
+                    into[source] = top
+        # Majorant du dernier maillon : vers une place libre, ou vers origin par un
+        # étudiant qui la liste ou par un passage forcé (gain au plus nul)
+        closing = self._open_bound() if self.open_choices else -self.max_step
+        if origin >= 0:
+            closing = max(closing, 0, max((gain for gain, _ in into.values()), default=0))
+        return self._search(node, [], 0, origin, {node}, into, closing)
+
+    def _links(self, node: int) -> List[Tuple[int, int, int]]:
+        """
+        Meilleur départ de node vers chaque destination : (gain, destination,
+        étudiant), du meilleur au pire. Le résultat est gardé jusqu'à ce qu'un
+        étudiant entre dans node ou en sorte ; les tas vides sont supprimés.
+        """
+        links = self.links[node]
+        if links is not None:
+            return links
+        links = []
+        heaps = self.heaps[node]
+        for destination in list(heaps):
+            top = self._top(node, heaps[destination])
+            if top is None:
+                del heaps[destination]
+                if destination >= 0:
+                    self.sources[destination].discard(node)
+            else:
+                links.append((top[0], destination, top[1]))
+        links.sort(reverse=True)
+        self.links[node] = links
+        self.link_to[node] = {destination: (gain, student) for gain, destination, student in links}
+        self.forced_link[node] = self.link_to[node].get(self.ANY_OPEN)
+        self.best_step[node] = links[0][0] if links else -self.max_step
+        return links
+
+    def _open_link(self, node: int) -> Optional[Tuple[int, int, int]]:
+        """
+        Meilleur départ de node vers une place libre : (gain, étudiant, activité),
+        gardé tant que son activité reste ouverte, qu'aucune autre ne s'ouvre et
+        que les départs de node ne changent pas.
+        """
+        cached = self.open_links[node]
+        if cached is not None and cached[0] == self.open_version and (
+                cached[1] is None or self.free[cached[1][2]] > 0):
+            return cached[1]
+        link = None
+        if self.open_choices:
+            for gain, destination, student in self._links(node):
+                if destination == self.ANY_OPEN:
+                    target = next((c for c in self.open_choices[:2] if c != node), None)
+                    if target is not None:
+                        link = (gain, student, target)
+                        break
+                elif self.free[destination] > 0:
+                    link = (gain, student, destination)
+                    break
+        self.open_links[node] = (self.open_version, link)
+        return link
+
+    def _open_bound(self) -> int:
+        """Majorant du gain d'un départ vers une place libre, tous nœuds confondus"""
+        if self.open_bound_version != self.open_version:
+            links = (self._open_link(node) for node in range(self.pool + 1))
+            self.open_bound = max((link[0] for link in links if link is not None), default=-self.max_step)
+            self.open_bound_version = self.open_version
+        return self.open_bound
+
+    def _closing(self, node: int, origin: int, into: dict, to_origin: bool) -> Optional[Tuple[int, int, int]]:
+        """
+        Meilleur dernier maillon depuis node : (gain, étudiant, activité), vers
+        une place libre ou, si to_origin, vers la place libérée par le premier
+        étudiant (qui la liste, ou y est forcé).
+        """
+        best = self._open_link(node)
+        if to_origin:
+            self._links(node)
+            for link in (into.get(node), self.forced_link[node]):
+                if link is not None and (best is None or link[0] > best[0]):
+                    best = (link[0], link[1], origin)
+        return best
+
+    def _best_closing_pair(self, node, chain, gain, origin, visited, into, closing) -> Optional[List[Tuple[int, int]]]:
+        """
+        Deux derniers maillons (node -> d, puis d -> place libre ou origin) :
+        meilleure paire, évaluée exactement. Les maillons node -> d sont
+        parcourus du meilleur au pire, jusqu'à ce que la paire ne puisse plus
+        faire mieux ; d n'est examiné que si son majorant (maillon vers origin
+        s'il existe, sinon majorant commun des autres fermetures) le permet.
+        """
+        free = self.free
+        to_origin = origin >= 0
+        # Fermetures hors into : place libre, ou passage forcé sur origin (gain au plus nul)
+        other = self._open_bound() if self.open_choices else -self.max_step
+        if to_origin:
+            other = max(other, 0)
+        links, forced_link, open_links = self.links, self.forced_link, self.open_links
+        version = self.open_version
+        best, best_chain = 0, None
+        for step_gain, destination, occupant in self._links(node):
+            if gain + step_gain + closing <= best:
+                break
+            if (destination == self.ANY_OPEN or destination in visited
+                    or destination == origin or free[destination] > 0):
+                continue
+            entry = into.get(destination)
+            bound = other if entry is None or entry[0] < other else entry[0]
+            if gain + step_gain + bound <= best:
+                continue
+            # Dernier maillon depuis destination (voir _closing), avec les caches en direct
+            cached = open_links[destination]
+            if cached is not None and cached[0] == version and (cached[1] is None or free[cached[1][2]] > 0):
+                last = cached[1]
+            else:
+                last = self._open_link(destination)
+            if to_origin:
+                if links[destination] is None:
+                    self._links(destination)
+                for link in (entry, forced_link[destination]):
+                    if link is not None and (last is None or link[0] > last[0]):
+                        last = (link[0], link[1], origin)
+            if last is not None and gain + step_gain + last[0] > best:
+                best = gain + step_gain + last[0]
+                best_chain = chain + [(occupant, destination), (last[1], last[2])]
+        return best_chain
+
+    def _search(self, node, chain, gain, origin, visited, into, closing) -> Optional[List[Tuple[int, int]]]:
+        """
+        Prolonge la chaîne en déplaçant un occupant de node (recherche en profondeur
+        bornée, meilleurs maillons d'abord). origin est l'activité libérée par le
+        premier étudiant (-1 s'il était non assigné) ; visited contient les nœuds
+        déjà traversés ; into donne les maillons vers origin et closing majore le
+        gain du dernier maillon.
+        """
+        last = self._closing(node, origin, into, bool(chain) and origin >= 0)
+        if last is not None and gain + last[0] > 0:
+            return chain + [(last[1], last[2])]
+
+        remaining = self.max_depth - len(chain) - 1  # Maillons possibles après celui-ci
+        if remaining == 0:
+            return None
+        if remaining == 1:
+            return self._best_closing_pair(node, chain, gain, origin, visited, into, closing)
+
+        best_step = self.best_step
+        free = self.free
+        # Majorant de la suite : meilleur départ de destination, maillons intermédiaires et dernier
+        tail = (remaining - 2) * self.max_step + closing
+        candidates = sorted(((step_gain + best_step[destination], step_gain, destination, occupant)
+                             for step_gain, destination, occupant in self._links(node)
+                             if destination != self.ANY_OPEN and destination not in visited
+                             and destination != origin and free[destination] == 0),
+                            reverse=True)
+        for optimistic, step_gain, destination, occupant in candidates:
+            if gain + optimistic + tail <= 0:
+                break
+            visited.add(destination)
+            found = self._search(destination, chain + [(occupant, destination)],
+                                 gain + step_gain, origin, visited, into, closing)
+            visited.discard(destination)
+            if found is not None:
+                return found
+        return None
+
+    def _apply(self, chain: List[Tuple[int, int]]):
+        """Applique une chaîne et remet en file les nœuds dont les départs ont pu changer"""
+        was_open = bool(self.open_choices)
+        touched = set()
+        for mover, target in chain:
+            touched.add(self._node(mover))
+            touched.add(target)
+        freed_before = {c: self.free[c] > 0 for c in touched if c != self.pool}
+        # Le majorant des départs vers une place libre est recalculé si un nœud touché l'atteignait
+        if self.open_bound_version == self.open_version:
+            for node in touched:
+                link = self._open_link(node)
+                if link is not None and link[0] == self.open_bound:
+                    self.open_bound_version = -1
+                    break
+        for mover, target in chain:
+            self._move(mover, target)
+        for node in touched:
+            self._enqueue(node)
+            if self.open_bound_version == self.open_version:
+                link = self._open_link(node)
+                if link is not None and link[0] > self.open_bound:
+                    self.open_bound = link[0]
+        # Une place qui se libère ouvre de nouvelles chaînes aux nœuds qui y mènent
+        for choice_idx, was_free in freed_before.items():
+            if not was_free and self.free[choice_idx] > 0:
+                for source in self.sources[choice_idx]:
+                    self._enqueue(source)
+        if self.open_choices and not was_open:
+            self._enqueue_all()
+
+    def _move(self, student: int, target: int):
+        """Déplace un étudiant et enregistre ses départs possibles depuis target"""
+        origin = self.assignment[student]
+        for node in (origin if origin >= 0 else self.pool, target):
+            self.links[node] = None
+            self.open_links[node] = None
+        if origin >= 0:
+            self.free[origin] += 1
+            self._update_open(origin)
+        self.assignment[student] = target
+        self.free[target] -= 1
+        self._update_open(target)
+        self._push_student(student, target)
+
+    def _update_open(self, choice_idx: int):
+        """Maintient l'ensemble indexé des activités ouvertes"""
+        is_open = self.free[choice_idx] > 0
+        index = self.open_position[choice_idx]
+        if is_open and index < 0:
+            self.open_version += 1
+            self.open_position[choice_idx] = len(self.open_choices)
+            self.open_choices.append(choice_idx)
+        elif not is_open and index >= 0:
+            last = self.open_choices.pop()
+            if last != choice_idx:
+                self.open_choices[index] = last
+                self.open_position[last] = index
+            self.open_position[choice_idx] = -1
+
+    def _write_back(self):
+        """Recopie l'attribution dans le problème (les attributions hors choix sont forcées)"""
+        problem = self.problem
+        problem.assignment[:] = self.assignment
+        ranks = problem.assignment_ranks()
+        problem.forced[:] = (problem.assignment >= 0) & (ranks < 0)
+        problem.recompute_occupancy()
+
+
+class LocalSearchOptimizer(SatisfactionOptimizer):
+    """
+    Algorithme glouton suivi d'une passe de recherche locale, limitée par
+    défaut à DEFAULT_TIME_LIMIT secondes (time_limit=None : jusqu'à l'optimum local)
+    """
+
+    def __init__(self, problem: Union[AssignmentProblem, ArrayAssignmentProblem],
+                 time_limit: Optional[float] = DEFAULT_TIME_LIMIT, max_depth: int = 3):
+        super().__init__(problem)
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.last_stats: Optional[LocalSearchStats] = None
+
+    def optimize(self, seed: Optional[int] = None) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
+        """Construit une solution gloutonne puis l'améliore localement"""
+        super().optimize(seed=seed)
+        return self.improve()
+
+    def improve(self) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
+        """Améliore localement l'attribution courante du problème, quelle qu'elle soit"""
+        if isinstance(self.problem, ArrayAssignmentProblem):
+            columns = self.problem
+        else:
+            columns = ArrayAssignmentProblem.from_problem(self.problem)
+
+        with profiling.span('local_search'):
+            self.last_stats = LocalSearch(columns, self.max_depth).run(self.time_limit)
+            profiling.count('moves', self.last_stats.moves)
+            profiling.count('chains', self.last_stats.chains)
+
+        if columns is not self.problem:
+            columns.apply_to(self.problem)
+        return self.problem
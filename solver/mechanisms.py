@@ -0,0 +1,399 @@
+"""
+Mécanismes d'attribution par loterie et estimation de leur équité.
+
+- dictature sérielle aléatoire : les étudiants choisissent tour à tour, dans
+  l'ordre d'un tirage au sort (par classe de priorité s'il y en a) ;
+- acceptation différée (Gale-Shapley, étudiants proposants) : chaque activité
+  classe ses candidats par classe de priorité, puis par tirage au sort ;
+- partage probabiliste (algorithme « de la dégustation ») : chaque étudiant
+  consomme à vitesse constante son meilleur choix encore disponible, ce qui
+  donne directement ses probabilités d'attribution.
+
+Les classes de priorité sont des entiers (0 = la plus prioritaire), soit une
+par étudiant (n,), soit une par choix (n, k) pour réserver une activité à
+certains étudiants. Les deux premiers mécanismes sont simulés sur des milliers
+de loteries à la fois, en tableaux NumPy, pour estimer les probabilités
+d'attribution de chaque étudiant.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from models.scoring import FORCED_SCORE
+from solver.optimizer import SatisfactionOptimizer
+import profiling
+
+MECHANISMS = ('serial_dictatorship', 'deferred_acceptance', 'probabilistic_serial')
+
+
+@dataclass
+class FairnessReport:
+    """
+    Probabilités d'attribution de chaque étudiant sous un mécanisme : matrice
+    (n, k + 2) dont les colonnes 0..k-1 sont les rangs, la colonne k les
+    attributions forcées et la colonne k + 1 l'absence d'attribution.
+    """
+    mechanism: str
+    probabilities: np.ndarray
+    k: int
+    n_lotteries: Optional[int] = None  # None : probabilités exactes (partage probabiliste)
+    classes: Optional[np.ndarray] = None  # Classe de priorité de chaque étudiant, si globale
+
+    @property
+    def expected_scores(self) -> np.ndarray:
+        """Score de satisfaction espéré de chaque étudiant"""
+        weights = np.concatenate([(self.k - np.arange(self.k)) / self.k, [FORCED_SCORE, 0.0]])
+        return self.probabilities @ weights
+
+    def summary(self) -> Dict:
+        scores = self.expected_scores
+        mean_probabilities = self.probabilities.mean(axis=0) if len(scores) else np.zeros(self.k + 2)
+        summary = {
+            'mechanism': self.mechanism,
+            'lotteries': self.n_lotteries,
+            'students': len(scores),
+            'expected_score': float(scores.mean()) if len(scores) else 0.0,
+            'min_expected_score': float(scores.min()) if len(scores) else 0.0,
+            'p10_expected_score': float(np.percentile(scores, 10)) if len(scores) else 0.0,
+            'std_expected_score': float(scores.std()) if len(scores) else 0.0,
+            'rank_probabilities': mean_probabilities[:self.k].tolist(),
+            'forced_probability': float(mean_probabilities[self.k]),
+            'unassigned_probability': float(mean_probabilities[self.k + 1]),
+        }
+        if self.classes is not None:
+            summary['expected_score_by_class'] = {
+                int(c): float(scores[self.classes == c].mean()) for c in np.unique(self.classes)
+            }
+        return summary
+
+    def to_frame(self, problem: Union[AssignmentProblem, ArrayAssignmentProblem]) -> pd.DataFrame:
+        """Tableau par étudiant, prêt à être exporté"""
+        if isinstance(problem, ArrayAssignmentProblem):
+            ids, names = problem.student_ids, problem.student_names
+        else:
+            ids = [s.id for s in problem.students]
+            names = [s.name for s in problem.students]
+        frame = pd.DataFrame({'ID étudiant': ids, 'Nom': names})
+        for rank in range(self.k):
+            frame[f'P(choix {rank + 1})'] = self.probabilities[:, rank]
+        frame['P(attribution forcée)'] = self.probabilities[:, self.k]
+        frame['P(non assigné)'] = self.probabilities[:, self.k + 1]
+        frame['Score espéré'] = self.expected_scores
+        return frame
+
+
+class MechanismOptimizer(SatisfactionOptimizer):
+    """
+    Attribution par un mécanisme à loterie (une loterie par appel à optimize).
+    Les étudiants sans place dans leurs choix reçoivent ensuite, dans l'ordre
+    du tirage, une place libre tirée au hasard (attribution forcée).
+    """
+
+    def __init__(self, problem: Union[AssignmentProblem, ArrayAssignmentProblem],
+                 mechanism: str = 'serial_dictatorship', priorities: Optional[np.ndarray] = None):
+        super().__init__(problem)
+        if mechanism not in MECHANISMS:
+            raise ValueError(f"Mécanisme inconnu : {mechanism} (possibles : {MECHANISMS})")
+        if mechanism == 'probabilistic_serial':
+            raise ValueError("Le partage probabiliste ne donne que des probabilités : "
+                             "utilisez assignment_probabilities")
+        self.mechanism = mechanism
+        self.priorities = _priority_classes(priorities, problem, mechanism)
+
+    def optimize(self, seed: Optional[int] = None) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
+        """Tire une loterie ; la même graine redonne la même attribution"""
+        self._reset_assignments()
+        if isinstance(self.problem, ArrayAssignmentProblem):
+            columns = self.problem
+        else:
+            columns = ArrayAssignmentProblem.from_problem(self.problem)
+
+        rng = np.random.default_rng(seed)
+        with profiling.span(self.mechanism):
+            order, tickets = _draw_lotteries(columns.n_students, 1, rng)
+            held, _ = _run_lotteries(columns, order, tickets, self.priorities)
+            assignment = held[0].astype(np.int32)
+
+            # Places libres tirées au hasard pour les étudiants restants, dans l'ordre du tirage
+            free = columns.capacities - np.bincount(assignment[assignment >= 0],
+                                                    minlength=columns.n_choices)
+            seats = np.repeat(np.arange(columns.n_choices, dtype=np.int32), free)
+            rng.shuffle(seats)
+            waiting = order[0][assignment[order[0]] < 0][:len(seats)]
+            assignment[waiting] = seats[:len(waiting)]
+            profiling.count('forced_assignments', len(waiting))
+
+        columns.assignment[:] = assignment
+        columns.forced[:] = False
+        columns.forced[waiting] = True
+        columns.recompute_occupancy()
+        if columns is not self.problem:
+            columns.apply_to(self.problem)
+        return self.problem
+
+
+def assignment_probabilities(problem: Union[AssignmentProblem, ArrayAssignmentProblem],
+                             mechanism: str = 'serial_dictatorship',
+                             priorities: Optional[np.ndarray] = None, n_lotteries: int = 1000,
+                             seed: Optional[int] = None, chunk_size: int = 256) -> FairnessReport:
+    """
+    Probabilités d'attribution de chaque étudiant : estimées sur n_lotteries
+    loteries (simulées par paquets de chunk_size) pour la dictature sérielle et
+    l'acceptation différée, exactes pour le partage probabiliste.
+    """
+    if mechanism not in MECHANISMS:
+        raise ValueError(f"Mécanisme inconnu : {mechanism} (possibles : {MECHANISMS})")
+    columns = problem if isinstance(problem, ArrayAssignmentProblem) else ArrayAssignmentProblem.from_problem(problem)
+    n, k = columns.n_students, columns.k
+    classes = np.asarray(priorities) if priorities is not None and np.ndim(priorities) == 1 else None
+
+    with profiling.span(f'probabilités ({mechanism})'):
+        if mechanism == 'probabilistic_serial':
+            probabilities = np.zeros((n, k + 2))
+            probabilities[:, :k] = probabilistic_serial(columns.preferences, columns.capacities)
+            # Part non attribuée dans les choix : places restantes réparties au prorata
+            outside = np.clip(1.0 - probabilities[:, :k].sum(axis=1), 0.0, 1.0)
+            left_seats = max(float(columns.capacities.sum()) - probabilities[:, :k].sum(), 0.0)
+            forced_share = min(1.0, left_seats / outside.sum()) if outside.sum() > 0 else 0.0
+            probabilities[:, k] = outside * forced_share
+            probabilities[:, k + 1] = outside - probabilities[:, k]
+            return FairnessReport(mechanism, probabilities, k, None, classes)
+
+        priority_classes = _priority_classes(priorities, columns, mechanism)
+        rng = np.random.default_rng(seed)
+        counts = np.zeros(n * (k + 2), dtype=np.int64)
+        total_seats = int(columns.capacities.sum())
+        for start in range(0, n_lotteries, chunk_size):
+            n_chunk = min(chunk_size, n_lotteries - start)
+            order, tickets = _draw_lotteries(n, n_chunk, rng)
+            held, ranks = _run_lotteries(columns, order, tickets, priority_classes)
+
+            # Attributions forcées : les étudiants sans place, dans l'ordre du tirage
+            unmatched = held < 0
+            free = total_seats - (~unmatched).sum(axis=1)
+            position = np.empty_like(order)
+            np.put_along_axis(position, order,
+                              np.cumsum(np.take_along_axis(unmatched, order, axis=1), axis=1), axis=1)
+            forced = unmatched & (position <= free[:, None])
+
+            categories = np.where(unmatched, np.where(forced, k, k + 1), ranks)
+            counts += np.bincount((np.arange(n) * (k + 2) + categories).ravel(),
+                                  minlength=n * (k + 2))
+            profiling.count('lotteries', n_chunk)
+    probabilities = counts.reshape(n, k + 2) / max(n_lotteries, 1)
+    return FairnessReport(mechanism, probabilities, k, n_lotteries, classes)
+
+
+def serial_dictatorship(preferences: np.ndarray, capacities: np.ndarray,
+                        order: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dictature sérielle simulée pour plusieurs loteries à la fois : au pas t,
+    le t-ième étudiant de chaque ordre de passage prend son meilleur choix
+    encore disponible.
+
+    order : (s, n) ordre de passage des étudiants dans chaque loterie
+    Retourne (activité obtenue ou -1, rang de ce choix ou -1), chacun de forme (s, n).
+    """
+    preferences = np.asarray(preferences)
+    n_lotteries, n = order.shape
+    remaining = np.tile(np.asarray(capacities, dtype=np.int32), (n_lotteries, 1))
+    held = np.full((n_lotteries, n), -1, dtype=np.int32)
+    ranks = np.full((n_lotteries, n), -1, dtype=np.int32)
+    lotteries = np.arange(n_lotteries)
+    valid = preferences >= 0
+    safe_preferences = np.where(valid, preferences, 0)
+
+    turns = np.ascontiguousarray(order.T)
+    remaining = remaining.ravel()
+    offsets = (lotteries * len(capacities))[:, None]
+    for students in turns:
+        choices = safe_preferences[students]
+        available = valid[students] & (remaining[offsets + choices] > 0)
+        rank = available.argmax(axis=1)
+        served = available[lotteries, rank]
+        choice = choices[lotteries, rank]
+        held[lotteries, students] = np.where(served, choice, -1)
+        ranks[lotteries, students] = np.where(served, rank, -1)
+        remaining[(offsets[:, 0] + choice)[served]] -= 1
+    return held, ranks
+
+
+def deferred_acceptance(preferences: np.ndarray, capacities: np.ndarray, tickets: np.ndarray,
+                        priorities: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Acceptation différée, étudiants proposants, simulée pour plusieurs loteries à la fois.
+
+    tickets : (s, n) rang de chaque étudiant dans chaque loterie (0 = premier tiré)
+    priorities : classe de priorité de l'étudiant, pour tous ses choix (n,) ou
+        pour chacun d'eux (n, k) ; None = aucune ; à classe égale, le tirage départage
+    Retourne (activité obtenue ou -1, rang de ce choix ou -1), chacun de forme (s, n).
+    Avec une classe par étudiant identique pour tous ses choix, le résultat est
+    celui de la dictature sérielle dans l'ordre (classe, tirage).
+    """
+    preferences = np.asarray(preferences)
+    capacities = np.asarray(capacities, dtype=np.int64)
+    n_lotteries, n = tickets.shape
+    k = preferences.shape[1]
+    m = len(capacities)
+    if priorities is None:
+        priorities = np.zeros((n, k), dtype=np.int64)
+    elif priorities.ndim == 1:
+        priorities = np.repeat(priorities[:, None], k, axis=1)
+
+    # Prochain choix à proposer (ou choix détenu), à plat (indice = loterie * n + étudiant)
+    pointer = np.zeros(n_lotteries * n, dtype=np.int64)
+    flat_tickets = tickets.ravel()
+    padded = np.concatenate([preferences, np.full((n, 1), -1, preferences.dtype)], axis=1)
+    open_choice = padded >= 0
+    open_choice[:, :k] &= capacities[np.maximum(preferences, 0)] > 0
+    open_choice = open_choice.ravel()
+    flat_preferences = preferences.ravel()
+    flat_priorities = priorities.ravel()
+    # Clé de classement : classe, puis tirage ; key_range marque une place libre
+    key_range = (int(priorities.max(initial=0)) + 1) * n
+
+    # Places de chaque activité de chaque loterie, contiguës et triées par clé :
+    # la dernière place donne directement le seuil d'admission
+    seats = int(capacities.sum())
+    seat_start = np.concatenate([[0], np.cumsum(capacities)[:-1]])
+    slot_key = np.full(n_lotteries * seats, key_range, dtype=np.int64)
+    slot_holder = np.full(n_lotteries * seats, -1, dtype=np.int64)
+
+    waiting = np.arange(n_lotteries * n)
+    while True:
+        # Les choix impossibles (absents ou sans place) sont sautés
+        row = (waiting % n) * (k + 1)
+        while True:
+            skip = ~open_choice[row + pointer[waiting]]
+            skip &= pointer[waiting] < k
+            if not skip.any():
+                break
+            pointer[waiting[skip]] += 1
+        proposing = waiting[pointer[waiting] < k]
+        if not len(proposing):
+            break
+        choices = (proposing % n) * k + pointer[proposing]
+        activities = flat_preferences[choices]
+        targets = (proposing // n) * m + activities
+        keys = flat_priorities[choices] * n + flat_tickets[proposing]
+
+        # Une proposition moins bien classée que la dernière place est refusée d'emblée
+        last = (proposing // n) * seats + seat_start[activities] + capacities[activities] - 1
+        beaten = keys > slot_key[last]
+        pointer[proposing[beaten]] += 1
+        refused = proposing[beaten]
+        proposing, targets, keys = proposing[~beaten], targets[~beaten], keys[~beaten]
+
+        # Places des activités visées (déjà triées), suivies des nouvelles propositions
+        groups, proposals = np.unique(targets, return_counts=True)
+        capacity = capacities[groups % m]
+        begin = (groups // m) * seats + seat_start[groups % m]
+        offsets = np.cumsum(capacity) - capacity
+        positions = np.repeat(begin - offsets, capacity) + np.arange(int(capacity.sum()))
+        candidates = np.concatenate([slot_holder[positions], proposing])
+        entries = capacity + proposals
+        first = np.repeat(np.cumsum(entries) - entries, entries)
+        groups = np.concatenate([np.repeat(groups, capacity), targets])
+        keys = np.concatenate([slot_key[positions], keys])
+
+        # Chaque activité garde ses meilleurs candidats ; le tri stable profite
+        # de ce que les places sont déjà ordonnées
+        fused = groups * (key_range + 1) + keys
+        order = np.argsort(fused, kind='stable')
+        candidates, groups, keys = candidates[order], groups[order], keys[order]
+        rank = np.arange(len(groups)) - first
+        kept = rank < capacities[groups % m]
+        destination = (groups[kept] // m) * seats + seat_start[groups[kept] % m] + rank[kept]
+        slot_key[destination] = keys[kept]
+        slot_holder[destination] = candidates[kept]
+        rejected = candidates[~kept]
+        rejected = rejected[rejected >= 0]
+        pointer[rejected] += 1
+        waiting = np.concatenate([refused, rejected])
+
+    # Activité détenue par chaque étudiant, lue sur les places occupées
+    held = np.full(n_lotteries * n, -1, dtype=np.int64)
+    occupied = slot_holder >= 0
+    held[slot_holder[occupied]] = np.tile(np.repeat(np.arange(m), capacities), n_lotteries)[occupied]
+    held = held.reshape(n_lotteries, n)
+    pointer = pointer.reshape(n_lotteries, n)
+    ranks = np.where(held >= 0, pointer, -1)
+    return held, ranks
+
+
+def probabilistic_serial(preferences: np.ndarray, capacities: np.ndarray) -> np.ndarray:
+    """
+    Partage probabiliste (Bogomolnaia-Moulin) : tous les étudiants consomment
+    en même temps, à vitesse 1 pendant une unité de temps, leur meilleur choix
+    dont il reste de la capacité. Retourne la matrice (n, k) des probabilités
+    d'obtenir chaque choix.
+    """
+    preferences = np.asarray(preferences)
+    n, k = preferences.shape
+    remaining = np.asarray(capacities, dtype=np.float64).copy()
+    probabilities = np.zeros((n, k))
+    pointer = np.zeros(n, dtype=np.int64)
+    students = np.arange(n)
+    elapsed = 0.0
+    tolerance = 1e-12
+
+    while elapsed < 1.0 - tolerance:
+        # Chaque étudiant passe au choix suivant tant que le sien est épuisé
+        while True:
+            current = preferences[students, np.minimum(pointer, k - 1)]
+            exhausted = (pointer < k) & ((current < 0) | (remaining[np.maximum(current, 0)] <= tolerance))
+            if not exhausted.any():
+                break
+            pointer[exhausted] += 1
+        eating = np.flatnonzero(pointer < k)
+        if not len(eating):
+            break
+        targets = preferences[eating, pointer[eating]]
+        eaters = np.bincount(targets, minlength=len(remaining))
+        busy = eaters > 0
+        step = min(float((remaining[busy] / eaters[busy]).min()), 1.0 - elapsed)
+
+        probabilities[eating, pointer[eating]] += step
+        remaining -= eaters * step
+        remaining[busy & (remaining <= tolerance)] = 0.0
+        elapsed += step
+    return probabilities
+
+
+def _run_lotteries(columns: ArrayAssignmentProblem, order: np.ndarray, tickets: np.ndarray,
+                   priorities: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simule les loteries : avec au plus une classe par étudiant, l'acceptation
+    différée équivaut à la dictature sérielle dans l'ordre (classe, tirage),
+    bien plus rapide à simuler.
+    """
+    if priorities is not None and priorities.ndim == 2:
+        return deferred_acceptance(columns.preferences, columns.capacities, tickets, priorities)
+    if priorities is not None:
+        order = np.argsort(priorities[None, :] * columns.n_students + tickets, axis=1)
+    return serial_dictatorship(columns.preferences, columns.capacities, order)
+
+
+def _draw_lotteries(n_students: int, n_lotteries: int, rng) -> Tuple[np.ndarray, np.ndarray]:
+    """(ordre de passage, rang de chaque étudiant) pour n_lotteries tirages"""
+    order = np.argsort(rng.random((n_lotteries, n_students)), axis=1)
+    tickets = np.empty_like(order)
+    np.put_along_axis(tickets, order, np.arange(n_students)[None, :].repeat(n_lotteries, axis=0), axis=1)
+    return order, tickets
+
+
+def _priority_classes(priorities, problem, mechanism: str) -> Optional[np.ndarray]:
+    """Classes de priorité vérifiées : une par étudiant (n,) ou une par choix (n, k)"""
+    if priorities is None:
+        return None
+    n = len(problem.students) if isinstance(problem, AssignmentProblem) else problem.n_students
+    priorities = np.asarray(priorities, dtype=np.int64)
+    if priorities.shape not in ((n,), (n, problem.k)):
+        raise ValueError(f"Les priorités doivent avoir la forme ({n},) ou ({n}, {problem.k})")
+    if priorities.min(initial=0) < 0:
+        raise ValueError("Les classes de priorité doivent être des entiers positifs ou nuls")
+    if priorities.ndim == 2 and mechanism == 'serial_dictatorship':
+        raise ValueError("La dictature sérielle n'accepte qu'une classe de priorité par étudiant")
+    return priorities
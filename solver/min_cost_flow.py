@@ -0,0 +1,278 @@
+import heapq
+from typing import List, Tuple, Union, Optional
+import numpy as np
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from models.scoring import integer_weights
+from solver.optimizer import SatisfactionOptimizer
+import profiling
+
+
+class MinCostFlow:
+    """
+    Réseau de flot compact stocké dans des tableaux d'entiers.
+
+    Les arcs sont ajoutés par lots (tableaux NumPy), puis le flot maximum de
+    coût minimum est calculé par une méthode primale-duale : plus courts chemins
+    successifs (Dijkstra avec potentiels) suivis d'un flot bloquant (Dinic) sur
+    les arcs de coût réduit nul. Les coûts doivent être des entiers positifs ou nuls.
+    """
+
+    def __init__(self, n_nodes: int):
+        self.n_nodes = n_nodes
+        self._tails: List[np.ndarray] = []
+        self._heads: List[np.ndarray] = []
+        self._caps: List[np.ndarray] = []
+        self._costs: List[np.ndarray] = []
+        self._n_arcs = 0
+        self._flows = None
+
+    def add_arcs(self, tails, heads, caps, costs) -> np.ndarray:
+        """Ajoute un lot d'arcs et retourne leurs indices"""
+        tails = np.asarray(tails, dtype=np.int64).ravel()
+        size = len(tails)
+        heads = np.broadcast_to(np.asarray(heads, dtype=np.int64), (size,))
+        caps = np.broadcast_to(np.asarray(caps, dtype=np.int64), (size,))
+        costs = np.broadcast_to(np.asarray(costs, dtype=np.int64), (size,))
+        if size and costs.min() < 0:
+            raise ValueError("Les coûts des arcs doivent être positifs ou nuls")
+
+        self._tails.append(tails)
+        self._heads.append(heads)
+        self._caps.append(caps)
+        self._costs.append(costs)
+        indices = np.arange(self._n_arcs, self._n_arcs + size)
+        self._n_arcs += size
+        return indices
+
+    def flows(self) -> np.ndarray:
+        """Retourne le flot passant sur chaque arc (dans l'ordre d'ajout)"""
+        if self._flows is None:
+            raise RuntimeError("Le flot n'a pas encore été calculé")
+        return self._flows
+
+    def solve(self, source: int, sink: int) -> Tuple[int, int]:
+        """Calcule un flot maximum de coût minimum et retourne (flot, coût)"""
+        n_arcs = self._n_arcs
+        tails = np.concatenate(self._tails) if n_arcs else np.zeros(0, np.int64)
+        heads = np.concatenate(self._heads) if n_arcs else np.zeros(0, np.int64)
+        caps = np.concatenate(self._caps) if n_arcs else np.zeros(0, np.int64)
+        costs = np.concatenate(self._costs) if n_arcs else np.zeros(0, np.int64)
+
+        # Graphe résiduel : l'arc 2e est l'arc e, l'arc 2e+1 son inverse
+        r_tails = np.empty(2 * n_arcs, np.int64)
+        r_heads = np.empty(2 * n_arcs, np.int64)
+        r_caps = np.zeros(2 * n_arcs, np.int64)
+        r_costs = np.empty(2 * n_arcs, np.int64)
+        r_tails[0::2], r_tails[1::2] = tails, heads
+        r_heads[0::2], r_heads[1::2] = heads, tails
+        r_caps[0::2] = caps
+        r_costs[0::2], r_costs[1::2] = costs, -costs
+
+        # Stockage compact (CSR) trié par origine
+        order = np.argsort(r_tails, kind='stable')
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        start = np.zeros(self.n_nodes + 1, np.int64)
+        np.cumsum(np.bincount(r_tails, minlength=self.n_nodes), out=start[1:])
+
+        arc_tail = r_tails[order].tolist()
+        arc_to = r_heads[order].tolist()
+        arc_cap = r_caps[order].tolist()
+        arc_cost = r_costs[order].tolist()
+        arc_rev = position[order ^ 1].tolist()
+        start = start.tolist()
+
+        flow = _primal_dual(self.n_nodes, start, arc_tail, arc_to, arc_cap,
+                            arc_cost, arc_rev, source, sink)
+
+        residual = np.asarray(arc_cap, dtype=np.int64)
+        self._flows = caps - residual[position[0::2]]
+        return flow, int((self._flows * costs).sum())
+
+
+def _primal_dual(n_nodes, start, arc_tail, arc_to, arc_cap, arc_cost, arc_rev,
+                 source, sink) -> int:
+    """Boucle primale-duale : Dijkstra sur les coûts réduits puis flot bloquant"""
+    infinity = float('inf')
+    potential = [0] * n_nodes
+    total_flow = 0
+
+    while True:
+        # Plus courts chemins (coûts réduits positifs grâce aux potentiels)
+        dist = [infinity] * n_nodes
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u == sink:
+                break
+            pu = potential[u]
+            for a in range(start[u], start[u + 1]):
+                if arc_cap[a] > 0:
+                    v = arc_to[a]
+                    nd = d + arc_cost[a] + pu - potential[v]
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+
+        dist_sink = dist[sink]
+        if dist_sink == infinity:
+            return total_flow
+
+        # Mise à jour des potentiels, tronquée à la distance du puits
+        for v in range(n_nodes):
+            d = dist[v]
+            potential[v] += d if d < dist_sink else dist_sink
+
+        total_flow += _blocking_flow(n_nodes, start, arc_tail, arc_to, arc_cap,
+                                     arc_cost, arc_rev, potential, source, sink)
+
+
+def _blocking_flow(n_nodes, start, arc_tail, arc_to, arc_cap, arc_cost, arc_rev,
+                   potential, source, sink) -> int:
+    """Flot maximum (Dinic) restreint aux arcs admissibles de coût réduit nul"""
+    pushed = 0
+    while True:
+        level = [-1] * n_nodes
+        level[source] = 0
+        queue = [source]
+        for u in queue:
+            next_level = level[u] + 1
+            pu = potential[u]
+            for a in range(start[u], start[u + 1]):
+                v = arc_to[a]
+                if (level[v] < 0 and arc_cap[a] > 0
+                        and arc_cost[a] + pu - potential[v] == 0):
+                    level[v] = next_level
+                    queue.append(v)
+        if level[sink] < 0:
+            return pushed
+
+        current = start[:]
+        path: List[int] = []
+        u = source
+        while True:
+            if u == sink:
+                bottleneck = min(arc_cap[a] for a in path)
+                for a in path:
+                    arc_cap[a] -= bottleneck
+                    arc_cap[arc_rev[a]] += bottleneck
+                pushed += bottleneck
+                path = []
+                u = source
+                continue
+
+            end = start[u + 1]
+            a = current[u]
+            next_level = level[u] + 1
+            pu = potential[u]
+            while a < end:
+                v = arc_to[a]
+                if (level[v] == next_level and arc_cap[a] > 0
+                        and arc_cost[a] + pu - potential[v] == 0):
+                    break
+                a += 1
+            current[u] = a
+
+            if a < end:
+                path.append(a)
+                u = arc_to[a]
+            elif u == source:
+                break
+            else:
+                # Impasse : on retire le nœud et on revient en arrière
+                level[u] = -1
+                a = path.pop()
+                u = arc_tail[a]
+                current[u] += 1
+
+
+class MinCostFlowOptimizer(SatisfactionOptimizer):
+    """
+    Résout exactement le problème d'attribution par un flot de coût minimum.
+
+    Réseau : source -> étudiants (capacité 1) -> activités choisies (coût selon
+    le rang) -> puits (capacité de l'activité). Un nœud « joker » relie chaque
+    étudiant à toutes les activités pour modéliser les attributions forcées sans
+    créer d'arcs étudiant -> activité supplémentaires.
+    """
+
+    def optimize(self, seed: Optional[int] = None) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
+        """
+        Calcule une attribution maximisant exactement le score de satisfaction.
+        La résolution est déterministe : la graine est acceptée par compatibilité.
+        """
+        self._reset_assignments()
+
+        if isinstance(self.problem, ArrayAssignmentProblem):
+            columns = self.problem
+        else:
+            columns = ArrayAssignmentProblem.from_problem(self.problem)
+
+        with profiling.span('min_cost_flow'):
+            assignment, forced = solve_assignment_flow(columns.preferences, columns.capacities,
+                                                       columns.k)
+        columns.assignment[:] = assignment
+        columns.forced[:] = forced
+        columns.recompute_occupancy()
+
+        if columns is not self.problem:
+            columns.apply_to(self.problem)
+        return self.problem
+
+
+def solve_assignment_flow(preferences: np.ndarray, capacities: np.ndarray,
+                          k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Résout le problème sous forme de tableaux.
+
+    preferences : matrice (n_étudiants, k) d'indices d'activités (-1 = pas de choix)
+    capacities : capacité de chaque activité
+    Retourne (indice d'activité attribuée ou -1, masque des attributions forcées).
+    """
+    n_students = preferences.shape[0]
+    n_choices = len(capacities)
+
+    # Coût = poids maximal - poids du choix : tous les coûts restent positifs
+    rank_weights, forced_weight = integer_weights(k)
+    max_weight = rank_weights[0]
+
+    source = 0
+    first_student = 1
+    first_choice = first_student + n_students
+    joker = first_choice + n_choices
+    sink = joker + 1
+    network = MinCostFlow(sink + 1)
+
+    students = np.arange(n_students)
+    network.add_arcs(np.full(n_students, source), first_student + students, 1, 0)
+
+    rows, ranks = np.nonzero(preferences >= 0)
+    pref_arcs = network.add_arcs(
+        first_student + rows,
+        first_choice + preferences[rows, ranks],
+        1,
+        max_weight - np.asarray(rank_weights)[ranks]
+    )
+    joker_arcs = network.add_arcs(first_student + students, joker, 1, max_weight - forced_weight)
+    spread_arcs = network.add_arcs(np.full(n_choices, joker), first_choice + np.arange(n_choices),
+                                   capacities, 0)
+    network.add_arcs(first_choice + np.arange(n_choices), sink, capacities, 0)
+
+    network.solve(source, sink)
+    flows = network.flows()
+
+    assignment = np.full(n_students, -1, dtype=np.int32)
+    used = flows[pref_arcs] > 0
+    assignment[rows[used]] = preferences[rows[used], ranks[used]]
+
+    # Répartition des attributions forcées selon le flot joker -> activité
+    forced = flows[joker_arcs] > 0
+    forced_students = np.nonzero(forced)[0]
+    seats = np.repeat(np.arange(n_choices, dtype=np.int32), flows[spread_arcs])
+    assignment[forced_students] = seats[:len(forced_students)]
+
+    return assignment, forced
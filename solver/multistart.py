@@ -0,0 +1,202 @@
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import numpy as np
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from models.storage import load_binary, mapped_file
+from solver.optimizer import SatisfactionOptimizer
+import profiling
+
+@dataclass
+class MultiStartResult:
+    """Résultat d'une optimisation multi-départ"""
+    base_seed: int  # Graine d'origine, suffisante pour rejouer toute l'exécution
+    seeds: List[int]  # Graine de chaque départ
+    scores: List[float]  # Score obtenu pour chaque départ
+    best_seed: int
+    best_score: float
+    cancelled: bool = False  # Vrai si l'exécution a été interrompue avant la fin des départs
+
+    def score_distribution(self) -> dict:
+        """Statistiques des scores obtenus sur l'ensemble des graines"""
+        scores = np.asarray(self.scores)
+        return {
+            "runs": len(scores),
+            "best": float(scores.max()),
+            "mean": float(scores.mean()),
+            "std": float(scores.std()),
+            "worst": float(scores.min())
+        }
+
+
+def derive_seeds(base_seed: int, n_starts: int) -> List[int]:
+    """Dérive de façon reproductible une graine indépendante par départ"""
+    return np.random.SeedSequence(base_seed).generate_state(n_starts).tolist()
+
+
+class MultiStartOptimizer(SatisfactionOptimizer):
+    """
+    Lance n_starts fois l'algorithme glouton avec des graines différentes
+    (en parallèle sur plusieurs processus) et conserve la meilleure attribution.
+
+    Les processus reçoivent le problème une seule fois, via des blocs de mémoire
+    partagée (ou en projetant eux-mêmes le fichier .satb dont il a été chargé),
+    et ne renvoient que leurs scores : la meilleure graine est ensuite rejouée
+    localement, ce qui redonne exactement la même attribution.
+
+    progress(terminés, total) est appelé après chaque départ. Si cancel_event
+    (un threading.Event) est levé, les départs non commencés sont abandonnés et
+    la meilleure graine parmi ceux terminés est conservée (au moins un départ
+    est toujours mené à terme). Avec admission, chaque départ applique la
+    pré-passe d'admission (voir SatisfactionOptimizer).
+    """
+
+    def __init__(self, problem: Union[AssignmentProblem, ArrayAssignmentProblem],
+                 n_starts: int = 8, max_workers: Optional[int] = None,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 cancel_event: Optional[threading.Event] = None, admission: bool = False):
+        super().__init__(problem, admission=admission)
+        self.n_starts = n_starts
+        self.max_workers = max_workers
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.last_result: Optional[MultiStartResult] = None
+
+    def optimize(self, seed: Optional[int] = None) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
+        """Optimise avec n_starts départs et retourne la meilleure solution"""
+        if self.n_starts < 1:
+            raise ValueError("Le nombre de départs doit être au moins 1")
+        base_seed = seed if seed is not None else secrets.randbits(32)
+        seeds = derive_seeds(base_seed, self.n_starts)
+
+        if isinstance(self.problem, ArrayAssignmentProblem):
+            columns = self.problem
+        else:
+            columns = ArrayAssignmentProblem.from_problem(self.problem)
+
+        workers = min(self.max_workers or os.cpu_count() or 1, self.n_starts)
+        with profiling.span('multistart'):
+            profiling.count('starts', self.n_starts)
+            profiling.count('workers', workers)
+            if workers <= 1:
+                scores = {}
+                for position, s in enumerate(seeds):
+                    scores[position] = _run_seed(columns, s, self.admission)
+                    if self._report(len(scores)):
+                        break
+            else:
+                scores = _run_seeds_in_pool(columns, seeds, workers, self._report, self.admission)
+
+        # Départs terminés, dans l'ordre des graines
+        completed = sorted(scores)
+        seeds_done = [seeds[position] for position in completed]
+        scores_done = [scores[position] for position in completed]
+        best = int(np.argmax(scores_done))
+        self.last_result = MultiStartResult(
+            base_seed=base_seed,
+            seeds=seeds_done,
+            scores=scores_done,
+            best_seed=seeds_done[best],
+            best_score=scores_done[best],
+            cancelled=len(completed) < self.n_starts
+        )
+
+        # Rejoue la meilleure graine sur le problème d'origine
+        return super().optimize(seed=seeds_done[best])
+
+    def _report(self, done: int) -> bool:
+        """Signale l'avancement ; retourne vrai s'il faut s'arrêter"""
+        if self.progress is not None:
+            self.progress(done, self.n_starts)
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+
+def _run_seed(columns: ArrayAssignmentProblem, seed: int, admission: bool = False) -> float:
+    """Exécute un départ glouton et retourne son score"""
+    SatisfactionOptimizer(columns, admission=admission).optimize(seed=seed)
+    return columns.get_satisfaction_score()
+
+
+def _run_seeds_in_pool(columns: ArrayAssignmentProblem, seeds: List[int], workers: int,
+                       report: Callable[[int], bool], admission: bool = False) -> Dict[int, float]:
+    """
+    Répartit les graines sur un pool de processus partageant le problème.
+    Retourne le score de chaque départ terminé, indexé par sa position ;
+    dès que report() demande l'arrêt, les départs non commencés sont annulés.
+    """
+    blocks = []
+    try:
+        # Problème projeté depuis un fichier .satb : chaque processus projette le même fichier
+        source = mapped_file(columns.preferences)
+        if source is not None and mapped_file(columns.capacities) == source:
+            initializer, initargs = _init_worker_from_file, (source, admission)
+        else:
+            specs = []
+            for array in (columns.preferences, columns.capacities):
+                block = SharedMemory(create=True, size=max(array.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+                specs.append((block.name, array.shape, array.dtype.str))
+            initializer, initargs = _init_worker, (specs, columns.k, admission)
+
+        scores = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                                 initargs=initargs) as pool:
+            futures = {pool.submit(_run_worker_seed, s): position for position, s in enumerate(seeds)}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                scores[futures[future]] = future.result()
+                if report(len(scores)):
+                    for pending in futures:
+                        pending.cancel()
+                    break
+        return scores
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+# Problème partagé, attaché une fois par processus de travail
+_worker_blocks: List[SharedMemory] = []
+_worker_problem: Optional[ArrayAssignmentProblem] = None
+_worker_admission = False
+
+
+def _init_worker(specs: List[Tuple[str, tuple, str]], k: int, admission: bool = False):
+    """Attache les blocs de mémoire partagée et reconstruit une vue en colonnes"""
+    global _worker_problem, _worker_admission
+    _worker_admission = admission
+    arrays = []
+    for name, shape, dtype in specs:
+        block = SharedMemory(name=name)
+        _worker_blocks.append(block)
+        arrays.append(np.ndarray(shape, np.dtype(dtype), buffer=block.buf))
+    preferences, capacities = arrays
+    n_choices = len(capacities)
+    _worker_problem = ArrayAssignmentProblem(
+        choice_ids=np.arange(n_choices),
+        choice_names=[],
+        capacities=capacities,
+        student_ids=np.arange(preferences.shape[0]),
+        student_names=[],
+        preferences=preferences,
+        k=k
+    )
+
+
+def _init_worker_from_file(path: str, admission: bool = False):
+    """Projette le fichier .satb du problème, sans en décoder les noms"""
+    global _worker_problem, _worker_admission
+    _worker_admission = admission
+    _worker_problem = load_binary(path, names=False)
+
+
+def _run_worker_seed(seed: int) -> float:
+    return _run_seed(_worker_problem, seed, _worker_admission)
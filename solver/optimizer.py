@@ -1,89 +1,338 @@
-from typing import List, Dict
-from models.data_models import Student, Choice, AssignmentProblem
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Dict, Iterator, Union, Optional
+import numpy as np
+from models.data_models import Student, Choice, AssignmentProblem, ProblemDelta
+from models.array_models import ArrayAssignmentProblem
+from models.slotted_models import SlottedAssignmentProblem
+from models.scoring import summarize_assignments
+from solver.incremental import IncrementalRepair, DeltaReport
+from solver.admission import AdmissionReport, admit
+import profiling
+
+
+@dataclass
+class AnytimeSolution:
+    """Solution améliorée livrée par le mode « à tout moment » (voir iter_improvements)"""
+    score: float
+    iteration: int  # 0 pour la solution initiale
+    elapsed: float  # Secondes écoulées depuis le début
+    source: str  # 'initial', 'local_search' ou 'restart'
+
 
 class SatisfactionOptimizer:
-    def __init__(self, problem: AssignmentProblem):
+    def __init__(self, problem: Union[AssignmentProblem, ArrayAssignmentProblem,
+                                      SlottedAssignmentProblem],
+                 admission: bool = False):
+        """
+        Avec admission, une pré-passe entre les deux phases replace les étudiants
+        pour que le moins possible finissent hors de leurs choix, aux meilleurs
+        rangs (voir solver/admission.py) ; son bilan est conservé dans last_admission.
+
+        Un problème sur plusieurs créneaux (SlottedAssignmentProblem) est résolu
+        pour tous les créneaux à la fois (voir solver/slotted.py) ; son bilan
+        est conservé dans last_slots.
+        """
         self.problem = problem
+        self.admission = admission
+        self.last_admission: Optional[AdmissionReport] = None
+        self.last_slots = None
+        self._repair: Optional[IncrementalRepair] = None
         self._reset_assignments()
 
     def _reset_assignments(self):
         """Réinitialise toutes les attributions"""
+        if isinstance(self.problem, (ArrayAssignmentProblem, SlottedAssignmentProblem)):
+            self.problem.reset_assignments()
+            return
         for student in self.problem.students:
             student.assigned_choice = None
             student.forced_assignment = False  # Initialisation de l'attribut
         for choice in self.problem.choices.values():
             choice.assigned_students = []
 
-    def optimize(self) -> AssignmentProblem:
+    def optimize(self, seed: Optional[int] = None) -> AssignmentProblem:
         """
         Optimise les attributions pour maximiser la satisfaction
         Utilise une approche en deux phases:
         1. Attribution selon les choix des étudiants
+           (remplacée, avec admission, par le maximum d'étudiants sur un de leurs choix)
         2. Attribution aléatoire pour les étudiants restants s'il reste des places
+
+        Avec une graine (seed), le tirage est reproductible : la même graine
+        redonne exactement la même attribution.
         """
         self._reset_assignments()
         
         # Trie les étudiants par ordre aléatoire pour éviter les biais
         import random
-        students = self.problem.students.copy()
-        random.shuffle(students)
+        rng = random.Random(seed) if seed is not None else random
+        with profiling.span('optimize'):
+            if isinstance(self.problem, SlottedAssignmentProblem):
+                return self._optimize_slots(rng)
+            if isinstance(self.problem, ArrayAssignmentProblem):
+                return self._optimize_arrays(rng)
+            return self._optimize_dataclasses(rng)
+
+    def iter_improvements(self, seed: Optional[int] = None, time_limit: Optional[float] = None,
+                          max_iterations: Optional[int] = None,
+                          cancel_event: Optional[threading.Event] = None,
+                          slice_seconds: float = 0.25) -> Iterator[AnytimeSolution]:
+        """
+        Mode « à tout moment » : produit aussitôt la solution de optimize(seed),
+        puis l'améliore par tranches de recherche locale (slice_seconds) ; une
+        fois l'optimum local atteint, de nouveaux départs gloutons (graines
+        dérivées de seed) suivis de recherche locale sont tentés. Chaque
+        solution strictement meilleure est livrée, le problème contenant alors
+        cette solution : on peut cesser d'itérer à tout moment. Ces nouveaux
+        départs se font sans la pré-passe d'admission, qui aboutit au même
+        score quelle que soit la graine : seul le premier départ l'applique.
+
+        S'arrête à la fin du budget (time_limit en secondes, max_iterations
+        tranches), quand cancel_event est levé, ou, sans aucun budget, au premier
+        optimum local. Un problème sur plusieurs créneaux n'est pas amélioré.
+        """
+        from solver.local_search import LocalSearch
+
+        started = time.perf_counter()
+        deadline = started + time_limit if time_limit is not None else None
+        base_seed = seed if seed is not None else secrets.randbits(32)
+
+        def stopped(iteration: int) -> bool:
+            return ((cancel_event is not None and cancel_event.is_set())
+                    or (deadline is not None and time.perf_counter() >= deadline)
+                    or (max_iterations is not None and iteration >= max_iterations))
+
+        self.optimize(seed=base_seed)
+        if isinstance(self.problem, SlottedAssignmentProblem):
+            yield AnytimeSolution(self.problem.get_satisfaction_score(), 0,
+                                  time.perf_counter() - started, 'initial')
+            return
+        if isinstance(self.problem, ArrayAssignmentProblem):
+            columns = self.problem
+        else:
+            columns = ArrayAssignmentProblem.from_problem(self.problem)
+        best_score = columns.get_satisfaction_score()
+        yield AnytimeSolution(best_score, 0, time.perf_counter() - started, 'initial')
+
+        iteration = restarts = 0
+        search = None if stopped(iteration) else LocalSearch(columns)
+        while not stopped(iteration):
+            if search is None:
+                # Optimum local atteint : nouveau départ, sauf sans budget
+                if deadline is None and max_iterations is None:
+                    return
+                restarts += 1
+                scratch = ArrayAssignmentProblem(
+                    columns.choice_ids, columns.choice_names, columns.capacities,
+                    columns.student_ids, columns.student_names, columns.preferences, columns.k
+                )
+                restart_seed = int(np.random.SeedSequence([base_seed, restarts]).generate_state(1)[0])
+                # Sans admission : le flot recalculé redonnerait la même qualité à chaque départ
+                SatisfactionOptimizer(scratch).optimize(seed=restart_seed)
+                search = LocalSearch(scratch)
+
+            iteration += 1
+            budget = slice_seconds
+            if deadline is not None:
+                budget = max(0.0, min(budget, deadline - time.perf_counter()))
+            with profiling.span('anytime'):
+                stats = search.run(budget)
+            candidate = search.problem
+            if stats.local_optimum:
+                search = None
+            if stats.final_score <= best_score:
+                continue
+
+            best_score = stats.final_score
+            if candidate is not columns:
+                columns.assignment[:] = candidate.assignment
+                columns.forced[:] = candidate.forced
+                columns.recompute_occupancy()
+            if columns is not self.problem:
+                columns.apply_to(self.problem)
+            yield AnytimeSolution(best_score, iteration, time.perf_counter() - started,
+                                  'local_search' if candidate is columns else 'restart')
+
+    def optimize_anytime(self, seed: Optional[int] = None, time_limit: Optional[float] = None,
+                         max_iterations: Optional[int] = None,
+                         callback: Optional[Callable[[AnytimeSolution], None]] = None,
+                         cancel_event: Optional[threading.Event] = None):
+        """
+        Comme iter_improvements, jusqu'à la fin du budget ; callback reçoit
+        chaque solution améliorée. Retourne le problème (meilleure solution).
+        """
+        for solution in self.iter_improvements(seed, time_limit, max_iterations, cancel_event):
+            if callback is not None:
+                callback(solution)
+        return self.problem
+
+    def _optimize_dataclasses(self, rng) -> AssignmentProblem:
+        """
+        Algorithme en deux phases sur les dataclasses : il s'exécute sur la vue
+        en colonnes, puis les attributions sont recopiées. Le tirage des
+        étudiants ne dépend que de leur nombre, d'où le même résultat que sur
+        les tableaux pour une même graine.
+        """
+        columns = ArrayAssignmentProblem.from_problem(self.problem)
+        self._assign(columns, rng)
+        columns.apply_to(self.problem)
+        return self.problem
+
+    def apply_delta(self, delta: ProblemDelta, upgrade_existing: bool = False) -> DeltaReport:
+        """
+        Met à jour une solution existante après des inscriptions tardives, des
+        désistements, des changements de capacité ou de choix. Seuls les
+        étudiants concernés et ceux situés sur les chemins de réparation changent
+        d'activité (jamais vers un choix moins bien classé).
+        """
+        if isinstance(self.problem, ArrayAssignmentProblem):
+            # Les dimensions des tableaux changent : on passe par la vue dataclass
+            problem = self.problem.to_problem()
+            report = IncrementalRepair(problem, upgrade_existing=upgrade_existing).apply(delta)
+            self.problem = ArrayAssignmentProblem.from_problem(problem)
+            return report
+        # La réparation garde ses index d'une modification à l'autre
+        if self._repair is None or self._repair.problem is not self.problem:
+            self._repair = IncrementalRepair(self.problem)
+        self._repair.upgrade_existing = upgrade_existing
+        return self._repair.apply(delta)
+
+    def _optimize_arrays(self, rng) -> ArrayAssignmentProblem:
+        """Algorithme en deux phases sur la représentation en colonnes"""
+        self._assign(self.problem, rng)
+        return self.problem
+
+    def _optimize_slots(self, rng) -> SlottedAssignmentProblem:
+        """Attribution conjointe sur tous les créneaux (flots de sélection puis de placement)"""
+        from solver.slotted import solve_slotted
+
+        self.last_slots = solve_slotted(self.problem, rng)
+        return self.problem
+
+    def _assign(self, problem: ArrayAssignmentProblem, rng):
+        """
+        Moteur glouton par paquets.
+
+        Phase 1 : à chaque niveau de choix, les étudiants encore sans place sont
+        regroupés par activité visée (dans l'ordre du tirage) et chaque activité
+        accorde d'un coup min(demande, places restantes) places aux premiers
+        tirés ; c'est exactement le résultat d'un passage étudiant par étudiant.
+        Phase 2 : chaque étudiant restant tire une activité parmi celles qui ont
+        encore des places, rangées par indice (même tirage que rng.choice sur
+        leur liste), retrouvée dans un arbre de Fenwick sans parcours de liste.
+        """
+        n_students = problem.n_students
+        remaining = problem.capacities.astype(np.int64)
+        assignment = np.full(n_students, -1, dtype=np.int32)
+
+        order = list(range(n_students))
+        rng.shuffle(order)
+        order = np.array(order, dtype=np.int64)
 
         # Phase 1: Attribution selon les choix
-        for choice_level in range(self.problem.k):
-            unassigned = [s for s in students if s.assigned_choice is None]
-            for student in unassigned:
-                if choice_level < len(student.choices):
-                    current_choice = student.choices[choice_level]
-                    choice_obj = self.problem.choices[current_choice]
-                    
-                    if len(choice_obj.assigned_students) < choice_obj.capacity:
-                        student.assigned_choice = current_choice
-                        choice_obj.assigned_students.append(student.id)
-                        student.forced_assignment = False
+        with profiling.span('phase 1 (choix)'):
+            for choice_level in range(problem.k):
+                targets = problem.preferences[order, choice_level].astype(np.int64)
+                requesting = targets >= 0
+                # Rang de chaque demande parmi celles de la même activité, dans l'ordre du tirage
+                by_target = np.argsort(targets, kind='stable')
+                sorted_targets = targets[by_target]
+                group_start = np.searchsorted(sorted_targets, sorted_targets)
+                position = np.empty_like(by_target)
+                position[by_target] = np.arange(len(order)) - group_start
+                granted = requesting & (position < remaining[np.maximum(targets, 0)])
+
+                placed = order[granted]
+                assignment[placed] = targets[granted]
+                remaining -= np.bincount(targets[granted], minlength=len(remaining))
+                profiling.count(f"placed_choice_{choice_level + 1}", len(placed))
+                order = order[~granted]
+
+        unplaced = order.tolist()
+        if self.admission:
+            assignment_list = assignment.tolist()
+            remaining_list = remaining.tolist()
+            self.last_admission = admit(problem.preferences, problem.capacities,
+                                        assignment_list, remaining_list, unplaced)
+            assignment[:] = assignment_list
+            remaining[:] = remaining_list
 
         # Phase 2: Attribution aléatoire pour les étudiants restants
-        unassigned = [s for s in students if s.assigned_choice is None]
-        if unassigned:
-            # Trouver toutes les activités avec des places restantes
-            available_choices = [
-                choice_id for choice_id, choice in self.problem.choices.items()
-                if len(choice.assigned_students) < choice.capacity
-            ]
-
-            for student in unassigned:
-                if available_choices:  # S'il reste des places quelque part
-                    # Choisir une activité au hasard parmi celles disponibles
-                    random_choice = random.choice(available_choices)
-                    choice_obj = self.problem.choices[random_choice]
-                    
-                    student.assigned_choice = random_choice
-                    choice_obj.assigned_students.append(student.id)
-                    student.forced_assignment = True  # Marquer que c'était une attribution forcée
-                    
-                    # Mettre à jour la liste des choix disponibles
-                    if len(choice_obj.assigned_students) >= choice_obj.capacity:
-                        available_choices.remove(random_choice)
+        with profiling.span('phase 2 (attribution aléatoire)'):
+            forced = []
+            available_choices = _OpenActivities(remaining > 0)
+            remaining_list = remaining.tolist()
+            for i in unplaced:
+                if not len(available_choices):
+                    break
+                choice_idx = available_choices.kth(rng.randrange(len(available_choices)))
+                assignment[i] = choice_idx
+                remaining_list[choice_idx] -= 1
+                forced.append(i)
+                if remaining_list[choice_idx] == 0:
+                    available_choices.remove(choice_idx)
+            profiling.count('forced_assignments', len(forced))
+            profiling.count('unassigned', len(unplaced) - len(forced))
 
-        return self.problem
+        problem.assignment[:] = assignment
+        problem.forced[forced] = True
+        problem.recompute_occupancy()
 
     def get_solution_summary(self) -> Dict:
         """Retourne un résumé de la solution"""
-        summary = {
-            "total_students": len(self.problem.students),
-            "satisfaction_score": self.problem.get_satisfaction_score(),
-            "choice_distribution": {},
-            "unassigned": 0,
-            "forced_assignments": 0
-        }
-
-        for student in self.problem.students:
-            if student.assigned_choice is None:
-                summary["unassigned"] += 1
-            elif student.forced_assignment:  # Plus besoin de hasattr car l'attribut est toujours initialisé
-                summary["forced_assignments"] += 1
+        with profiling.span('get_solution_summary'):
+            if isinstance(self.problem, SlottedAssignmentProblem):
+                return self.problem.summary()
+            # Le rang de chaque attribution est calculé une seule fois, en colonnes
+            if isinstance(self.problem, ArrayAssignmentProblem):
+                columns = self.problem
             else:
-                choice_position = student.choices.index(student.assigned_choice) + 1
-                summary["choice_distribution"][f"choice_{choice_position}"] = \
-                    summary["choice_distribution"].get(f"choice_{choice_position}", 0) + 1
+                columns = ArrayAssignmentProblem.from_problem(self.problem)
+            return summarize_assignments(columns.preferences, columns.assignment,
+                                         columns.forced, columns.k)
+
+
+class _OpenActivities:
+    """
+    Ensemble indexé des activités ayant encore des places, dans l'ordre de
+    leurs indices : k-ième élément et retrait en O(log m) (arbre de Fenwick).
+    """
+
+    def __init__(self, is_open: np.ndarray):
+        self._size = len(is_open)
+        self._count = int(np.count_nonzero(is_open))
+        tree = [0] + is_open.astype(int).tolist()
+        # Construction en O(m) : chaque nœud reporte sa somme sur son parent
+        for i in range(1, self._size + 1):
+            parent = i + (i & -i)
+            if parent <= self._size:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top = 1 << max(self._size.bit_length() - 1, 0)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def kth(self, rank: int) -> int:
+        """Indice de la (rank + 1)-ième activité ouverte"""
+        tree = self._tree
+        position = 0
+        step = self._top
+        while step:
+            following = position + step
+            if following <= self._size and tree[following] <= rank:
+                position = following
+                rank -= tree[following]
+            step >>= 1
+        return position
 
-        return summary
+    def remove(self, choice_idx: int):
+        tree = self._tree
+        i = choice_idx + 1
+        while i <= self._size:
+            tree[i] -= 1
+            i += i & -i
+        self._count -= 1
@@ -0,0 +1,152 @@
+"""
+Registre des moteurs de résolution.
+
+Chaque moteur expose le même contrat : solve(problem, time_limit, seed) résout
+le problème sur place et retourne l'optimiseur utilisé (d'où
+get_solution_summary et ses bilans propres : last_stats, last_report...).
+time_limit est un budget en secondes pour les moteurs qui en acceptent un
+(ignoré par les autres) ; seed rend le tirage reproductible.
+
+Utilisation :
+    from solver.registry import solve, solver_names
+    optimizer = solve('min_cost_flow', problem, seed=0)
+    print(optimizer.get_solution_summary())
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Union
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from solver.optimizer import SatisfactionOptimizer
+
+
+@dataclass
+class SolverSpec:
+    """Moteur enregistré"""
+    name: str
+    solve: Callable  # solve(problem, time_limit, seed) -> optimiseur
+    description: str
+    exact: bool = False  # Vrai si le moteur maximise exactement le score de satisfaction
+    available: Callable[[], bool] = lambda: True  # Faux si une dépendance facultative manque
+
+
+_SOLVERS: Dict[str, SolverSpec] = {}
+
+
+def register_solver(name: str, description: str, exact: bool = False,
+                    available: Optional[Callable[[], bool]] = None):
+    """
+    Décorateur enregistrant une fonction solve(problem, time_limit, seed) sous
+    le nom donné (un nom déjà pris est remplacé).
+    """
+    def decorator(function: Callable) -> Callable:
+        _SOLVERS[name] = SolverSpec(name, function, description, exact,
+                                    available or (lambda: True))
+        return function
+    return decorator
+
+
+def get_solver(name: str) -> SolverSpec:
+    if name not in _SOLVERS:
+        raise ValueError(f"Moteur inconnu : {name} (possibles : {solver_names(only_available=False)})")
+    return _SOLVERS[name]
+
+
+def solver_names(only_available: bool = True) -> List[str]:
+    """Noms des moteurs enregistrés, dans l'ordre d'enregistrement"""
+    return [name for name, spec in _SOLVERS.items() if not only_available or spec.available()]
+
+
+def solve(name: str, problem: Union[AssignmentProblem, ArrayAssignmentProblem],
+          time_limit: Optional[float] = None, seed: Optional[int] = None) -> SatisfactionOptimizer:
+    """Résout le problème avec le moteur nommé et retourne l'optimiseur"""
+    spec = get_solver(name)
+    if not spec.available():
+        raise ImportError(f"Le moteur {name} n'est pas disponible (dépendance facultative manquante)")
+    return spec.solve(problem, time_limit, seed)
+
+
+# Moteurs du projet ; les imports sont faits à l'appel pour ne charger que le moteur utilisé
+
+@register_solver('greedy', "Algorithme glouton en deux phases")
+def _greedy(problem, time_limit, seed):
+    optimizer = SatisfactionOptimizer(problem)
+    optimizer.optimize(seed=seed)
+    return optimizer
+
+
+@register_solver('greedy_admission', "Glouton avec pré-passe d'admission")
+def _greedy_admission(problem, time_limit, seed):
+    optimizer = SatisfactionOptimizer(problem, admission=True)
+    optimizer.optimize(seed=seed)
+    return optimizer
+
+
+@register_solver('multistart', "Meilleur de 8 départs gloutons")
+def _multistart(problem, time_limit, seed):
+    from solver.multistart import MultiStartOptimizer
+
+    optimizer = MultiStartOptimizer(problem, n_starts=8)
+    optimizer.optimize(seed=seed)
+    return optimizer
+
+
+@register_solver('local_search', "Glouton puis chaînes d'éjection améliorantes")
+def _local_search(problem, time_limit, seed):
+    from solver.local_search import DEFAULT_TIME_LIMIT, LocalSearchOptimizer
+
+    optimizer = LocalSearchOptimizer(problem, time_limit=time_limit if time_limit is not None
+                                     else DEFAULT_TIME_LIMIT)
+    optimizer.optimize(seed=seed)
+    return optimizer
+
+
+@register_solver('min_cost_flow', "Flot de coût minimum (exact)", exact=True)
+def _min_cost_flow(problem, time_limit, seed):
+    from solver.min_cost_flow import MinCostFlowOptimizer
+
+    optimizer = MinCostFlowOptimizer(problem)
+    optimizer.optimize(seed=seed)
+    return optimizer
+
+
+@register_solver('auction', "Enchères avec réduction de epsilon (exact)", exact=True)
+def _auction(problem, time_limit, seed):
+    from solver.auction import AuctionOptimizer
+
+    optimizer = AuctionOptimizer(problem)
+    optimizer.optimize(seed=seed)
+    return optimizer
+
+
+def _ilp_available() -> bool:
+    from solver.ilp import available_solver
+
+    return available_solver() is not None
+
+
+@register_solver('ilp', "Programmation linéaire en nombres entiers (highspy ou scipy)",
+                 exact=True, available=_ilp_available)
+def _ilp(problem, time_limit, seed):
+    from solver.ilp import IlpOptimizer
+
+    optimizer = IlpOptimizer(problem, time_limit=time_limit)
+    optimizer.optimize(seed=seed)
+    return optimizer
+
+
+@register_solver('sharded', "Glouton par composantes connexes, en parallèle")
+def _sharded(problem, time_limit, seed):
+    from solver.sharding import ShardedOptimizer
+
+    optimizer = ShardedOptimizer(problem)
+    optimizer.optimize(seed=seed)
+    return optimizer
+
+
+@register_solver('serial_dictatorship', "Dictature sérielle aléatoire (loterie)")
+def _serial_dictatorship(problem, time_limit, seed):
+    from solver.mechanisms import MechanismOptimizer
+
+    optimizer = MechanismOptimizer(problem, mechanism='serial_dictatorship')
+    optimizer.optimize(seed=seed)
+    return optimizer
@@ -0,0 +1,335 @@
+"""
+Résolution par morceaux (shards).
+
+Les étudiants et les activités se répartissent en composantes connexes du
+graphe des choix : deux composantes ne se disputent aucune place, on peut donc
+les résoudre séparément, en parallèle, sans rien perdre en phase 1. À défaut
+(la plus grande composante dépasse max_component_share des étudiants) et si
+un site par activité est connu (colonne Site du fichier des activités, voir
+main.read_sites), ce sont les sites qui découpent le problème : chaque
+étudiant est rattaché au site de son premier choix et n'y garde que les choix
+de ce site.
+
+Les résultats sont recollés en une seule attribution, puis un rééquilibrage
+global utilise les places restées libres dans les autres morceaux : un étudiant
+forcé ou non assigné passe sur l'un de ses choix s'il y reste de la place
+(libérant sa place forcée), et les derniers non assignés sont placés au hasard
+dans n'importe quelle activité encore ouverte.
+"""
+import os
+import random
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Union
+import numpy as np
+from models.data_models import AssignmentProblem
+from models.array_models import ArrayAssignmentProblem
+from solver.optimizer import SatisfactionOptimizer, _OpenActivities
+from solver.multistart import derive_seeds
+import profiling
+
+
+@dataclass
+class ShardResult:
+    """Bilan d'un morceau résolu séparément"""
+    n_students: int
+    n_choices: int
+    seats: int
+    summary: Dict
+    elapsed: float
+
+
+@dataclass
+class ShardReport:
+    """Bilan d'une résolution par morceaux"""
+    mode: str  # 'components' ou 'sites'
+    n_components: int  # Composantes connexes (ou sites) contenant au moins un étudiant
+    shards: List[ShardResult] = field(default_factory=list)
+    dropped_choices: int = 0  # Choix hors du site de l'étudiant, ignorés dans son morceau
+    rebalanced_to_choice: int = 0  # Étudiants replacés sur un de leurs choix après recollage
+    rebalanced_forced: int = 0  # Non assignés placés dans une activité d'un autre morceau
+    elapsed: float = 0.0
+
+    def summary(self) -> Dict:
+        sizes = [shard.n_students for shard in self.shards]
+        return {
+            "mode": self.mode,
+            "components": self.n_components,
+            "shards": len(self.shards),
+            "largest_shard": max(sizes, default=0),
+            "dropped_choices": self.dropped_choices,
+            "rebalanced_to_choice": self.rebalanced_to_choice,
+            "rebalanced_forced": self.rebalanced_forced,
+            "elapsed": round(self.elapsed, 3)
+        }
+
+
+def preference_components(preferences: np.ndarray, n_choices: int):
+    """
+    Composantes connexes du graphe étudiants-activités. Retourne
+    (étiquette par activité, étiquette par étudiant, nombre de composantes) ;
+    les étiquettes sont numérotées à partir de 0 et un étudiant sans aucun choix
+    reçoit -1.
+
+    Propagation vectorisée de l'étiquette minimale : chaque activité prend le
+    minimum des étiquettes des activités choisies par ses étudiants, puis les
+    étiquettes sont compressées (saut de pointeurs) jusqu'à stabilité.
+    """
+    valid = preferences >= 0
+    has_choice = valid.any(axis=1)
+    targets = np.where(valid, preferences, 0).astype(np.int64)
+    labels = np.arange(n_choices, dtype=np.int64)
+    flat_targets = targets[valid]
+    while True:
+        student_min = np.where(valid, labels[targets], n_choices).min(axis=1)
+        updated = labels.copy()
+        np.minimum.at(updated, flat_targets, np.broadcast_to(student_min[:, None], valid.shape)[valid])
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+
+    roots, choice_labels = np.unique(labels, return_inverse=True)
+    first = np.argmax(valid, axis=1)
+    student_labels = np.where(has_choice, choice_labels[targets[np.arange(len(targets)), first]], -1)
+    return choice_labels, student_labels, len(roots)
+
+
+def site_labels(problem: ArrayAssignmentProblem, sites: Union[Dict[int, str], Sequence]):
+    """
+    Étiquettes de site par activité et par étudiant (site de son premier choix),
+    au même format que preference_components. sites est un dictionnaire
+    {ID d'activité: site} ou une séquence dans l'ordre des activités.
+    """
+    if isinstance(sites, dict):
+        missing = [c for c in problem.choice_ids.tolist() if c not in sites]
+        if missing:
+            raise ValueError(f"Site manquant pour l'activité {missing[0]}")
+        sites = [sites[c] for c in problem.choice_ids.tolist()]
+    if len(sites) != problem.n_choices:
+        raise ValueError(
+            f"{len(sites)} sites fournis pour {problem.n_choices} activités"
+        )
+    names, choice_labels = np.unique(np.asarray([str(s) for s in sites]), return_inverse=True)
+    valid = problem.preferences >= 0
+    has_choice = valid.any(axis=1)
+    first = problem.preferences[np.arange(problem.n_students), np.argmax(valid, axis=1)]
+    student_labels = np.where(has_choice, choice_labels[np.maximum(first, 0)], -1)
+    return choice_labels, student_labels, len(names)
+
+
+class ShardedOptimizer(SatisfactionOptimizer):
+    """
+    Découpe le problème en morceaux indépendants (composantes connexes, ou sites
+    si sites est fourni et que la plus grande composante regroupe plus de
+    max_component_share des étudiants), les résout en parallèle avec
+    optimizer_factory(problème) puis recolle et rééquilibre les résultats (voir
+    le module).
+
+    Les petites composantes sont regroupées en au plus n_shards morceaux
+    équilibrés (par défaut : le nombre de processeurs) ; chaque morceau reçoit
+    une graine dérivée de la graine d'origine, d'où un résultat reproductible.
+    optimizer_factory doit pouvoir être transmis à un autre processus (une
+    classe, ou functools.partial). Le bilan est conservé dans last_report.
+    """
+
+    def __init__(self, problem: Union[AssignmentProblem, ArrayAssignmentProblem],
+                 sites: Optional[Union[Dict[int, str], Sequence]] = None,
+                 optimizer_factory: Callable = SatisfactionOptimizer,
+                 n_shards: Optional[int] = None, max_workers: Optional[int] = None,
+                 admission: bool = False, max_component_share: float = 0.5):
+        super().__init__(problem, admission=admission)
+        if not 0 < max_component_share <= 1:
+            raise ValueError("La part maximale d'une composante doit être comprise entre 0 et 1")
+        self.sites = sites
+        self.max_component_share = max_component_share
+        self.optimizer_factory = optimizer_factory
+        self.n_shards = n_shards
+        self.max_workers = max_workers
+        self.last_report: Optional[ShardReport] = None
+
+    def optimize(self, seed: Optional[int] = None) -> Union[AssignmentProblem, ArrayAssignmentProblem]:
+        self._reset_assignments()
+        base_seed = seed if seed is not None else secrets.randbits(32)
+        if isinstance(self.problem, ArrayAssignmentProblem):
+            columns = self.problem
+        else:
+            columns = ArrayAssignmentProblem.from_problem(self.problem)
+
+        started = time.perf_counter()
+        with profiling.span('sharding'):
+            mode = 'components'
+            choice_labels, student_labels, n_labels = preference_components(
+                columns.preferences, columns.n_choices)
+            if self.sites is not None and self._single_block(student_labels, n_labels):
+                mode = 'sites'
+                choice_labels, student_labels, n_labels = site_labels(columns, self.sites)
+            groups = self._group_labels(student_labels, n_labels)
+            shard_of_choice = groups[choice_labels]
+            shard_of_student = np.where(student_labels >= 0, groups[np.maximum(student_labels, 0)], -1)
+            n_used = int(groups.max()) + 1 if len(groups) else 0
+
+            report = ShardReport(mode=mode, n_components=int(np.count_nonzero(
+                np.bincount(student_labels[student_labels >= 0], minlength=n_labels))))
+            subproblems = []
+            for shard in range(n_used):
+                sub, dropped = _subproblem(columns, shard_of_choice == shard, shard_of_student == shard)
+                report.dropped_choices += dropped
+                subproblems.append(sub)
+            profiling.count('shards', len(subproblems))
+
+            seeds = derive_seeds(base_seed, len(subproblems))
+            workers = min(self.max_workers or os.cpu_count() or 1, len(subproblems))
+            jobs = [(sub.problem, self.optimizer_factory, s, self.admission)
+                    for sub, s in zip(subproblems, seeds)]
+            if workers <= 1:
+                results = [_solve_shard(*job) for job in jobs]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(_solve_shard, *zip(*jobs)))
+
+            # Recollage dans les indices globaux
+            assignment = np.full(columns.n_students, -1, dtype=np.int32)
+            forced = np.zeros(columns.n_students, dtype=bool)
+            for sub, (sub_assignment, sub_forced, summary, elapsed) in zip(subproblems, results):
+                placed = sub_assignment >= 0
+                assignment[sub.students[placed]] = sub.choices[sub_assignment[placed]]
+                forced[sub.students] = sub_forced
+                report.shards.append(ShardResult(
+                    n_students=len(sub.students), n_choices=len(sub.choices),
+                    seats=int(sub.problem.capacities.sum()), summary=summary, elapsed=elapsed))
+
+            with profiling.span('rebalance'):
+                _rebalance(columns, assignment, forced, random.Random(base_seed), report)
+
+        columns.assignment[:] = assignment
+        columns.forced[:] = forced
+        columns.recompute_occupancy()
+        report.elapsed = time.perf_counter() - started
+        self.last_report = report
+        if columns is not self.problem:
+            columns.apply_to(self.problem)
+        return self.problem
+
+    def _single_block(self, student_labels: np.ndarray, n_labels: int) -> bool:
+        """Vrai si la plus grande composante dépasse max_component_share des étudiants"""
+        sizes = np.bincount(student_labels[student_labels >= 0], minlength=n_labels)
+        return len(sizes) > 0 and sizes.max() > self.max_component_share * len(student_labels)
+
+    def _group_labels(self, student_labels: np.ndarray, n_labels: int) -> np.ndarray:
+        """
+        Regroupe les étiquettes en au plus n_shards morceaux d'effectifs voisins
+        (plus grande composante d'abord, dans le morceau le moins chargé).
+        Retourne le morceau de chaque étiquette.
+        """
+        sizes = np.bincount(student_labels[student_labels >= 0], minlength=n_labels)
+        n_shards = max(1, min(self.n_shards or os.cpu_count() or 1, n_labels))
+        loads = [0] * n_shards
+        groups = np.zeros(n_labels, dtype=np.int64)
+        for label in np.argsort(-sizes, kind='stable').tolist():
+            shard = loads.index(min(loads))
+            groups[label] = shard
+            loads[shard] += int(sizes[label])
+        # Numérotation compacte des morceaux effectivement utilisés
+        _, groups = np.unique(groups, return_inverse=True)
+        return groups
+
+
+@dataclass
+class _Subproblem:
+    problem: ArrayAssignmentProblem
+    students: np.ndarray  # Indices globaux des étudiants du morceau
+    choices: np.ndarray  # Indices globaux des activités du morceau
+
+
+def _subproblem(columns: ArrayAssignmentProblem, choice_mask: np.ndarray,
+                student_mask: np.ndarray):
+    """
+    Extrait un morceau, les choix renumérotés localement ; les choix hors du
+    morceau (sites) sont retirés en gardant l'ordre des autres. Retourne le
+    sous-problème et le nombre de choix retirés.
+    """
+    choices = np.flatnonzero(choice_mask)
+    students = np.flatnonzero(student_mask)
+    local = np.full(columns.n_choices + 1, -1, dtype=np.int32)
+    local[choices] = np.arange(len(choices), dtype=np.int32)
+    preferences = local[columns.preferences[students]]  # -1 reste -1 (dernière case)
+    dropped = int(np.count_nonzero((preferences < 0) & (columns.preferences[students] >= 0)))
+    # Les choix conservés remontent en tête, dans leur ordre
+    kept_first = np.argsort(preferences < 0, axis=1, kind='stable')
+    preferences = np.take_along_axis(preferences, kept_first, axis=1)
+    problem = ArrayAssignmentProblem(
+        choice_ids=columns.choice_ids[choices],
+        choice_names=[columns.choice_names[i] for i in choices.tolist()],
+        capacities=columns.capacities[choices],
+        student_ids=columns.student_ids[students],
+        student_names=[columns.student_names[i] for i in students.tolist()],
+        preferences=preferences,
+        k=columns.k
+    )
+    return _Subproblem(problem, students, choices), dropped
+
+
+def _solve_shard(problem: ArrayAssignmentProblem, optimizer_factory: Callable, seed: int,
+                 admission: bool = False):
+    """Résout un morceau ; retourne (attribution, forcés, résumé, durée)"""
+    started = time.perf_counter()
+    if admission:
+        optimizer = optimizer_factory(problem, admission=True)
+    else:
+        optimizer = optimizer_factory(problem)
+    optimizer.optimize(seed=seed)
+    summary = optimizer.get_solution_summary()
+    return problem.assignment, problem.forced, summary, time.perf_counter() - started
+
+
+def _rebalance(columns: ArrayAssignmentProblem, assignment: np.ndarray, forced: np.ndarray,
+               rng: random.Random, report: ShardReport):
+    """
+    Utilise les places restées libres après recollage : les étudiants forcés ou
+    non assignés (dans un ordre tiré au hasard) passent, choix par choix, sur
+    une activité de leurs choix qui a encore de la place ; les non assignés
+    restants sont placés au hasard dans une activité ouverte.
+    """
+    occupancy = np.bincount(assignment[assignment >= 0], minlength=columns.n_choices)
+    remaining = (columns.capacities.astype(np.int64) - occupancy).tolist()
+    waiting = np.flatnonzero(forced | (assignment < 0)).tolist()
+    if not waiting or not any(r > 0 for r in remaining):
+        return
+    rng.shuffle(waiting)
+    preferences = columns.preferences
+
+    for choice_level in range(columns.k):
+        still_waiting = []
+        for i in waiting:
+            target = int(preferences[i, choice_level])
+            if target >= 0 and remaining[target] > 0:
+                if assignment[i] >= 0:
+                    remaining[assignment[i]] += 1
+                assignment[i] = target
+                forced[i] = False
+                remaining[target] -= 1
+                report.rebalanced_to_choice += 1
+            else:
+                still_waiting.append(i)
+        waiting = still_waiting
+
+    available_choices = _OpenActivities(np.asarray(remaining) > 0)
+    for i in waiting:
+        if assignment[i] >= 0:
+            continue
+        if not len(available_choices):
+            break
+        choice_idx = available_choices.kth(rng.randrange(len(available_choices)))
+        assignment[i] = choice_idx
+        forced[i] = True
+        remaining[choice_idx] -= 1
+        report.rebalanced_forced += 1
+        if remaining[choice_idx] == 0:
+            available_choices.remove(choice_idx)
@@ -0,0 +1,206 @@
+"""
+Attribution sur plusieurs créneaux (voir models/slotted_models.py).
+
+Tous les créneaux sont résolus ensemble, en deux flots :
+1. Sélection : un flot de coût minimum choisit pour chaque étudiant jusqu'à
+   demand[i] activités distinctes parmi ses choix (arc étudiant -> activité de
+   capacité 1), chaque activité offrant la somme de ses places sur les
+   créneaux. Le flot est maximum : le plus grand nombre possible de places sur
+   les choix, puis les meilleurs rangs.
+2. Placement : les couples (étudiant, activité) retenus sont répartis sur les
+   créneaux, un couplage par créneau ; un étudiant qui n'a plus assez de
+   créneaux pour ses activités restantes, ou une activité qui n'a plus assez
+   de places aux créneaux suivants, passe en priorité (arcs de coût nul).
+
+Les couples qui n'ont pu être placés et les places encore demandées sont
+ensuite complétés un par un (dans un ordre tiré au hasard) : d'abord par un
+choix de l'étudiant qui a encore de la place à ce créneau, sinon par une
+activité ouverte au hasard qu'il n'a pas déjà.
+"""
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
+from models.slotted_models import SlottedAssignmentProblem
+from models.scoring import integer_weights
+from solver.min_cost_flow import MinCostFlow
+import profiling
+
+
+@dataclass
+class SlotReport:
+    """Bilan d'une attribution sur plusieurs créneaux"""
+    selected: int  # Couples (étudiant, choix) retenus par le flot de sélection
+    scheduled: int  # Couples placés sur un créneau par les couplages
+    repaired_to_choice: int  # Places complétées ensuite par un choix de l'étudiant
+    forced: int  # Places complétées par une activité hors des choix
+    unfilled: int  # Places demandées restées vides
+
+    def summary(self) -> Dict:
+        return {
+            "selected": self.selected,
+            "scheduled": self.scheduled,
+            "dropped": self.selected - self.scheduled,
+            "repaired_to_choice": self.repaired_to_choice,
+            "forced": self.forced,
+            "unfilled": self.unfilled
+        }
+
+
+def solve_slotted(problem: SlottedAssignmentProblem, rng) -> SlotReport:
+    """Remplit problem.assignment et problem.forced ; retourne le bilan"""
+    n_students, n_slots = problem.n_students, problem.n_slots
+    with profiling.span('sélection (flot)'):
+        rows, choices = _select(problem.preferences, problem.capacities.sum(axis=1),
+                                problem.demand, problem.k)
+
+    assignment = np.full((n_students, n_slots), -1, dtype=np.int32)
+    remaining = problem.capacities.astype(np.int64)
+    with profiling.span('placement par créneau'):
+        pending = np.ones(len(rows), dtype=bool)
+        for slot in range(n_slots):
+            placed = _schedule_slot(rows, choices, pending, remaining, slot, n_students)
+            assignment[rows[placed], slot] = choices[placed]
+            remaining[:, slot] -= np.bincount(choices[placed], minlength=problem.n_choices)
+            pending[placed] = False
+    scheduled = len(rows) - int(np.count_nonzero(pending))
+    profiling.count('slot_pairs_dropped', len(rows) - scheduled)
+
+    with profiling.span('complétion'):
+        forced = np.zeros((n_students, n_slots), dtype=bool)
+        repaired, n_forced, unfilled = _complete(problem, assignment, forced, remaining, rng)
+
+    problem.assignment[:] = assignment
+    problem.forced[:] = forced
+    problem.recompute_occupancy()
+    return SlotReport(selected=len(rows), scheduled=scheduled, repaired_to_choice=repaired,
+                      forced=n_forced, unfilled=unfilled)
+
+
+def _select(preferences: np.ndarray, seats: np.ndarray, demand: np.ndarray, k: int):
+    """
+    Flot de sélection : retourne les couples retenus (indice d'étudiant,
+    indice d'activité), triés par étudiant.
+    """
+    n_students = preferences.shape[0]
+    n_choices = len(seats)
+    rank_weights, _ = integer_weights(k)
+    max_weight = rank_weights[0]
+
+    # Un même choix répété ne compte qu'une fois (première occurrence)
+    valid = preferences >= 0
+    for rank in range(1, k):
+        valid[:, rank] &= ~(preferences[:, :rank] == preferences[:, [rank]]).any(axis=1)
+    rows, ranks = np.nonzero(valid)
+    choices = preferences[rows, ranks]
+
+    source = 0
+    first_student = 1
+    first_choice = first_student + n_students
+    sink = first_choice + n_choices
+    network = MinCostFlow(sink + 1)
+    network.add_arcs(np.full(n_students, source), first_student + np.arange(n_students), demand, 0)
+    pair_arcs = network.add_arcs(first_student + rows, first_choice + choices, 1,
+                                 max_weight - np.asarray(rank_weights)[ranks])
+    network.add_arcs(first_choice + np.arange(n_choices), sink, seats, 0)
+    network.solve(source, sink)
+
+    used = network.flows()[pair_arcs] > 0
+    return rows[used], choices[used].astype(np.int32)
+
+
+def _schedule_slot(rows: np.ndarray, choices: np.ndarray, pending: np.ndarray,
+                   remaining: np.ndarray, slot: int, n_students: int) -> np.ndarray:
+    """
+    Couplage d'un créneau entre les couples encore à placer et les places du
+    créneau ; retourne le masque des couples placés. Un étudiant ne prend
+    qu'une activité par créneau.
+    """
+    n_slots = remaining.shape[1]
+    n_choices = remaining.shape[0]
+    candidates = np.flatnonzero(pending & (remaining[choices, slot] > 0))
+    placed = np.zeros(len(rows), dtype=bool)
+    if not len(candidates):
+        return placed
+
+    # Urgence : plus de couples à placer que de créneaux (ou de places) restants
+    slots_left = n_slots - slot
+    student_pending = np.bincount(rows[pending], minlength=n_students)
+    choice_pending = np.bincount(choices[pending], minlength=n_choices)
+    later_seats = remaining[:, slot + 1:].sum(axis=1)
+    mandatory = np.clip(choice_pending - later_seats, 0, remaining[:, slot])
+
+    students, local_rows = np.unique(rows[candidates], return_inverse=True)
+    urgent = student_pending[students] >= slots_left
+
+    source = 0
+    first_student = 1
+    first_choice = first_student + len(students)
+    sink = first_choice + n_choices
+    network = MinCostFlow(sink + 1)
+    network.add_arcs(np.full(len(students), source), first_student + np.arange(len(students)),
+                     1, np.where(urgent, 0, 2))
+    pair_arcs = network.add_arcs(first_student + local_rows, first_choice + choices[candidates], 1, 0)
+    activities = np.arange(n_choices)
+    network.add_arcs(first_choice + activities, sink, mandatory, 0)
+    network.add_arcs(first_choice + activities, sink, remaining[:, slot] - mandatory, 1)
+    network.solve(source, sink)
+
+    placed[candidates[network.flows()[pair_arcs] > 0]] = True
+    return placed
+
+
+def _complete(problem: SlottedAssignmentProblem, assignment: np.ndarray, forced: np.ndarray,
+              remaining: np.ndarray, rng):
+    """
+    Complète les places demandées restées vides, dans un ordre tiré au hasard ;
+    retourne (places sur un choix, places forcées, places restées vides).
+    """
+    filled = (assignment >= 0).sum(axis=1)
+    empty_slots: List[tuple] = []
+    for i in np.flatnonzero(filled < problem.demand).tolist():
+        free = np.flatnonzero(assignment[i] < 0).tolist()
+        # Les créneaux libres sont tirés au hasard parmi ceux de l'étudiant
+        rng.shuffle(free)
+        empty_slots.extend((i, slot) for slot in free[:problem.demand[i] - filled[i]])
+    rng.shuffle(empty_slots)
+    remaining_list = remaining.tolist()
+    preferences = problem.preferences.tolist()
+
+    repaired = 0
+    waiting = []
+    for i, slot in empty_slots:
+        held = assignment[i]
+        for choice_idx in preferences[i]:
+            if choice_idx >= 0 and remaining_list[choice_idx][slot] > 0 and choice_idx not in held:
+                assignment[i, slot] = choice_idx
+                remaining_list[choice_idx][slot] -= 1
+                repaired += 1
+                break
+        else:
+            waiting.append((i, slot))
+
+    # Activités ouvertes par créneau, pour le tirage des attributions forcées
+    open_choices = [[c for c in range(problem.n_choices) if remaining_list[c][slot] > 0]
+                    for slot in range(problem.n_slots)]
+    n_forced = 0
+    for i, slot in waiting:
+        candidates = open_choices[slot]
+        held = set(assignment[i].tolist())
+        while candidates:
+            position = rng.randrange(len(candidates))
+            choice_idx = candidates[position]
+            if remaining_list[choice_idx][slot] == 0:
+                candidates[position] = candidates[-1]
+                candidates.pop()
+                continue
+            if choice_idx in held:
+                allowed = [c for c in candidates if c not in held and remaining_list[c][slot] > 0]
+                if not allowed:
+                    break
+                choice_idx = allowed[rng.randrange(len(allowed))]
+            assignment[i, slot] = choice_idx
+            forced[i, slot] = True
+            remaining_list[choice_idx][slot] -= 1
+            n_forced += 1
+            break
+    return repaired, n_forced, len(waiting) - n_forced